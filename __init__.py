@@ -38,7 +38,7 @@ def load_tests(loader, tests, pattern):
 def load_bench(runner):
     """Load benchmarks protocol
     """
-    from . import remoting
+    from . import stream, remoting
 
-    for module in (remoting,):
+    for module in (stream, remoting,):
         runner.add_module(module)
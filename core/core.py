@@ -7,7 +7,7 @@ import signal
 import itertools
 import threading
 from time import time
-from heapq import heappush, heappop
+from heapq import heappush, heappop, heapify
 if sys.version_info[0] > 2:
     from _thread import get_ident
 else:  # pragma: no cover
@@ -17,7 +17,7 @@ from .poll import Poller, POLL_ERROR, POLL_READ, POLL_WRITE, POLL_DISCONNECT
 from ..uniform import BrokenPipeError, ConnectionError, CanceledError, BlockingErrorSet
 from ..monad import Result, do_async, async_block, do_done
 from ..state_machine import StateMachine
-from ..dispose import CompDisp
+from ..dispose import CompDisp, FuncDisp
 
 __all__ = ('Core',)
 
@@ -127,6 +127,17 @@ class Core(object):
             raise CanceledError('core is disposed')
         do_done(self.time_queue.on(when))
 
+    def timer(self, when, ret):
+        """Call ``ret`` with result of the timer when unix time is reached
+
+        Unlike ``sleep_until``, timer can be canceled before it is reached.
+        Returns disposable which cancels the timer.
+        """
+        if self.state.state == self.STATE_DISP:
+            raise CanceledError('core is disposed')
+        return self.time_queue.timer(when, lambda val: ret(val if isinstance(val, Result)
+                                                           else Result.from_value(val)))
+
     @do_async
     def poll(self, fd, mask):
         """Poll file descriptor for events
@@ -274,27 +285,55 @@ class TimeQueue(object):
     """Time queue
 
     Schedule continuation to be executed when specified time is reached.
+    Canceled timers are removed lazily, queue is compacted once they make up
+    half of it.
     """
-    __slots__ = ('queue', 'uid',)
+    __slots__ = ('queue', 'uid', 'canceled',)
 
     def __init__(self):
         self.uid = itertools.count()  # used to distinguish simultaneous continuations
         self.queue = []
+        self.canceled = 0
 
     def on(self, when):
         return async_block(lambda ret:
-                           heappush(self.queue, (when, next(self.uid), ret)))
+                           heappush(self.queue, [when, next(self.uid), ret]))
+
+    def timer(self, when, ret):
+        """Call ``ret`` when specified time is reached
+
+        Returns disposable which cancels the timer.
+        """
+        entry = [when, next(self.uid), ret]
+        heappush(self.queue, entry)
+        return FuncDisp(lambda: self.cancel(entry))
+
+    def cancel(self, entry):
+        if entry[2] is None:
+            return
+        entry[2] = None
+        self.canceled += 1
+        if self.canceled * 2 >= len(self.queue):
+            self.queue = [item for item in self.queue if item[2] is not None]
+            heapify(self.queue)
+            self.canceled = 0
 
     def __call__(self, time_now):
         if not self.queue:
             return
         resolved = []
         while self.queue:
-            time_when, _, ret = self.queue[0]
+            entry = self.queue[0]
+            time_when, _, ret = entry
             if time_when > time_now:
                 break
-            resolved.append(heappop(self.queue))
-        for time_when, _, ret in resolved:
+            heappop(self.queue)
+            entry[2] = None  # cancel after execution is no-op
+            if ret is None:
+                self.canceled -= 1
+            else:
+                resolved.append((time_when, ret))
+        for time_when, ret in resolved:
             ret(time_when)
 
     def timeout(self, now):
@@ -305,9 +344,11 @@ class TimeQueue(object):
 
     def dispose(self, exc=None):
         error = Result.from_exception(exc or CanceledError('time queue has been disposed'))
-        queue, self.queue = self.queue, []
-        for when, _, ret in queue:
-            ret(error)
+        queue, self.queue, self.canceled = self.queue, [], 0
+        for entry in queue:
+            ret, entry[2] = entry[2], None
+            if ret is not None:
+                ret(error)
 
     def __enter__(self):
         return self
@@ -317,7 +358,7 @@ class TimeQueue(object):
         return False
 
     def __len__(self):
-        return len(self.queue)
+        return len(self.queue) - self.canceled
 
     def __str__(self):
         return 'TimeQueue(len:{})'.format(len(self))
@@ -118,6 +118,21 @@ class TimeQueueTest(unittest.TestCase):
         timer(3)
         self.assertEqual(res(), (('1:0', 1), ('1:1', 1), ('2', 2)))
 
+        # canceled timers
+        ret_val = lambda tag: lambda val: rets.append((tag, val))
+        timers = [timer.timer(when, ret_val(str(when))) for when in range(4)]
+        timers[1]()
+        self.assertEqual(len(timer), 3)
+        timers[2]()
+        self.assertEqual(len(timer.queue), 2)  # compacted
+        timer(2.5)
+        self.assertEqual(res(), (('0', 0),))
+        timers[0]()  # already executed
+        timers[3]()
+        self.assertEqual(len(timer), 0)
+        timer(3)
+        self.assertEqual(res(), ())
+
 
 class ProcQueueTest(unittest.TestCase):
     @async_test
@@ -1,19 +1,26 @@
 """Monadic parser combinator
 """
+import re
 import struct    as S
 import functools as F
+import operator  as O
+import threading
+from array import array
+from bisect import bisect_right
 from .utils import call
-from .uniform import PY2
 from .monad import Monad, do, do_return
 
-__all__ = ('Parser', 'ParserResult', 'ParserError',
+__all__ = ('Parser', 'ParserResult', 'ParserError', 'ParserInput',
            'parser',
            'at_end', 'end_of_input',
            'match',
            'string',
-           'take', 'take_while', 'take_rest',
+           'take', 'take_while', 'take_while_bytes', 'take_rest',
            'struct',
-           'Varint', 'Bytes'
+           'fuse',
+           'Varint', 'Bytes',
+           'encode_varints', 'decode_varints',
+           'varint_encode', 'varint_decode', 'varint_tables', 'varint_octets',
 )
 
 #-------------------------------------------------------------------------------
@@ -62,15 +69,103 @@ class ParserResult(tuple):
         return str(self)
 
 
+class ParserInput(object):
+    """Parser input
+
+    Input fed to top level parser since parsing has been started. Any chunk
+    passed to a parser is a suffix of the input, so parsers which need to keep
+    consumed input (alternatives for backtracking, `take_while`, etc.) keep
+    only offset of the chunk in the shared input instead of copies of the chunks.
+    """
+    __slots__ = ('chunks', 'offsets', 'end', 'empty',)
+
+    def __init__(self, chunk=None):
+        self.chunks  = [chunk] if chunk else []
+        self.offsets = [0] if chunk else []
+        self.end     = len(chunk) if chunk else 0
+        self.empty   = None if chunk is None else chunk[:0]
+
+    @staticmethod
+    def current():
+        """Input of the parser being executed on this thread
+        """
+        return None if _parser_local.input is None else _parser_input()
+
+    def feed(self, chunk):
+        """Append chunk to the input
+        """
+        if self.empty is None:
+            self.empty = chunk[:0]
+        if chunk:
+            self.chunks.append(chunk)
+            self.offsets.append(self.end)
+            self.end += len(chunk)
+
+    def offset(self, chunk):
+        """Offset of the `chunk` (suffix of the input)
+        """
+        return self.end - len(chunk)
+
+    def slice(self, start, stop=None):
+        """Input in range [start, stop)
+        """
+        stop = self.end if stop is None else stop
+        index = bisect_right(self.offsets, start) - 1
+        if index < 0 or start >= stop:
+            return b'' if self.empty is None else self.empty
+        chunk, offset = self.chunks[index], self.offsets[index]
+        if stop <= offset + len(chunk):
+            return chunk[start - offset:stop - offset]
+        chunks = [chunk[start - offset:]]
+        for chunk, offset in zip(self.chunks[index + 1:], self.offsets[index + 1:]):
+            if stop <= offset + len(chunk):
+                chunks.append(chunk[:stop - offset])
+                break
+            chunks.append(chunk)
+        return chunks[0][:0].join(chunks)
+
+    def __len__(self):
+        return self.end
+
+    def __str__(self):
+        return 'ParserInput(chunks:{}, size:{})'.format(len(self.chunks), self.end)
+
+    def __repr__(self):
+        return str(self)
+
+
+class _ParserLocal(threading.local):
+    input = None  # ParserInput, or (chunk,) until input is needed
+_parser_local = _ParserLocal()
+
+
+def _parser_input():
+    """Input of the running top level parser
+
+    Input is created once some parser needs it, so parsers which do not refer
+    to the input do not pay for it.
+    """
+    local = _parser_local
+    input = local.input
+    if type(input) is tuple:
+        input = local.input = ParserInput(input[0])
+    return input
+
+
 class Parser(Monad):
     """Monadic parser
 
     Parser a = Parser { run :: String -> Bool -> ParserResult a }
+
+    Primitive parsers have `fusion` description (regular expression source
+    factory, groups count, groups converter or None if value is the only group,
+    variable length flag) used by `fuse`.
     """
-    __slots__ = ('run',)
+    __slots__ = ('run', 'fusion',)
 
     def __init__ (self, run, *args):
         self.run = F.partial(run, *args)
+        self.fusion = None
 
     def __parser__(self):
         """Parsable interface
@@ -82,10 +177,25 @@ class Parser(Monad):
     def __call__(self, chunk, last):
         """Execute parser
 
+        Top level parser (executed outside of other parser) starts new input.
+
         () :: Parser a -> String -> Bool -> ParserResult a
         """
+        if _parser_local.input is None:
+            return _parser_run(self, (chunk,), chunk, last)
         return self.run(chunk, last)
 
+    def start(self, chunk, last):
+        """Execute parser as top level parser
+
+        Starts new input even if executed inside of other parser, so independent
+        parse can be done from callbacks of other parser. Partial result is
+        resumed with the same input.
+
+        start :: Parser a -> String -> Bool -> ParserResult a
+        """
+        return _parser_run(self, (chunk,), chunk, last)
+
     def parse_only(self, *chunks):
         """Parse input `chunks`, if `chunks` is incorrect or too short raise and error.
 
@@ -98,7 +208,7 @@ class Parser(Monad):
 
         parse_only_iter :: Parser a -> [String] -> (a, String) | Exception
         """
-        parser, chunk = self, b''
+        parser, chunk = self.start, b''
         for chunk in chunks:
             tupe, value = parser(chunk, False)
             if tupe & ParserResult.DONE:
@@ -135,7 +245,7 @@ class Parser(Monad):
                 return fun(value).__parser__()(chunk, last)
             elif tupe & ParserResult.PARTIAL:
                 if last:
-                    return ParserResult.error("Partial result with last chunk")
+                    return ParserResult.from_error("Partial result with last chunk")
                 return ParserResult.from_partial(value.__parser__().bind(fun))
             else:
                 return result
@@ -155,25 +265,41 @@ class Parser(Monad):
 
         (|) :: Parser a -> Parser a -> Parser a
         """
-        def run(parser, chunks, chunk, last):
+        def run(parser, start, chunk, last):
+            input  = _parser_input()
+            start  = input.offset(chunk) if start is None else start
             result = parser(chunk, last)
             tupe, value = result
             if tupe & ParserResult.DONE:
                 return result
             elif tupe & ParserResult.PARTIAL and not last:
-                return ParserResult.from_partial(Parser(run, value, (chunk, chunks)))
+                return ParserResult.from_partial(Parser(run, value, start))
             else:
-                return other.__parser__()(_chunks_merge((chunk, chunks)), last)
-        return Parser(run, self, tuple())
+                return other.__parser__()(input.slice(start), last)
+        return Parser(run, self, None)
 
     def __and__(self, other):
         """Collect result of two parser in a tuple
 
         (&) :: Parser a -> Parser b -> Parser (a, b)
         """
-        return self.bind(
-            lambda left: other.__parser__().bind(
-                lambda right: self.unit((left, right))))
+        def run(parser, first, left, chunk, last):
+            while True:
+                result = parser(chunk, last)
+                tupe, value = result
+                if tupe & ParserResult.DONE:
+                    if not first:
+                        value, chunk, last = value
+                        return ParserResult.from_done((left, value), chunk, last)
+                    left, chunk, last = value
+                    parser, first = other.__parser__(), False
+                elif tupe & ParserResult.PARTIAL:
+                    if last:
+                        return ParserResult.from_error("Partial result with last chunk")
+                    return ParserResult.from_partial(Parser(run, value, first, left))
+                else:
+                    return result
+        return Parser(run, self, True, None)
 
     def plus(self, other):
         """Tries this parser and if fails use other.
@@ -182,6 +308,22 @@ class Parser(Monad):
         """
         return self | other
 
+    def map_val(self, func):
+        """Map value of the parser with function
+
+        map_val :: Parser a -> (a -> b) -> Parser b
+        """
+        def run(parser, chunk, last):
+            result = parser(chunk, last)
+            tupe, value = result
+            if tupe & ParserResult.DONE:
+                value, chunk, last = value
+                return ParserResult.from_done(func(value), chunk, last)
+            elif tupe & ParserResult.PARTIAL:
+                return ParserResult.from_partial(Parser(run, value))
+            return result
+        return Parser(run, self)
+
     # Combinators
     def __lshift__(self, other):
         return (self & other).map_val(lambda pair: pair[0])
@@ -196,18 +338,72 @@ class Parser(Monad):
         some :: Parser a -> Parser [a]
         """
         return self.bind(
-            lambda val: (self.some | self.unit(tuple())).bind(
-                lambda vals: self.unit((val,) + vals)))
+            lambda val: self.many.map_val(lambda vals: (val,) + vals))
 
     @property
     def many(self):
         """Match zero or more.
 
+        Matched values are kept in reversed linked list, and input is rewound
+        to the start of the failed match, so parser does not depend on number
+        of already matched values. Stops if matched value has not consumed input.
+
         match :: Parser a -> Parser [a]
         """
-        return self.bind(
-            lambda val: self.many.bind(
-                lambda vals: self.unit((val,) + vals))) | self.unit(tuple())
+        def run(vals, start, parser, chunk, last):
+            input = _parser_input()
+            while True:
+                if parser is None:
+                    start, parser = input.offset(chunk), self
+                tupe, value = parser(chunk, last)
+                if tupe & ParserResult.DONE:
+                    value, rest, last = value
+                    if input.offset(rest) == start:
+                        return ParserResult.from_done(_linked_tuple(vals), rest, last)
+                    vals, parser, chunk = (value, vals), None, rest
+                elif tupe & ParserResult.PARTIAL and not last:
+                    return ParserResult.from_partial(Parser(run, vals, start, value))
+                else:
+                    # chunk is still the start of the match unless parser was partial
+                    return ParserResult.from_done(_linked_tuple(vals), chunk if parser is self
+                                                  else input.slice(start), last)
+        return Parser(run, tuple(), None, None)
+
+    def many_till(self, end):
+        """Match zero or more until `end` matches
+
+        `end` is tried before each match, its result is dropped. Fails if match
+        fails or does not consume input.
+
+        many_till :: Parser a -> Parser b -> Parser [a]
+        """
+        end = end.__parser__()
+        def run(vals, start, ending, parser, chunk, last):
+            input = _parser_input()
+            while True:
+                if parser is None:
+                    start, ending, parser = input.offset(chunk), True, end
+                result = parser(chunk, last)
+                tupe, value = result
+                if tupe & ParserResult.DONE:
+                    value, rest, last = value
+                    if ending:
+                        return ParserResult.from_done(_linked_tuple(vals), rest, last)
+                    elif input.offset(rest) == start:
+                        return ParserResult.from_error("Match has not consumed input")
+                    vals, parser, chunk = (value, vals), None, rest
+                elif tupe & ParserResult.PARTIAL and not last:
+                    return ParserResult.from_partial(Parser(run, vals, start, ending, value))
+                elif ending:
+                    # rewind input consumed by failed end, unless it was not partial
+                    if parser is not end:
+                        chunk = input.slice(start)
+                    ending, parser = False, self
+                elif tupe & ParserResult.ERROR:
+                    return result
+                else:
+                    return ParserResult.from_error("Partial result with last chunk")
+        return Parser(run, tuple(), None, False, None)
 
     def repeat(self, count):
         """Repeat this parser `count` times.
@@ -274,19 +470,20 @@ def match(parser):
 
     match :: Parser a -> Parser (String, a)
     """
-    def run(parser, chunks, chunk, last):
-        chunks = (chunk, chunks)
+    def run(parser, start, chunk, last):
+        input  = _parser_input()
+        start  = input.offset(chunk) if start is None else start
         result = parser.__parser__()(chunk, last)
         tupe, value = result
         if tupe & ParserResult.DONE:
             value, chunk, last = value
-            match = _chunks_merge(chunks)[:-len(chunk)] if chunk else _chunks_merge(chunks)
-            return ParserResult.from_done((match, value), chunk, last)
+            return ParserResult.from_done((input.slice(start, input.offset(chunk)), value),
+                                          chunk, last)
         elif tupe & ParserResult.PARTIAL:
-            return ParserResult.from_partial(Parser(run, value, chunks))
+            return ParserResult.from_partial(Parser(run, value, start))
         else:
             return result
-    return Parser(run, parser, tuple())
+    return Parser(run, parser, None)
 
 
 def string(target):
@@ -307,7 +504,10 @@ def string(target):
             return ParserResult.from_done(target, chunk[len(suffix):], last)
         else:
             return ParserResult.from_error("Target mismatches input")
-    return Parser(run, target)
+    parser = Parser(run, target)
+    if isinstance(target, bytes):
+        parser.fusion = (lambda group: re.escape(target), 0, lambda groups: target, False)
+    return parser
 
 
 def take(count):
@@ -316,15 +516,19 @@ def take(count):
     take :: Int -> Parser String
     """
     def run(length, chunks, chunk, last):
+        # chunks are kept by parser itself, as they are joined only once
         if length > len(chunk):
             if last:
                 return ParserResult.from_error("Not enough input")
-            else:
-                return ParserResult.from_partial(Parser(run, length - len(chunk), (chunk, chunks)))
-        else:
-            return ParserResult.from_done(_chunks_merge((chunk[:length], chunks)),
+            return ParserResult.from_partial(Parser(run, length - len(chunk), (chunk, chunks)))
+        elif chunks:
+            return ParserResult.from_done(chunk[:0].join(_linked_tuple((chunk[:length], chunks))),
                                           chunk[length:], last)
-    return Parser(run, count, tuple())
+        else:
+            return ParserResult.from_done(chunk[:length], chunk[length:], last)
+    parser = Parser(run, count, tuple())
+    parser.fusion = (lambda group: '(.{{{}}})'.format(count).encode(), 1, None, False)
+    return parser
 
 
 def take_while(pred):
@@ -332,15 +536,42 @@ def take_while(pred):
 
     take_white :: (Char -> Bool) -> Parser String
     """
-    def run(chunks, chunk, last):
+    def run(start, chunk, last):
         for i, c in enumerate(chunk):
             if not pred(c):
-                return ParserResult.from_done(_chunks_merge((chunk[:i], chunks)), chunk[i:], last)
+                return ParserResult.from_done(_parser_taken(start, chunk, i), chunk[i:], last)
         if last:
             return ParserResult.from_error("Not enough input")
         else:
-            return ParserResult.from_partial(Parser(run, (chunk, chunks)))
-    return Parser(run, tuple())
+            return ParserResult.from_partial(Parser(run, _parser_start(start, chunk)))
+    return Parser(run, None)
+
+
+def take_while_bytes(charset):
+    """Take while characters are in `charset`
+
+    Same as `take_while` with membership predicate, but chunk is scanned by
+    precompiled regular expression instead of python loop.
+
+    take_while_bytes :: String -> Parser String
+    """
+    charclass = _charset_class(charset)
+    regex = re.compile(charclass + (b'*' if isinstance(charclass, bytes) else '*'))
+    def run(start, chunk, last):
+        index = regex.match(chunk).end()
+        if index < len(chunk):
+            return ParserResult.from_done(_parser_taken(start, chunk, index),
+                                          chunk[index:], last)
+        elif last:
+            return ParserResult.from_error("Not enough input")
+        else:
+            return ParserResult.from_partial(Parser(run, _parser_start(start, chunk)))
+    parser = Parser(run, None)
+    if isinstance(charclass, bytes):
+        # atomic (possessive) match, as parser never gives back matched input
+        parser.fusion = (lambda group: b'(?=(' + charclass + b'*))\\' + str(group).encode(),
+                         1, None, True)
+    return parser
 
 
 @call
@@ -349,12 +580,13 @@ def take_rest():
 
     take_rest :: Parser String
     """
-    def run(chunks, chunk, last):
+    def run(start, chunk, last):
         if last:
-            return ParserResult.from_done(_chunks_merge((chunk, chunks)), chunk[:0], last)
+            return ParserResult.from_done(_parser_taken(start, chunk, len(chunk)),
+                                          chunk[:0], last)
         else:
-            return ParserResult.from_partial(Parser(run, (chunk, chunks)))
-    return Parser(run, tuple())
+            return ParserResult.from_partial(Parser(run, _parser_start(start, chunk)))
+    return Parser(run, None)
 
 
 def struct(pattern):
@@ -366,7 +598,39 @@ def struct(pattern):
     def unpack(data):
         vals = struct.unpack(data)
         return vals if len(vals) != 1 else vals[0]
-    return take(struct.size).map_val(unpack)
+    parser = take(struct.size)
+    source = parser.fusion[0]
+    parser = parser.map_val(unpack)
+    parser.fusion = (source, 1, lambda groups: unpack(groups[0]), False)
+    return parser
+
+
+def fuse(*parsers):
+    """Sequence of parsers with fused primitive parsers
+
+    Returns results of parsers in a tuple as `Parser.Sequence` does. Adjacent
+    `string`, `take`, `struct` and `take_while_bytes` parsers over bytes are
+    compiled into single regular expression, which is matched against the
+    whole chunk at once. If it does not match or match may depend on the next
+    chunk, fused parsers are executed one by one.
+
+    fuse :: [Parser a] -> Parser [a]
+    """
+    segments, fused = [], []
+    for parser in parsers:
+        parser = parser.__parser__()
+        if parser.fusion is not None:
+            fused.append(parser)
+            continue
+        if fused:
+            segments.append(_fuse_run(fused))
+            fused = []
+        segments.append(parser.map_val(lambda val: (val,)))
+    if fused:
+        segments.append(_fuse_run(fused))
+    if len(segments) == 1:
+        return segments[0]
+    return Parser.Sequence(segments).map_val(lambda vals: sum(vals, tuple()))
 
 
 #-------------------------------------------------------------------------------
@@ -388,40 +652,28 @@ class Varint(int):
     def __bytes__(self):
         """Bytes representation for Varint
         """
-        value  = (abs(self) << 1) | (1 if self < 0 else 0)
-        octets = bytearray()
-        while True:
-            octet, value = value & 0x7f, value >> 7
-            if value > 0:
-                octets.append(octet | 0x80)
-            else:
-                octets.append(octet)
-                break
-        return bytes(octets)
+        return varint_tables()[0].get(self) or varint_encode(self)
 
     @classmethod
     def __parser__(cls):
         """Varint value parser
+
+        Parser is fusable and created once per class.
         """
-        byte = cls.__byte
-        def from_octets(octets):
-            octets = octets[0] + octets[1]
-            value  = sum((byte(o) & 0x7f) << i * 7 for i, o in enumerate(octets))
-            if value & 0x1:
-                return cls(-(value >> 1))
-            else:
-                return cls(value >> 1)
-        return ((take_while(lambda octet: byte(octet) & 0x80) & take(1))
-                .map_val(from_octets))
+        parser = _varint_parsers.get(cls)
+        if parser is None:
+            decode = lambda octets: cls(varint_decode(octets[0] + octets[1]))
+            parser = fuse(take_while_bytes(cls.__octets), take(1)).map_val(decode)
+            parser.fusion = (lambda group: (b'(?=([\\x80-\\xff]*))\\' + str(group).encode() +
+                                            b'(.)'), 2, decode, True)
+            _varint_parsers[cls] = parser
+        return parser
 
     @classmethod
     def __monad__(cls):
         return cls.__parser__()
 
-    if PY2:
-        __byte = staticmethod(lambda b: ord(b))
-    else:
-        __byte = staticmethod(lambda b: b)
+    __octets = bytes(bytearray(range(0x80, 0x100)))  # octets with continuation bit
 
     def __str__(self):
         return '{}({})'.format(type(self).__name__, int.__str__(self))
@@ -453,16 +705,201 @@ class Bytes(bytes):
         return str(self)
 
 
+def encode_varints(values):
+    """Encode integers as concatenated varints
+
+    Same as concatenation of `Varint` bytes representations, but encoding of
+    small values (up to two octets) is looked up in a table.
+
+    encode_varints :: [Int] -> Bytes
+    """
+    encode, _ = varint_tables()
+    try:
+        return b''.join(map(encode.__getitem__, values))
+    except KeyError:
+        return b''.join([encode.get(value) or varint_encode(value) for value in values])
+
+
+def decode_varints(data):
+    """Decode concatenated varints
+
+    Whole buffer is split into varints by single regular expression scan,
+    small varints (up to two octets) are looked up in a table. Raises ValueError
+    if buffer ends with incomplete varint, and OverflowError if value does not
+    fit into 64 bits.
+
+    decode_varints :: Bytes -> array Int
+    """
+    if data and bytearray(data[-1:])[0] & 0x80:
+        raise ValueError('incomplete varint at the end of the buffer')
+    octets = varint_octets.findall(data)
+    _, decode = varint_tables()
+    try:
+        return array(_VARINT_TYPECODE, map(decode.__getitem__, octets))
+    except KeyError:
+        return array(_VARINT_TYPECODE, [decode[octet] if octet in decode else
+                                        varint_decode(octet) for octet in octets])
+
+
 #-------------------------------------------------------------------------------
 # Helpers
 #-------------------------------------------------------------------------------
-def _chunks_merge(chunks):
-    """Merge reversed linked list of chunks `cs` to single chunk.
+def varint_encode(value):
+    """Encode integer as varint
+    """
+    value  = (abs(value) << 1) | (1 if value < 0 else 0)
+    octets = bytearray()
+    while value > 0x7f:
+        octets.append((value & 0x7f) | 0x80)
+        value >>= 7
+    octets.append(value)
+    return bytes(octets)
+
+
+def varint_decode(octets):
+    """Decode integer from varint octets
+    """
+    value = 0
+    for octet in reversed(bytearray(octets)):
+        value = (value << 7) | (octet & 0x7f)
+    return -(value >> 1) if value & 0x1 else value >> 1
+
+
+@call
+def varint_tables():
+    """Encode (value -> octets) and decode (octets -> value) tables
 
-    ("three", ("two-", ("one-", ()))) -> "one-two-three"
+    Tables hold varints up to two octets, and are created on first use.
     """
-    chunks_ = []
-    while chunks:
-        chunk, chunks = chunks
-        chunks_.append(chunk)
-    return chunks_[0][:0].join(reversed(chunks_)) if chunks_ else b""
+    tables = []
+    def varint_tables():
+        if not tables:
+            encode = dict((value, varint_encode(value)) for value in range(-8191, 8192))
+            decode = dict((octets, value) for value, octets in encode.items())
+            tables.extend((encode, decode))
+        return tables
+    return varint_tables
+
+
+varint_octets   = re.compile(b'[\x80-\xff]*[\x00-\x7f]')  # octets of single varint
+_varint_parsers = {}
+try:
+    array('q')
+    _VARINT_TYPECODE = 'q'
+except ValueError:  # python 2
+    _VARINT_TYPECODE = 'l'
+
+
+def _parser_run(parser, input, chunk, last):
+    """Execute top level `parser` with `input` ending with `chunk`
+
+    Partial result is resumed with the same input, unless input has not been
+    created (nothing refers to it), in which case next chunk starts new input.
+    """
+    local = _parser_local
+    outer, local.input = local.input, input
+    try:
+        result = parser.run(chunk, last)
+    finally:
+        input, local.input = local.input, outer
+    if result[0] & ParserResult.PARTIAL and type(input) is not tuple:
+        return ParserResult.from_partial(_ParserResume(_parser_resume, result[1], input))
+    return result
+
+
+def _parser_resume(parser, input, chunk, last):
+    """Resume partial top level `parser` with `input`
+    """
+    input.feed(chunk)
+    return _parser_run(parser, input, chunk, last)
+
+
+class _ParserResume(Parser):
+    """Partial top level parser, always executed with its own input
+    """
+    __slots__ = tuple()
+
+    def __call__(self, chunk, last):
+        return self.run(chunk, last)
+
+
+def _linked_tuple(vals):
+    """Convert reversed linked list to tuple
+
+    (3, (2, (1, ()))) -> (1, 2, 3)
+    """
+    vals_ = []
+    while vals:
+        val, vals = vals
+        vals_.append(val)
+    vals_.reverse()
+    return tuple(vals_)
+
+
+def _parser_start(start, chunk):
+    """Input offset of the chunk if start is not known yet
+    """
+    return _parser_input().offset(chunk) if start is None else start
+
+
+def _parser_taken(start, chunk, index):
+    """Input from `start` up to `index` in the current chunk
+    """
+    if start is None:
+        return chunk[:index]
+    input = _parser_input()
+    return input.slice(start, input.offset(chunk) + index)
+
+
+def _charset_class(charset):
+    """Regular expression class source matching characters from `charset`
+    """
+    if not charset:
+        return b'[^\\s\\S]' if isinstance(charset, bytes) else '[^\\s\\S]'
+    chars = charset[:0].join(re.escape(charset[i:i + 1]) for i in range(len(charset)))
+    return b'[' + chars + b']' if isinstance(charset, bytes) else '[' + chars + ']'
+
+
+def _fuse_run(parsers):
+    """Fuse primitive parsers into single parser
+
+    fuse_run :: [Parser a] -> Parser [a]
+    """
+    sources, indices, consts, converters, variable, group = [], [], [], [], 0, 1
+    for parser in parsers:
+        source, count, convert, variable_ = parser.fusion
+        sources.append(source(group))
+        if not count:
+            # value does not depend on input, appended to groups as a constant
+            indices.append(-len(consts) - 1)
+            consts.append(convert(tuple()))
+        else:
+            indices.append(group - 1)
+            if convert is not None:
+                converters.append((len(indices) - 1, group - 1, count, convert))
+        if variable_:
+            variable = group
+        group += count
+    indices  = [index if index >= 0 else group - 1 - index - 1 for index in indices]
+    getter   = (O.itemgetter(*indices) if len(indices) > 1 else
+                lambda groups: (groups[indices[0]],))
+    consts   = tuple(consts)
+    regex    = re.compile(b''.join(sources), re.DOTALL)
+    fallback = Parser.Sequence(parsers)
+
+    def run(chunk, last):
+        if isinstance(chunk, bytes):
+            match = regex.match(chunk)
+            # variable length match, which reaches end of the chunk may continue in the next
+            # one (groups are sequential, so only the last variable group is checked)
+            if match is not None and (not variable or match.end(variable) < len(chunk)):
+                groups = match.groups()
+                values = getter(groups + consts)
+                if converters:
+                    values = list(values)
+                    for position, index, count, convert in converters:
+                        values[position] = convert(groups[index:index + count])
+                    values = tuple(values)
+                return ParserResult.from_done(values, chunk[match.end():], last)
+        return fallback(chunk, last)
+    return Parser(run)
@@ -10,13 +10,15 @@ from ..bench import Benchmark
 class FuncBench(Benchmark):
     """Benchmark function call
     """
+    conn_opts = {}
+
     def __init__(self):
         Benchmark.__init__(self, 'remoting.func', 1)
         self.conn = None
 
     @do_async
     def init(self):
-        self.conn = yield ForkConnection()
+        self.conn = yield ForkConnection(**self.conn_opts)
         self.func = self.conn(remote)()
         if ((yield self.func), (yield self.func)) != (1, 2):
             raise ValueError('initialization test failed')
@@ -44,13 +46,15 @@ class FuncAsyncBench(FuncBench):
 class MethodBench (Benchmark):
     """Benchmark proxy method call
     """
+    conn_opts = {}
+
     def __init__(self):
         Benchmark.__init__(self, 'remoting.method', 1)
         self.conn = None
 
     @do_async
     def init(self):
-        self.conn = yield ForkConnection()
+        self.conn = yield ForkConnection(**self.conn_opts)
         self.proxy = yield proxify(self.conn(Remote)())
         self.method = self.proxy.method()
         if ((yield self.method), (yield self.method)) != (1, 2):
@@ -79,6 +83,26 @@ class MethodAsyncBench(MethodBench):
         return async_all((self.method,) * self.factor)
 
 
+class MethodAsyncCorkBench(MethodAsyncBench):
+    """Benchmark asynchronous proxy method call over corked connection
+    """
+    conn_opts = {'cork': True}
+
+    def __init__(self):
+        Benchmark.__init__(self, 'remoting.method_async_cork', 1024)
+        self.conn = None
+
+
+class MethodAsyncBatchBench(MethodAsyncBench):
+    """Benchmark asynchronous proxy method call over batching connection
+    """
+    conn_opts = {'batch': True}
+
+    def __init__(self):
+        Benchmark.__init__(self, 'remoting.method_async_batch', 1024)
+        self.conn = None
+
+
 def remote():
     return next(fn_count)
 fn_count = itertools.count(1)
@@ -96,5 +120,6 @@ def load_bench(runner):
     """Load benchmarks
     """
     for bench in ((FuncBench(), FuncAsyncBench(),
-                   MethodBench(), MethodAsyncBench(),)):
+                   MethodBench(), MethodAsyncBench(), MethodAsyncCorkBench(),
+                   MethodAsyncBatchBench(),)):
         runner.add(bench)
@@ -1,7 +1,11 @@
-from . import fork, shell, ssh
+from . import fork, shell, ssh, wire, channel, compress
 from .fork import *
 from .shell import *
 from .ssh import *
 from .composite import *
+from .wire import *
+from .channel import *
+from .compress import *
 
-__all__ = fork.__all__ + shell.__all__ + ssh.__all__ + composite.__all__
+__all__ = (fork.__all__ + shell.__all__ + ssh.__all__ + composite.__all__ + wire.__all__ +
+           channel.__all__ + compress.__all__)
@@ -0,0 +1,154 @@
+"""Bulk data channels
+
+Channel is a stream multiplexed over stream connection alongside its messages.
+Written data is split into frames which are interleaved with connection messages,
+so large transfers do not delay messages for more then one frame.
+"""
+import struct
+from collections import deque
+from ...event import Event
+from ...monad import do_async, do_return
+from ...stream import Stream
+from ...uniform import BrokenPipeError
+
+__all__ = ('Channel',)
+
+
+class Channel(Stream):
+    """Bulk data channel
+
+    Channel is created with ``StreamConnection.channel``, its other end is
+    created when channel is sent over the same connection (as argument of remote
+    call for example). Written data is sent with frames of at most ``frame_size``
+    bytes, channels share connection bandwidth proportionally to their ``weight``.
+    Peer must not send more then ``window`` bytes not yet read on this side
+    (credit based flow control). Disposal of either end closes the channel, data
+    written before disposal is still delivered to the other end.
+    """
+    TAG = b'\x00'  # first byte of channel frame (never starts packed message)
+    header = struct.Struct('>BBBI')  # tag, kind, opened by frame sender, identifier
+    credit = struct.Struct('>I')
+
+    KIND_DATA = 0
+    KIND_CREDIT = 1
+    KIND_CLOSE = 2
+
+    frame_size = 32768  # fits with header into "u16" codec frame
+    window_default = 1 << 20
+
+    def __init__(self, conn, ident, local, window=None, weight=None):
+        Stream.__init__(self)
+        self.initing()
+        self.conn = conn
+        self.ident = ident
+        self.local = local  # opened on this side of connection
+        self.window = window or self.window_default
+        self.weight = weight or 1
+
+        self.closed = False  # closed by peer
+        # receiving
+        self.recv_queue = deque()
+        self.recv_consumed = 0  # read but not yet granted to peer
+        self.recv_ev = Event()
+        # sending
+        self.send_queue = deque()  # data chunks, None marks close
+        self.send_offset = 0  # offset in the first chunk
+        self.send_credit = self.window
+        self.send_ev = Event()
+        self.send_vtime = 0  # scheduler virtual time
+
+    @property
+    def key(self):
+        return self.local, self.ident
+
+    @do_async
+    def read(self, size):
+        with self.reading:
+            while not self.recv_queue:
+                if self.closed or self.disposed:
+                    raise BrokenPipeError('channel is closed')
+                yield self.recv_ev
+            chunk = self.recv_queue.popleft()
+            if len(chunk) > size:
+                self.recv_queue.appendleft(chunk[size:])
+                chunk = chunk[:size]
+            self.recv_consumed += len(chunk)
+            if self.recv_consumed >= self.window // 2 and not self.closed:
+                self.conn.channel_control(self, self.KIND_CREDIT,
+                                          self.credit.pack(self.recv_consumed))
+                self.recv_consumed = 0
+            do_return(chunk)
+
+    @do_async
+    def write(self, data):
+        with self.writing:
+            while self.send_credit <= 0 and not (self.closed or self.disposed):
+                yield self.send_ev
+            if self.closed or self.disposed:
+                raise BrokenPipeError('channel is closed')
+            size = min(len(data), self.send_credit)
+            self.send_credit -= size
+            self.send_queue.append(data[:size] if size < len(data) else data)
+            self.conn.channel_schedule(self)
+            do_return(size)
+
+    @do_async
+    def flush(self):
+        while self.send_queue and not self.closed:
+            yield self.send_ev
+
+    def send_frame(self):
+        """Take next frame to be sent from send queue
+
+        Returns ``(kind, payload)`` pair.
+        """
+        chunk = self.send_queue[0]
+        if chunk is None:
+            self.send_queue.popleft()
+            return self.KIND_CLOSE, b''
+        offset = self.send_offset
+        frame = chunk[offset:offset + self.frame_size]
+        if offset + len(frame) >= len(chunk):
+            self.send_queue.popleft()
+            self.send_offset = 0
+        else:
+            self.send_offset += len(frame)
+        return self.KIND_DATA, frame
+
+    def recv_frame(self, kind, frame):
+        """Handle frame received from peer
+        """
+        if kind == self.KIND_DATA:
+            if self.disposed:
+                return  # data sent before peer received close
+            self.recv_queue.append(frame[self.header.size:])
+            self.recv_ev(None)
+        elif kind == self.KIND_CREDIT:
+            self.send_credit += self.credit.unpack_from(frame, self.header.size)[0]
+            self.send_ev(None)
+        elif kind == self.KIND_CLOSE:
+            self.closed = True
+            self.send_queue.clear()
+            if self.disposed:
+                self.conn.channels.pop(self.key, None)
+            self.recv_ev(None)
+            self.send_ev(None)
+        else:
+            raise ValueError('unknown channel frame kind: {}'.format(kind))
+
+    def dispose(self):
+        if Stream.dispose(self):
+            self.recv_queue.clear()
+            if self.closed:
+                self.conn.channels.pop(self.key, None)
+            else:
+                self.send_queue.append(None)
+                self.conn.channel_schedule(self)
+            self.recv_ev(None)
+            self.send_ev(None)
+            return True
+        return False
+
+    def __str__(self):
+        return '{}(ident:{}, local:{}, state:{})'.format(
+            type(self).__name__, self.ident, self.local, self.state.state_name())
@@ -0,0 +1,139 @@
+"""Connection message compression
+
+Compressors keep streaming state between messages of connection, so messages
+must be decompressed in order they were compressed, but small similar messages
+compress well. Compressors of optional modules (zstd, lz4) are only registered
+if these modules can be imported.
+"""
+import zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+__all__ = ('Compressor', 'compressor_register', 'compressor_names', 'compressor_create',)
+
+
+class Compressor(object):
+    """Streaming message compressor
+
+    Compressed message is prefixed with compressor's ``tag`` byte, which must
+    not start any uncompressed message.
+    """
+    name = None
+    tag = None
+
+    def compress(self, data):
+        """Compress message
+        """
+        raise NotImplementedError()
+
+    def decompress(self, data):
+        """Decompress message compressed by compressor of other side
+        """
+        raise NotImplementedError()
+
+    def __str__(self):
+        return '{}()'.format(type(self).__name__)
+
+    def __repr__(self):
+        return str(self)
+
+
+class ZlibCompressor(Compressor):
+    """Zlib compressor
+
+    Each message is flushed with ``Z_SYNC_FLUSH``, so it can be decompressed
+    as soon as it is received.
+    """
+    name = 'zlib'
+    tag = b'\xff'
+    level = 6
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(self.level)
+        self.decompressor = zlib.decompressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    """Zstandard compressor
+
+    Each message is flushed as separate block of the same frame.
+    """
+    name = 'zstd'
+    tag = b'\xfe'
+
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor().compressobj()
+        self.decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def compress(self, data):
+        return (self.compressor.compress(data) +
+                self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+
+class LZ4Compressor(Compressor):
+    """LZ4 compressor
+
+    Each message is compressed as separate frame (no state is kept).
+    """
+    name = 'lz4'
+    tag = b'\xfd'
+
+    def compress(self, data):
+        return lz4_frame.compress(data)
+
+    def decompress(self, data):
+        return lz4_frame.decompress(data)
+
+
+def compressor_register(compressor_type):
+    """Register compressor type
+
+    Returns registered compressor type.
+    """
+    if compressor_tags.get(compressor_type.tag, compressor_type.name) != compressor_type.name:
+        raise ValueError('compressor tag is already used: {!r}'.format(compressor_type.tag))
+    compressors[compressor_type.name] = compressor_type
+    compressor_tags[compressor_type.tag] = compressor_type.name
+    return compressor_type
+
+
+def compressor_names():
+    """Names of available compressors in order of preference
+    """
+    names = [name for name in compressors_order if name in compressors]
+    names.extend(sorted(name for name in compressors if name not in compressors_order))
+    return names
+
+
+def compressor_create(name):
+    """Create compressor by its registered name
+    """
+    compressor_type = compressors.get(name)
+    if compressor_type is None:
+        raise ValueError('unknown compressor: {}'.format(name))
+    return compressor_type()
+
+
+compressors = {}  # name -> compressor type
+compressor_tags = {}  # tag -> name
+compressors_order = ('zstd', 'lz4', 'zlib')
+compressor_register(ZlibCompressor)
+if zstandard is not None:
+    compressor_register(ZstdCompressor)
+if lz4_frame is not None:
+    compressor_register(LZ4Compressor)
@@ -1,13 +1,12 @@
 """Connection
 """
-import io
 import sys
 import textwrap
-from pickle import Pickler, Unpickler
-from ..hub import Hub, Sender, pair
-from ..proxy import Proxy
-from ..expr import ExprEnv, Const, Arg
-from ...uniform import reraise
+from .wire import PickleWire, InterruptError
+from ..hub import Hub, pair
+from ..proxy import Proxy, proxy_request
+from ..expr import Expr, ExprEnv, Const, Arg, Cancel
+from ...uniform import reraise, BrokenPipeError
 from ...event import Event
 from ...core import Core
 from ...monad import Result, Cont, do_async, do_return
@@ -19,6 +18,16 @@ __all__ = ('Connection',)
 
 class Connection(object):
     """Connection
+
+    Messages are packed with ``wire`` codec type (``PickleWire`` by default),
+    both sides of the connection must use the same wire codec. If ``batch`` is
+    enabled, messages sent during the same core iteration are sent as single
+    ``BatchExpr`` message. Senders of messages waiting for reply are tracked
+    (``inflight`` is their count), and fail with ``BrokenPipeError`` once
+    connection is disposed. Reply sender of receiver handler (not reply slot) is
+    tracked until the handler is unsubscribed. Remote requests are tracked
+    until replied, request canceled by ``Cancel`` message is abandoned and its
+    reply is not sent.
     """
     STATE_INIT = 0
     STATE_CONNI = 1
@@ -32,7 +41,7 @@ class Connection(object):
     })
     STATE_NAMES = ('not-connected', 'connecting', 'connected', 'disposed',)
 
-    def __init__(self, hub=None, core=None):
+    def __init__(self, hub=None, core=None, wire=None, batch=None):
         self.hub = hub or Hub.local()
         self.core = core or Core.local()
         self.flags = {}
@@ -44,52 +53,17 @@ class Connection(object):
 
         ## dispose
         self.dispose = CompDisp()
+        self.dispose.add_action(lambda: self.replies_fail())
         self.dispose.add_action(lambda: self.do_disconnect())
         self.dispose.add(self.receiver)
         self.dispose.add_action(lambda: self.state(self.STATE_DISP))
 
         ## marshaling
-        PACK_ROUTE = 1
-        PACK_UNROUTE = 2
-
-        class pickler_type(Pickler):
-            def persistent_id(this, target):
-                if isinstance(target, Sender):
-                    if target.hub is not self.hub:
-                        raise ValueError('sender\'s hub must match hub used by connection')
-                    if target.addr == self.sender.addr:
-                        # This sender was previously received from this connection
-                        # so it must not be routed again.
-                        return PACK_UNROUTE, target.addr.unroute()
-                    else:
-                        # Sender must be routed
-                        return PACK_ROUTE, target.addr
-                return None
-
-        self.pickler_type = pickler_type
-
-        class unpickler_type(Unpickler):
-            def persistent_load(this, state):
-                pack, args = state
-                if pack == PACK_ROUTE:
-                    return Sender(self.hub, args.route(self.sender.addr))
-                elif pack == PACK_UNROUTE:
-                    return Sender(self.hub, args if args else self.sender.addr)
-                else:
-                    raise ValueError('Unknown pack type: {}'.format(pack))
-
-            def find_class(this, modname, name):
-                modname = self.module_map.get(modname, modname)
-                module = sys.modules.get(modname, None)
-                if module is None:
-                    __import__(modname)
-                    module = sys.modules[modname]
-                if getattr(module, '__initializing__', False):
-                    # Module is being imported. Interrupt unpickling.
-                    raise InterruptError()
-                return getattr(module, name)
-
-        self.unpickler_type = unpickler_type
+        self.wire = (wire or PickleWire)(self)
+        self.batch = bool(batch)
+        self.batch_queue = []
+        self.replies = {}  # address -> sender waiting for reply
+        self.requests = {}  # reply address -> cancel function of remote request
 
     def __call__(self, target):
         """Create proxy object from provided pickle-able constant.
@@ -105,11 +79,24 @@ class Connection(object):
         self.state(self.STATE_CONNI)
         try:
             def send(msg, dst, src):
-                stream = io.BytesIO()
-                self.pickler_type(stream, -1).dump((msg, dst, src))
-                self.do_send(stream.getvalue())
+                self.do_send(pack(msg, dst, src))
+                if src is not None:
+                    replies[tuple(src.addr)] = src
+                elif type(msg) is Cancel:
+                    replies.pop(tuple(msg.src.addr), None)
                 return True
-            self.receiver(send)
+
+            def send_batch(msg, dst, src):
+                queue.append((msg, dst, src))
+                if src is not None:
+                    replies[tuple(src.addr)] = src
+                elif type(msg) is Cancel:
+                    replies.pop(tuple(msg.src.addr), None)
+                if len(queue) == 1:
+                    self.core.schedule()(lambda _: self.batch_flush())
+                return True
+            pack, queue, replies = self.wire.pack, self.batch_queue, self.replies
+            self.receiver(send_batch if self.batch else send)
             yield self.do_connect(target)
             if self.state.state != self.STATE_DISP:
                 self.state(self.STATE_CONND)
@@ -133,6 +120,32 @@ class Connection(object):
         """
         raise NotImplementedError()
 
+    def batch_flush(self):
+        """Send messages queued by batching connection
+        """
+        queue = self.batch_queue[:]
+        del self.batch_queue[:]
+        if not queue or self.disposed:
+            return
+        if len(queue) > 1:
+            try:
+                template = self.wire.template
+                batch = BatchExpr([(template(msg), dst, src) for msg, dst, src in queue])
+                self.do_send(self.wire.pack(batch, self.sender.addr, None))
+                return
+            except Exception:
+                pass  # send messages one by one, to fail only not pack-able ones
+        for msg, dst, src in queue:
+            try:
+                self.do_send(self.wire.pack(msg, dst, src))
+            except Exception:
+                error = Result.from_current_error()
+                if src is None:
+                    error.trace()
+                else:
+                    self.replies.pop(tuple(src.addr), None)
+                    src.send(error)
+
     @do_async
     def do_recv(self, msg_raw):
         """Handle remote packed message
@@ -143,26 +156,9 @@ class Connection(object):
         yield self.core.schedule()
         self.recv_ev(msg_raw)
 
-        msg_env = ExprEnv(Cont, conn=self)
         while True:
-            src, unpacked = None, False
             try:
-                msg, dst, src = self.unpickler_type(io.BytesIO(msg_raw)).load()
-                dst = dst.unroute()  # strip remote connection address
-                unpacked = True
-
-                if dst:
-                    # After striping remote connection address, destination
-                    # is not empty so it needs to be routed.
-                    self.hub.send(msg, dst, src)
-                else:
-                    if msg is None:  # pragma: no cover (covered by remote path)
-                        self.dispose()
-                        return
-                    if src is None:
-                        yield msg(msg_env)
-                    else:
-                        src.send((yield msg(msg_env)))
+                msg, dst, src = self.wire.unpack(msg_raw)
                 break
             except InterruptError:  # pragma: no cover (covered by remote path)
                 # Required module is being imported right now. Wait for pending
@@ -173,15 +169,76 @@ class Connection(object):
                 yield self.core.schedule()
             except Exception:  # pragma: no cover (covered by remote path)
                 if not self.disposed:
-                    err = Result.from_current_error()
+                    Result.from_current_error().trace(banner=lambda: textwrap.dedent("""\
+                        [connection] impossible to send error response to message:
+                          raw:{}""".format(msg_raw)))
+                return
+        yield self.dispatch(msg, dst, src)
+
+    @do_async
+    def dispatch(self, msg, dst, src):
+        """Dispatch unpacked remote message
+        """
+        try:
+            dst = dst.unroute()  # strip remote connection address
+            if dst:
+                # After striping remote connection address, destination
+                # is not empty so it needs to be routed.
+                reply = self.replies.pop(tuple(dst), None) if self.replies else None
+                if dst[-1] >= Hub.SLOT_BASE:
+                    # late reply to released (i.g. timed out) slot is dropped
+                    self.hub.try_send(msg, dst, src)
+                else:
+                    self.hub.send(msg, dst, src)
+                    if reply is not None and dst in self.hub.handlers:
+                        # Streaming receiver (i.g. iterator proxy) is still
+                        # waiting for replies, connection may have been closed
+                        # by the handler itself.
+                        if self.disposed:
+                            reply.try_send(Result.from_exception(
+                                BrokenPipeError('connection is closed')))
+                        else:
+                            self.replies.setdefault(tuple(dst), reply)
+            else:
+                if msg is None:  # pragma: no cover (covered by remote path)
+                    self.dispose()
+                    return
+                env = ExprEnv(Cont, conn=self, requests=self.requests)
+                if getattr(msg, 'sync', False):
+                    # synchronous expression is evaluated directly
+                    value = msg.eval(env)
                     if src is not None:
-                        src.send(err)
-                    else:
-                        err.trace(banner=lambda: textwrap.dedent("""\
-                            [connection] impossible to send error response to message:
-                              {}""".format('raw:{}'.format(msg_raw) if not unpacked else
-                                           'msg:{} dst:{}'.format(msg, dst))))
-                break
+                        src.send(value)
+                elif src is None:
+                    yield msg(env)
+                else:
+                    yield proxy_request(msg(env), src, self.requests)
+        except Exception:  # pragma: no cover (covered by remote path)
+            if not self.disposed:
+                err = Result.from_current_error()
+                if src is not None:
+                    src.send(err)
+                else:
+                    err.trace(banner=lambda: textwrap.dedent("""\
+                        [connection] impossible to send error response to message:
+                          msg:{} dst:{}""".format(msg, dst)))
+
+    @property
+    def inflight(self):
+        """Number of sent messages waiting for reply
+        """
+        return len(self.replies)
+
+    def replies_fail(self):
+        """Fail senders waiting for reply
+        """
+        if not self.replies:
+            return
+        replies = list(self.replies.values())
+        self.replies.clear()
+        error = Result.from_exception(BrokenPipeError('connection is closed'))
+        for src in replies:
+            src.try_send(error)
 
     def __monad__(self):
         return self.connect()
@@ -230,6 +287,29 @@ class ConnectionProxy(Proxy):
                                       self._sender.addr if self._sender else None)
 
 
-class InterruptError (BaseException):
-    """Interrupt helper exception type
+class BatchExpr(Expr):
+    """Batch of messages
+
+    Dispatches ``(msg, dst, src)`` messages in order with connection
+    from environment.
     """
+    __slots__ = ('msgs',)
+    sync = True
+
+    def __init__(self, msgs):
+        self.msgs = msgs
+
+    def __call__(self, env):
+        return Expr.unit(self.eval(env))(env)
+
+    def eval(self, env):
+        dispatch = env.args['conn'].dispatch
+        for msg, dst, src in self.msgs:
+            dispatch(msg, dst, src)()
+
+    def __reduce__(self):
+        return BatchExpr, (self.msgs,)
+
+    def repr(self):
+        # pragma: no cover
+        return 'Batch(len:{})'.format(len(self.msgs))
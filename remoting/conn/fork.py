@@ -20,8 +20,12 @@ class ForkConnection(StreamConnection):
 
     Connection with forked and exec-ed process via two pipes.
     """
-    def __init__(self, command=None, environ=None, bufsize=None, hub=None, core=None):
-        StreamConnection.__init__(self, hub=hub, core=core)
+    def __init__(self, command=None, environ=None, bufsize=None, cork=None,
+                 codec=None, wire=None, batch=None, compress=None, keepalive=None,
+                 hub=None, core=None):
+        StreamConnection.__init__(self, hub=hub, core=core, cork=cork, codec=codec,
+                                  wire=wire, batch=batch, compress=compress,
+                                  keepalive=keepalive)
         self.bufsize = bufsize
         self.command = [sys.executable, '-'] if command is None else command
         self.environ = environ
@@ -55,7 +59,8 @@ class ForkConnection(StreamConnection):
         # send payload
         payload = (BootImporter.from_modules().bootstrap
                   (fork_conn_init, writer.child_fd, reader.child_fd,
-                   self.bufsize).encode())
+                   self.bufsize, self.cork, self.codec, type(self.wire),
+                   self.batch, self.compress, self.keepalive).encode())
         self.process.stdin.write_schedule(payload)
         yield self.process.stdin.flush_and_dispose()
 
@@ -72,12 +77,14 @@ class ForkConnection(StreamConnection):
         self.flags['type'] = 'fork'
 
 
-def fork_conn_init(reader_fd, writer_fd, bufsize):  # pragma: no cover
+def fork_conn_init(reader_fd, writer_fd, bufsize, cork, codec, wire, batch,
+                   compress, keepalive):  # pragma: no cover
     """Fork connection initialization function
     """
     with Core.local() as core:
         # initialize connection
-        conn = StreamConnection(core=core)
+        conn = StreamConnection(core=core, cork=cork, codec=codec, wire=wire,
+                                batch=batch, compress=compress, keepalive=keepalive)
         conn.flags['pid'] = os.getpid()
         conn.flags['type'] = 'fork'
         conn.dispose.add_action(lambda: core.schedule()(lambda _: core.dispose()))
@@ -30,8 +30,11 @@ class ShellConnection(StreamConnection):
     is untouched.
     """
     def __init__(self, command=None, escape=None, py_exec=None,
-                 environ=None, bufsize=None, hub=None, core=None):
-        StreamConnection.__init__(self, hub=hub, core=core)
+                 environ=None, bufsize=None, cork=None, codec=None, wire=None,
+                 batch=None, compress=None, keepalive=None, hub=None, core=None):
+        StreamConnection.__init__(self, hub=hub, core=core, cork=cork, codec=codec,
+                                  wire=wire, batch=batch, compress=compress,
+                                  keepalive=keepalive)
 
         self.bufsize = bufsize
         self.py_exec = py_exec or sys.executable
@@ -75,7 +78,9 @@ class ShellConnection(StreamConnection):
 
         # send boot data
         boot_data = (BootImporter.from_modules().bootstrap(
-                     shell_conn_init, self.bufsize).encode('utf-8'))
+                     shell_conn_init, self.bufsize, self.cork, self.codec,
+                     type(self.wire), self.batch, self.compress,
+                     self.keepalive).encode('utf-8'))
         self.process.stdin.write_bytes(boot_data)
         yield self.process.stdin.flush()
 
@@ -92,7 +97,8 @@ class ShellConnection(StreamConnection):
         self.flags['host'] = yield self(socket.gethostname)()
 
 
-def shell_conn_init(bufsize):  # pragma: no cover
+def shell_conn_init(bufsize, cork, codec, wire, batch, compress,
+                    keepalive):  # pragma: no cover
     """Shell connection initialization function
     """
     # Make sure standard output and input won't be used. As it is now used
@@ -105,7 +111,8 @@ def shell_conn_init(bufsize):  # pragma: no cover
 
     with Core.local() as core:
         # initialize connection
-        conn = StreamConnection(core=core)
+        conn = StreamConnection(core=core, cork=cork, codec=codec, wire=wire,
+                                batch=batch, compress=compress, keepalive=keepalive)
         conn.flags['pid'] = os.getpid()
         conn.flags['host'] = socket.gethostname()
         conn.dispose.add_action(lambda: core.schedule()(lambda _: core.dispose()))
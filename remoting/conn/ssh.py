@@ -11,7 +11,9 @@ class SSHConnection(ShellConnection):
     """SSH Connection
     """
     def __init__(self, host, port=None, ssh_identity=None, ssh_exec=None,
-                 py_exec=None, environ=None, bufsize=None, hub=None, core=None):
+                 py_exec=None, environ=None, bufsize=None, cork=None, codec=None,
+                 wire=None, batch=None, compress=None, keepalive=None, hub=None,
+                 core=None):
         self.host = host
         self.port = port
         self.ssh_identity = ssh_identity
@@ -21,17 +23,20 @@ class SSHConnection(ShellConnection):
         command = [
             self.ssh_exec,          # command
             '-A',                   # forward ssh agent
-            '-C',                   # enable compression
             '-T',                   # disable pseudo-tty allocation
             '-o', 'BatchMode=yes',  # never ask password
             self.host,              # host
         ]
+        if not compress:
+            command.insert(2, '-C')  # enable ssh compression
         command.extend(('-i', self.ssh_identity) if self.ssh_identity else [])
         command.extend(('-p', self.port) if self.port else [])
 
         ShellConnection.__init__(self, command=command, escape=True,
                                  py_exec=py_exec, environ=environ,
-                                 bufsize=bufsize, hub=hub, core=core)
+                                 bufsize=bufsize, cork=cork, codec=codec, wire=wire,
+                                 batch=batch, compress=compress, keepalive=keepalive,
+                                 hub=hub, core=core)
 
     def connect(self):
         return ShellConnection.connect(self, self.host)
@@ -1,7 +1,12 @@
 """Stream connection
 """
+import struct
+from time import time
 from .conn import Connection
-from ...monad import do_async
+from .channel import Channel
+from .compress import compressor_names, compressor_create, compressor_tags
+from ...monad import do_async, do_return
+from ...stream import LineCodec, FixedCodec, codec_get
 from ...uniform import CanceledError, BrokenPipeError
 
 __all__ = ('StreamConnection',)
@@ -9,11 +14,61 @@ __all__ = ('StreamConnection',)
 
 class StreamConnection(Connection):
     """Stream based connected
+
+    If ``cork`` is enabled, messages sent during the same core iteration are
+    flushed together instead of flushing after each message. If ``cork`` is a
+    number, messages are coalesced for at most that many seconds. Messages are
+    framed with ``codec`` (codec or its registered name, "u32" by default),
+    both sides of the connection must use the same codec. Codec must be binary
+    safe (delimited "line" codec is rejected), and "u16" codec limits messages
+    to 64KiB (sending larger message fails). Bulk data channels created with
+    ``channel`` are multiplexed with messages.
+
+    If ``compress`` is enabled (``True`` or compressor name), compressor supported
+    by both sides is negotiated on connect, and messages larger then
+    ``compress_min`` bytes are compressed.
+
+    If ``keepalive`` interval (in seconds) is set, ping is sent every interval
+    and round trip time is measured from its pong (``rtt`` is smoothed round
+    trip time). Connection is disposed if nothing is received during
+    ``keepalive_missed`` consecutive intervals.
     """
-    def __init__(self, hub=None, core=None):
-        Connection.__init__(self, hub=hub, core=core)
+    compress_min = 256
+    keepalive_missed = 3
+
+    KEEPALIVE_TAG = b'\xfc'  # first byte of ping and pong frames
+    KEEPALIVE_PING = 0
+    KEEPALIVE_PONG = 1
+    keepalive_header = struct.Struct('>cBd')  # tag, kind, time
+
+    def __init__(self, hub=None, core=None, cork=None, codec=None, wire=None,
+                 batch=None, compress=None, keepalive=None):
+        codec = codec_get(codec or 'u32')
+        if isinstance(codec, (LineCodec, FixedCodec)):
+            raise ValueError('connection requires binary safe codec: {}'.format(codec))
+        Connection.__init__(self, hub=hub, core=core, wire=wire, batch=batch)
         self.reader = None
         self.writer = None
+        self.cork = cork or False
+        self.codec = codec
+        self.compress = compress
+        self.compressor = None  # negotiated compressor of sent messages
+        self.decompressors = {}  # tag -> compressor of received messages
+
+        self.channels = {}  # (local, ident) -> channel
+        self.channels_ident = 0
+        self.channels_ready = set()
+        self.channels_vtime = 0
+        self.channels_sending = False
+
+        self.keepalive = keepalive
+        self.keepalive_recv = False  # frames were received since last ping
+        self.rtt = None
+
+        self.frame_handlers = {  # tag -> handler of not message frames
+            Channel.TAG: self.channel_recv,
+            self.KEEPALIVE_TAG: self.keepalive_frame,
+        }
 
     @do_async
     def do_connect(self, target):
@@ -26,13 +81,24 @@ class StreamConnection(Connection):
             try:
                 if self.reader.disposed:
                     return
-                # Begin read next message before dispatching current one, as
+                # Begin read next messages batch before dispatching current one, as
                 # connection may be closed during dispatching and input stream
                 # became disposed.
-                msg_next = self.reader.read_bytes().future()
+                frame_handlers = self.frame_handlers
+                msgs_next = self.reader.read_frames(self.codec).future()
                 while True:
-                    msg, msg_next = (yield msg_next), self.reader.read_bytes().future()
-                    self.do_recv(msg)()
+                    msgs, msgs_next = (yield msgs_next), self.reader.read_frames(self.codec).future()
+                    self.keepalive_recv = True
+                    for msg in msgs:
+                        tag = msg[:1]
+                        if tag in compressor_tags:
+                            msg = self.decompress(msg)
+                            tag = msg[:1]
+                        frame_handler = frame_handlers.get(tag)
+                        if frame_handler is None:
+                            self.do_recv(msg)()
+                        else:
+                            frame_handler(msg)
             except (CanceledError, BrokenPipeError):
                 pass
             finally:
@@ -40,14 +106,183 @@ class StreamConnection(Connection):
 
         self.reader, self.writer = target
         recv_coro()()
+        if self.compress:
+            yield self.compress_negotiate()
+
+    @do_async
+    def connect(self, target=None):
+        yield Connection.connect(self, target)
+        if self.keepalive:
+            # started once connected, as peer may be slow to initialize
+            self.keepalive_coro()()
+        do_return(self)
+
+    @do_async
+    def keepalive_coro(self):
+        """Send pings and dispose connection if peer is not responding
+        """
+        missed = 0
+        try:
+            while not self.disposed:
+                self.keepalive_recv = False
+                self.do_send(self.keepalive_header.pack(self.KEEPALIVE_TAG,
+                                                        self.KEEPALIVE_PING, time()))
+                yield self.core.sleep(self.keepalive)
+                if self.keepalive_recv:
+                    missed = 0
+                else:
+                    missed += 1
+                    if missed >= self.keepalive_missed:
+                        self.dispose()
+        except (CanceledError, BrokenPipeError):
+            pass
+
+    def keepalive_frame(self, frame):
+        """Handle received ping or pong
+        """
+        _, kind, stamp = self.keepalive_header.unpack(frame)
+        if kind == self.KEEPALIVE_PING:
+            self.do_send(self.keepalive_header.pack(self.KEEPALIVE_TAG,
+                                                    self.KEEPALIVE_PONG, stamp))
+        elif kind == self.KEEPALIVE_PONG:
+            rtt = time() - stamp
+            self.rtt = rtt if self.rtt is None else self.rtt + (rtt - self.rtt) / 8.0
+        else:
+            raise ValueError('unknown keepalive frame kind: {}'.format(kind))
+
+    @do_async
+    def compress_negotiate(self):
+        """Choose compressor of sent messages supported by both sides
+        """
+        names = compressor_names()
+        if self.compress is not True:
+            names = [self.compress] if self.compress in names else []
+        if names:
+            remote_names = yield self(compressor_names)()
+            for name in names:
+                if name in remote_names:
+                    self.compressor = compressor_create(name)
+                    break
+
+    def decompress(self, msg):
+        """Decompress received message
+        """
+        tag = msg[:1]
+        decompressor = self.decompressors.get(tag)
+        if decompressor is None:
+            decompressor = compressor_create(compressor_tags[tag])
+            self.decompressors[tag] = decompressor
+        return decompressor.decompress(msg[1:])
 
     def do_disconnect(self):
+        for channel in tuple(self.channels.values()):
+            channel.recv_frame(Channel.KIND_CLOSE, b'')
+            channel.dispose()
         if self.reader is not None:
             self.reader.dispose()
         if self.writer is not None:
             self.writer.dispose()
 
     def do_send(self, msg):
-        self.writer.write_bytes(msg)
-        self.writer.flush()()
+        compressor = self.compressor
+        if compressor is not None and len(msg) >= self.compress_min:
+            msg = compressor.tag + compressor.compress(msg)
+        self.writer.write_frames(self.codec, (msg,))
+        if self.cork:
+            self.writer.flush_schedule(None if self.cork is True else self.cork)
+        else:
+            self.flush_coro()()
         return True
+
+    @do_async
+    def flush_coro(self):
+        """Flush writer, closed connection is not an error
+        """
+        try:
+            yield self.writer.flush()
+        except (CanceledError, BrokenPipeError):
+            pass
+
+    def channel(self, weight=None, window=None):
+        """Create bulk data channel
+
+        Other end of the channel is created when it is sent over this
+        connection. Channel with larger ``weight`` gets proportionally larger
+        share of bandwidth, ``window`` is the maximum amount of data in flight.
+        """
+        self.channels_ident += 1
+        channel = Channel(self, self.channels_ident, True, window, weight)
+        self.channels[channel.key] = channel
+        return channel
+
+    def channel_load(self, local, ident, window=None, weight=None):
+        """Find channel by its key or create other end of remote channel
+        """
+        channel = self.channels.get((local, ident))
+        if channel is None:
+            if local:
+                raise ValueError('channel is closed: {}'.format(ident))
+            channel = Channel(self, ident, local, window, weight)
+            self.channels[channel.key] = channel
+        elif window is not None:
+            # channel was created by frames received before its reference
+            channel.window = window
+            channel.weight = weight or 1
+        return channel
+
+    def channel_recv(self, frame):
+        """Handle received channel frame
+        """
+        _, kind, opener, ident = Channel.header.unpack_from(frame)
+        channel = self.channels.get((not opener, ident))
+        if channel is None:
+            if not opener:
+                return  # frame for already closed local channel
+            channel = self.channel_load(False, ident)
+        channel.recv_frame(kind, frame)
+
+    def channel_control(self, channel, kind, payload):
+        """Send channel control frame bypassing channel scheduler
+        """
+        self.do_send(Channel.header.pack(0, kind, channel.local, channel.ident) + payload)
+
+    def channel_schedule(self, channel):
+        """Schedule channel with pending frames to be sent
+        """
+        if channel in self.channels_ready or self.disposed:
+            return
+        channel.send_vtime = max(channel.send_vtime, self.channels_vtime)
+        self.channels_ready.add(channel)
+        if not self.channels_sending:
+            self.channels_send()()
+
+    @do_async
+    def channels_send(self):
+        """Send frames of scheduled channels
+
+        Channel with the smallest virtual time is sent next, its virtual time is
+        advanced by frame size divided by channel weight (stride scheduling).
+        Each frame is flushed separately, so messages sent meanwhile are
+        interleaved with channels frames.
+        """
+        header, ready = Channel.header, self.channels_ready
+        self.channels_sending = True
+        try:
+            while ready and not self.disposed:
+                channel = min(ready, key=lambda channel: channel.send_vtime)
+                if not channel.send_queue:
+                    ready.discard(channel)
+                    continue
+                kind, frame = channel.send_frame()
+                if not channel.send_queue:
+                    ready.discard(channel)
+                self.channels_vtime = channel.send_vtime
+                channel.send_vtime += (header.size + len(frame)) / float(channel.weight)
+                self.do_send(header.pack(0, kind, channel.local, channel.ident) + frame)
+                channel.send_ev(None)
+                yield self.writer.flush()
+                yield self.core.schedule()
+        except (CanceledError, BrokenPipeError):
+            pass
+        finally:
+            self.channels_sending = False
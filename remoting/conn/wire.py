@@ -0,0 +1,342 @@
+"""Connection wire codecs
+
+Wire codec packs ``(msg, dst, src)`` messages sent over connection to bytes
+and unpacks them back. Codec is created per connection and reuses its pickler
+between messages. Expressions are interned, template of expression is sent
+only once and later referenced by its identifier.
+"""
+import io
+import sys
+import struct
+from pickle import Pickler, Unpickler, HIGHEST_PROTOCOL
+from .channel import Channel
+from ..hub import Hub, Sender, Address
+from ..expr import Expr, Deadline, TemplateExpr
+from ...uniform import PY2
+
+if PY2:
+    from copy_reg import dispatch_table
+else:
+    from copyreg import dispatch_table
+
+__all__ = ('Wire', 'PickleWire', 'StructWire',)
+
+
+class Wire(object):
+    """Connection wire codec base
+
+    Routed addresses of received senders are cached (up to ``routes_max``),
+    except reply slot addresses which are used only once.
+    """
+    routes_max = 4096
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.routes = {}  # address -> routed address
+
+    def pack(self, msg, dst, src):
+        """Pack message
+        """
+        raise NotImplementedError()
+
+    def unpack(self, data):
+        """Unpack message
+
+        Returns ``(msg, dst, src)`` tuple.
+        """
+        raise NotImplementedError()
+
+    def template(self, msg):
+        """Intern message expression
+
+        Returns message to be packed instead of provided one.
+        """
+        return msg
+
+    def sender_reduce(self, sender):
+        """Reduce sender to routing flag and address
+        """
+        if sender.hub is not self.conn.hub:
+            raise ValueError('sender\'s hub must match hub used by connection')
+        addr = sender.addr
+        if addr == self.conn.sender.addr:
+            # This sender was previously received from this connection
+            # so it must not be routed again.
+            return False, addr[:-1]
+        else:
+            # Sender must be routed
+            return True, tuple(addr)
+
+    def sender_load(self, route, addr):
+        """Restore sender from routing flag and address
+        """
+        if route:
+            if addr[-1] >= Hub.SLOT_BASE:
+                # reply slot addresses are used only once
+                return Sender(self.conn.hub, Address(addr + self.conn.sender.addr))
+            routed = self.routes.get(addr)
+            if routed is None:
+                if len(self.routes) >= self.routes_max:
+                    self.routes.clear()
+                routed = Address(addr + self.conn.sender.addr)
+                self.routes[addr] = routed
+            return Sender(self.conn.hub, routed)
+        return Sender(self.conn.hub, Address(addr) if addr else self.conn.sender.addr)
+
+    def channel_reduce(self, channel):
+        """Reduce channel to its key and parameters
+        """
+        if channel.conn is not self.conn:
+            raise ValueError('channel can only be sent over its connection')
+        return channel.local, channel.ident, channel.window, channel.weight
+
+    def channel_load(self, local, ident, window, weight):
+        """Restore other end of the channel
+        """
+        return self.conn.channel_load(not local, ident, window, weight)
+
+    def __str__(self):
+        return '{}()'.format(type(self).__name__)
+
+    def __repr__(self):
+        return str(self)
+
+
+class PickleWire(Wire):
+    """Pickle wire codec
+
+    Whole message is pickled with pickler reused between messages. Senders are
+    and channels are reduced with pickler's dispatch table (so there is no python
+    call for each pickled object) to ``wire_sender`` and ``wire_channel`` globals,
+    which are substituted on unpickling.
+    Expressions are sent as template identifier and parameters, template itself
+    is sent along with the first message which uses it.
+    """
+    templates_max = 1024
+
+    def __init__(self, conn):
+        Wire.__init__(self, conn)
+        self.stream = io.BytesIO()
+        self.dumping = False
+        self.templates = {}  # template -> identifier
+        self.templates_sent = set()
+        self.templates_pending = set()  # sent by message being packed
+        self.templates_recv = {}  # identifier -> template
+
+        reducers = {
+            Sender: lambda sender: (wire_sender, self.sender_reduce(sender)),
+            Channel: lambda channel: (wire_channel, self.channel_reduce(channel)),
+        }
+
+        if PY2:
+            def save(reduce):
+                return lambda pickler, target: pickler.save_reduce(obj=target,
+                                                                   *reduce(target))
+
+            class pickler_type(Pickler):
+                dispatch = Pickler.dispatch.copy()
+                dispatch.update((type, save(reduce)) for type, reduce in reducers.items())
+            self.pickler = pickler_type(self.stream, HIGHEST_PROTOCOL)
+        else:
+            self.pickler = Pickler(self.stream, HIGHEST_PROTOCOL)
+            self.pickler.dispatch_table = dispatch_table.copy()
+            self.pickler.dispatch_table.update(reducers)
+
+        loaders = {
+            'wire_sender': (wire_sender, self.sender_load),
+            'wire_channel': (wire_channel, self.channel_load),
+            'wire_template': (wire_template, self.template_load),
+            'wire_template_define': (wire_template_define, self.template_define),
+        }
+
+        class unpickler_type(Unpickler):
+            def find_class(this, modname, name):
+                modname = conn.module_map.get(modname, modname)
+                module = sys.modules.get(modname, None)
+                if module is None:
+                    __import__(modname)
+                    module = sys.modules[modname]
+                if getattr(module, '__initializing__', False):
+                    # Module is being imported. Interrupt unpickling.
+                    raise InterruptError()
+                target = getattr(module, name)
+                loader = loaders.get(name)
+                if loader is not None and loader[0] is target:
+                    return loader[1]
+                return target
+
+        self.unpickler_type = unpickler_type
+
+    def pack(self, msg, dst, src):
+        return self.dump((self.template(msg), dst, src))
+
+    def unpack(self, data):
+        return self.load(io.BytesIO(data))
+
+    def dump(self, target):
+        """Pickle target with reusable pickler
+        """
+        if self.dumping:
+            # nested dump (i.g. from reduce method), use dedicated pickler
+            return PickleWire(self.conn).dump(target)
+        stream, pickler = self.stream, self.pickler
+        self.dumping = True
+        try:
+            pickler.dump(target)
+            self.templates_sent.update(self.templates_pending)
+            return stream.getvalue()
+        finally:
+            self.dumping = False
+            self.templates_pending.clear()
+            pickler.clear_memo()
+            stream.seek(0)
+            stream.truncate()
+
+    def load(self, stream):
+        """Unpickle object from stream
+        """
+        return self.unpickler_type(stream).load()
+
+    def template(self, msg):
+        if not isinstance(msg, Expr):
+            return msg
+        if type(msg) is Deadline:
+            return Deadline(self.template(msg.target), msg.deadline)
+        expr = TemplateExpr.from_expr(msg)
+        if expr is None:
+            return msg
+        ident = self.templates.get(expr.template)
+        if ident is None:
+            if len(self.templates) >= self.templates_max:
+                return expr
+            ident = len(self.templates)
+            self.templates[expr.template] = ident
+        return WireTemplate(self, ident, expr)
+
+    def template_define(self, ident, template):
+        """Register template received from other side
+        """
+        self.templates_recv[ident] = template
+        return ident
+
+    def template_load(self, ident, params):
+        """Create template expression from received template reference
+        """
+        template = self.templates_recv.get(ident)
+        if template is None:
+            raise ValueError('unknown template: {}'.format(ident))
+        return TemplateExpr(template, params)
+
+
+class StructWire(PickleWire):
+    """Struct envelope wire codec
+
+    Destination and source addresses are packed with struct header, and only
+    message itself is pickled.
+    """
+    header = struct.Struct('>BBB')  # destination size, source flag, source size
+    header_addrs = {}
+
+    SRC_NONE = 0
+    SRC_ROUTE = 1
+    SRC_UNROUTE = 2
+
+    def pack(self, msg, dst, src):
+        if src is None:
+            src_flag, src_addr = self.SRC_NONE, ()
+        else:
+            route, src_addr = self.sender_reduce(src)
+            src_flag = self.SRC_ROUTE if route else self.SRC_UNROUTE
+        return b''.join((self.header.pack(len(dst), src_flag, len(src_addr)),
+                         self.addrs_struct(len(dst) + len(src_addr)).pack(*(dst + src_addr)),
+                         self.dump(self.template(msg))))
+
+    def unpack(self, data):
+        dst_size, src_flag, src_size = self.header.unpack_from(data)
+        addrs_struct = self.addrs_struct(dst_size + src_size)
+        addrs = addrs_struct.unpack_from(data, self.header.size)
+        dst = Address(addrs[:dst_size])
+        if src_flag == self.SRC_NONE:
+            src = None
+        elif src_flag in (self.SRC_ROUTE, self.SRC_UNROUTE):
+            src = self.sender_load(src_flag == self.SRC_ROUTE, addrs[dst_size:])
+        else:
+            raise ValueError('unknown source flag: {}'.format(src_flag))
+        stream = io.BytesIO(data)
+        stream.seek(self.header.size + addrs_struct.size)
+        return self.load(stream), dst, src
+
+    @classmethod
+    def addrs_struct(cls, count):
+        addrs = cls.header_addrs.get(count)
+        if addrs is None:
+            addrs = struct.Struct('>{}Q'.format(count))
+            cls.header_addrs[count] = addrs
+        return addrs
+
+
+class WireTemplate(object):
+    """Reference to interned template expression
+    """
+    __slots__ = ('wire', 'ident', 'expr',)
+
+    def __init__(self, wire, ident, expr):
+        self.wire = wire
+        self.ident = ident
+        self.expr = expr
+
+    @property
+    def sync(self):
+        return self.expr.sync
+
+    def __reduce__(self):
+        wire, ident = self.wire, self.ident
+        if ident in wire.templates_sent or ident in wire.templates_pending:
+            return wire_template, (ident, self.expr.params)
+        # Template is defined during unpickling before parameters are unpickled,
+        # so it is registered even if unpickling of parameters is interrupted.
+        wire.templates_pending.add(ident)
+        return wire_template, (WireTemplateDefine(ident, self.expr.template),
+                               self.expr.params)
+
+
+class WireTemplateDefine(object):
+    """Template definition
+    """
+    __slots__ = ('ident', 'template',)
+
+    def __init__(self, ident, template):
+        self.ident = ident
+        self.template = template
+
+    def __reduce__(self):
+        return wire_template_define, (self.ident, self.template)
+
+
+def wire_sender(route, addr):
+    """Sender reduction global (substituted by wire codec on unpickling)
+    """
+    raise RuntimeError('sender must be unpickled by connection wire codec')
+
+
+def wire_channel(local, ident, window, weight):
+    """Channel reduction global (substituted by wire codec on unpickling)
+    """
+    raise RuntimeError('channel must be unpickled by connection wire codec')
+
+
+def wire_template(ident, params):
+    """Template reference global (substituted by wire codec on unpickling)
+    """
+    raise RuntimeError('template must be unpickled by connection wire codec')
+
+
+def wire_template_define(ident, template):
+    """Template definition global (substituted by wire codec on unpickling)
+    """
+    raise RuntimeError('template must be unpickled by connection wire codec')
+
+
+class InterruptError(BaseException):
+    """Interrupt helper exception type
+    """
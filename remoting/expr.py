@@ -2,12 +2,15 @@
 
 Expression is a Reader monad with embedded monad which type depends on
 environment provided during execution of expression. This module also provides
-expression derived serializable convenience types.
+expression derived serializable convenience types. Expressions without ``Bind``
+are synchronous and evaluated directly with ``eval`` method.
 """
-from ..monad import Monad, do, do_return
+from time import time
+from ..monad import Monad, Result, do, do_return
+from ..uniform import TimeoutError
 
 __all__ = ('Expr', 'ExprEnv', 'Env', 'Const', 'Arg', 'Call', 'GetAttr',
-           'GetItem', 'If', 'Bind',)
+           'GetItem', 'If', 'Bind', 'Deadline', 'Cancel', 'TemplateExpr',)
 
 
 class Expr(Monad):
@@ -17,6 +20,7 @@ class Expr(Monad):
     environment provided during execution of expression.
     """
     __slots__ = ('run',)
+    sync = False  # expression can be evaluated with eval method
 
     def __init__(self, run):
         self.run = run
@@ -24,6 +28,13 @@ class Expr(Monad):
     def __call__(self, env):
         return self.run(env)
 
+    def eval(self, env):
+        """Evaluate synchronous expression
+
+        Returns value of expression.
+        """
+        raise TypeError('{} is not synchronous expression'.format(self))
+
     def bind(self, func):
         def run_bind(env):
             @do(env.type)
@@ -76,6 +87,7 @@ class Const(Expr):
     """Constant expression
     """
     __slots__ = ('const',)
+    sync = True
 
     def __init__(self, const):
         self.const = const
@@ -83,6 +95,9 @@ class Const(Expr):
     def __call__(self, env):
         return Expr.unit(self.const)(env)
 
+    def eval(self, env):
+        return _const_value(self.const)
+
     def __reduce__(self):
         return Const, (self.const,)
 
@@ -95,15 +110,16 @@ class Arg(Expr):
     """Get argument by its name from environment
     """
     __slots__ = ('name',)
+    sync = True
 
     def __init__(self, name):
         self.name = name
 
     def __call__(self, env):
-        @do(env.type)
-        def run():
-            do_return(env.args[self.name])
-        return run()
+        return _eval_unit(self, env)
+
+    def eval(self, env):
+        return env.args[self.name]
 
     def __reduce__(self):
         return Arg, (self.name,)
@@ -117,6 +133,7 @@ class Env(Expr):
     """Get environment
     """
     __slots__ = tuple()
+    sync = True
 
     def __init__(self):
         pass
@@ -124,6 +141,9 @@ class Env(Expr):
     def __call__(self, env):
         return Expr.unit(env)(env)
 
+    def eval(self, env):
+        return env
+
     def __reduce__(self):
         return Env, tuple()
 
@@ -135,14 +155,19 @@ class Env(Expr):
 class Call(Expr):
     """Call function
     """
-    __slots__ = ('func', 'args', 'kwargs',)
+    __slots__ = ('func', 'args', 'kwargs', 'sync',)
 
     def __init__(self, func, *args, **kwargs):
         self.func = func
         self.args = args
         self.kwargs = kwargs
+        self.sync = (func.sync and all(arg.sync for arg in args) and
+                     all(val.sync for val in kwargs.values()))
 
     def __call__(self, env):
+        if self.sync:
+            return _eval_unit(self, env)
+
         @do(env.type)
         def run():
             func = yield self.func(env)
@@ -155,6 +180,14 @@ class Call(Expr):
             do_return(func(*args, **kwargs))
         return run()
 
+    def eval(self, env):
+        func = self.func.eval(env)
+        args = [arg.eval(env) for arg in self.args]
+        if self.kwargs:
+            return func(*args, **dict((key, val.eval(env))
+                                      for key, val in self.kwargs.items()))
+        return func(*args)
+
     def __reduce__(self):
         return _call_load, (self.func, self.args, self.kwargs,)
 
@@ -176,19 +209,26 @@ def _call_load(func, args, kwargs):
 class GetAttr(Expr):
     """Get attribute by its name
     """
-    __slots__ = ('target', 'name',)
+    __slots__ = ('target', 'name', 'sync',)
 
     def __init__(self, target, name):
         self.target = target
         self.name = name
+        self.sync = target.sync
 
     def __call__(self, env):
+        if self.sync:
+            return _eval_unit(self, env)
+
         @do(env.type)
         def run():
             target = yield self.target(env)
             do_return(getattr(target, self.name))
         return run()
 
+    def eval(self, env):
+        return getattr(self.target.eval(env), self.name)
+
     def __reduce__(self):
         return GetAttr, (self.target, self.name,)
 
@@ -200,13 +240,17 @@ class GetAttr(Expr):
 class GetItem(Expr):
     """Get item
     """
-    __slots__ = ('target', 'item',)
+    __slots__ = ('target', 'item', 'sync',)
 
     def __init__(self, target, item):
         self.target = target
         self.item = item
+        self.sync = target.sync and item.sync
 
     def __call__(self, env):
+        if self.sync:
+            return _eval_unit(self, env)
+
         @do(env.type)
         def run():
             target = yield self.target(env)
@@ -214,6 +258,9 @@ class GetItem(Expr):
             do_return(target[item])
         return run()
 
+    def eval(self, env):
+        return self.target.eval(env)[self.item.eval(env)]
+
     def __reduce__(self):
         return GetItem, (self.target, self.item,)
 
@@ -225,14 +272,18 @@ class GetItem(Expr):
 class If(Expr):
     """Ternary operation
     """
-    __slots__ = ('cond', 'true', 'false',)
+    __slots__ = ('cond', 'true', 'false', 'sync',)
 
     def __init__(self, cond, true, false):
         self.cond = cond
         self.true = true
         self.false = false
+        self.sync = cond.sync and true.sync and false.sync
 
     def __call__(self, env):
+        if self.sync:
+            return _eval_unit(self, env)
+
         @do(env.type)
         def run():
             if (yield self.cond(env)):
@@ -242,6 +293,9 @@ class If(Expr):
             do_return(result)
         return run()
 
+    def eval(self, env):
+        return self.true.eval(env) if self.cond.eval(env) else self.false.eval(env)
+
     def __reduce__(self):
         return If, (self.cond, self.true, self.false,)
 
@@ -272,3 +326,229 @@ class Bind(Expr):
     def repr(self):
         # pragma: no cover
         return '<-{}'.format(self.target.repr())
+
+
+class Deadline(Expr):
+    """Expression with deadline
+
+    Target expression is not evaluated once ``deadline`` (unix time) is
+    exceeded. Deadline is pickled as remaining time, so clocks of connected
+    hosts need not be synchronized.
+    """
+    __slots__ = ('target', 'deadline', 'sync',)
+
+    def __init__(self, target, deadline):
+        self.target = target
+        self.deadline = deadline
+        self.sync = target.sync
+
+    def __call__(self, env):
+        if time() >= self.deadline:
+            return env.type.unit(Result.from_exception(TimeoutError('deadline exceeded')))
+        return self.target(env)
+
+    def eval(self, env):
+        if time() >= self.deadline:
+            raise TimeoutError('deadline exceeded')
+        return self.target.eval(env)
+
+    def __reduce__(self):
+        return _deadline_load, (self.target, self.deadline - time())
+
+    def repr(self):
+        # pragma: no cover
+        return '{} until {}'.format(self.target.repr(), self.deadline)
+
+
+def _deadline_load(target, timeout):
+    """Deadline expression loader
+    """
+    return Deadline(target, time() + timeout)
+
+
+class Cancel(Expr):
+    """Cancel request
+
+    Cancels pending request with reply sender ``src`` tracked by ``requests``
+    (reply address -> cancel function) from environment. Canceled request is
+    abandoned and its reply is not sent, but its evaluation is not interrupted.
+    """
+    __slots__ = ('src',)
+    sync = True
+
+    def __init__(self, src):
+        self.src = src
+
+    def __call__(self, env):
+        return Expr.unit(self.eval(env))(env)
+
+    def eval(self, env):
+        requests = env.args.get('requests')
+        cancel = requests.pop(tuple(self.src.addr), None) if requests else None
+        if cancel is not None:
+            cancel()
+
+    def __reduce__(self):
+        return Cancel, (self.src,)
+
+    def repr(self):
+        # pragma: no cover
+        return 'Cancel({})'.format(self.src)
+
+
+class TemplateExpr(Expr):
+    """Template expression
+
+    Expression tree with constants replaced by parameters. Structurally
+    identical expressions share the same template. Template is compiled to
+    python closure (cached by template), which is executed synchronously
+    instead of interpretation of the expression tree.
+    """
+    __slots__ = ('template', 'params',)
+    sync = True
+    cache = {}
+    cache_max = 4096
+
+    def __init__(self, template, params):
+        self.template = template
+        self.params = params
+
+    @classmethod
+    def from_expr(cls, expr):
+        """Create template expression from expression
+
+        Returns None if expression (i.g. contains Bind) cannot be templated.
+        """
+        params = []
+        template = _template(expr, params)
+        return None if template is None else cls(template, tuple(params))
+
+    def __call__(self, env):
+        if self.template[0] == _TEMPLATE_CONST:
+            return env.type.unit(self.params[0])
+        return _eval_unit(self, env)
+
+    def eval(self, env):
+        run = self.cache.get(self.template)
+        if run is None:
+            if len(self.cache) >= self.cache_max:
+                self.cache.clear()
+            run = _template_compile(self.template, [0])
+            self.cache[self.template] = run
+        return run(env, self.params)
+
+    def __reduce__(self):
+        return TemplateExpr, (self.template, self.params,)
+
+    def repr(self):
+        # pragma: no cover
+        return 'template:{}'.format(self.template)
+
+
+def _eval_unit(expr, env):
+    """Evaluate synchronous expression to monad of environment type
+    """
+    try:
+        return env.type.unit(Result.from_value(expr.eval(env)))
+    except Exception:
+        return env.type.unit(Result.from_current_error())
+
+
+def _const_value(const):
+    """Value of constant as seen by monadic evaluation
+    """
+    return const.value if isinstance(const, Result) else const
+
+
+_TEMPLATE_CONST = 0
+_TEMPLATE_ARG = 1
+_TEMPLATE_ENV = 2
+_TEMPLATE_CALL = 3
+_TEMPLATE_ATTR = 4
+_TEMPLATE_ITEM = 5
+_TEMPLATE_IF = 6
+
+
+def _template(expr, params):
+    """Template of expression
+
+    Constants are appended to params in order of evaluation. Returns None if
+    expression cannot be templated.
+    """
+    expr_type = type(expr)
+    if expr_type is Const:
+        params.append(expr.const)
+        return (_TEMPLATE_CONST,)
+    elif expr_type is Call:
+        func = _template(expr.func, params)
+        args = tuple(_template(arg, params) for arg in expr.args)
+        kwargs = tuple((key, _template(val, params)) for key, val in expr.kwargs.items())
+        if func is None or None in args or any(val is None for _, val in kwargs):
+            return None
+        return (_TEMPLATE_CALL, func, args, kwargs)
+    elif expr_type is GetAttr:
+        target = _template(expr.target, params)
+        return None if target is None else (_TEMPLATE_ATTR, target, expr.name)
+    elif expr_type is Arg:
+        return (_TEMPLATE_ARG, expr.name)
+    elif expr_type is GetItem:
+        target, item = _template(expr.target, params), _template(expr.item, params)
+        return None if target is None or item is None else (_TEMPLATE_ITEM, target, item)
+    elif expr_type is Env:
+        return (_TEMPLATE_ENV,)
+    elif expr_type is If:
+        # parameters of both branches are included
+        cond = _template(expr.cond, params)
+        true, false = _template(expr.true, params), _template(expr.false, params)
+        if cond is None or true is None or false is None:
+            return None
+        return (_TEMPLATE_IF, cond, true, false)
+    elif expr_type is TemplateExpr:
+        params.extend(expr.params)
+        return expr.template
+    return None
+
+
+def _template_compile(template, index):
+    """Compile template to function of environment and parameters
+
+    ``index`` is a single item list with index of the next parameter.
+    """
+    tag = template[0]
+    if tag == _TEMPLATE_CONST:
+        param = index[0]
+        index[0] += 1
+        return lambda env, params: _const_value(params[param])
+    elif tag == _TEMPLATE_CALL:
+        func = _template_compile(template[1], index)
+        args = tuple(_template_compile(arg, index) for arg in template[2])
+        kwargs = tuple((key, _template_compile(val, index)) for key, val in template[3])
+        if kwargs:
+            return lambda env, params: func(env, params)(
+                *[arg(env, params) for arg in args],
+                **dict((key, val(env, params)) for key, val in kwargs))
+        elif not args:
+            return lambda env, params: func(env, params)()
+        elif len(args) == 1:
+            arg, = args
+            return lambda env, params: func(env, params)(arg(env, params))
+        return lambda env, params: func(env, params)(*[arg(env, params) for arg in args])
+    elif tag == _TEMPLATE_ATTR:
+        target, name = _template_compile(template[1], index), template[2]
+        return lambda env, params: getattr(target(env, params), name)
+    elif tag == _TEMPLATE_ARG:
+        name = template[1]
+        return lambda env, params: env.args[name]
+    elif tag == _TEMPLATE_ITEM:
+        target = _template_compile(template[1], index)
+        item = _template_compile(template[2], index)
+        return lambda env, params: target(env, params)[item(env, params)]
+    elif tag == _TEMPLATE_ENV:
+        return lambda env, params: env
+    elif tag == _TEMPLATE_IF:
+        cond = _template_compile(template[1], index)
+        true = _template_compile(template[2], index)
+        false = _template_compile(template[3], index)
+        return lambda env, params: (true(env, params) if cond(env, params) else
+                                    false(env, params))
+    raise ValueError('invalid template: {}'.format(template))
@@ -9,13 +9,25 @@ __all__ = ('Hub', 'Sender', 'Receiver', 'pair',)
 
 class Hub(object):
     """Message hub
+
+    Replies are received with reply slots, stored in a list indexed by lower
+    bits of slot address. Slot indices are reused, but address of reused slot
+    has different higher bits (generation), so late reply to released slot is
+    not delivered to its new handler.
     """
     inst_lock = threading.RLock()
     inst_local = threading.local()
     inst_main = None
 
+    SLOT_BASE = 1 << 62  # slot addresses never collide with regular ones
+    SLOT_BITS = 24
+    SLOT_MASK = (1 << SLOT_BITS) - 1
+
     def __init__(self):
         self.handlers = {}
+        self.slots = []  # index -> reply handler
+        self.slots_addr = []  # index -> address of the last slot's user
+        self.slots_free = []
         addr_iter = itertools.count(1)
         self.addr = lambda: Address((next(addr_iter),))
 
@@ -49,6 +61,18 @@ class Hub(object):
             raise ValueError('no receiver for address: {}'.format(dst))
 
     def try_send(self, msg, dst, src):
+        key = dst[-1]
+        if key >= self.SLOT_BASE:
+            index = key & self.SLOT_MASK
+            if index >= len(self.slots) or self.slots_addr[index] != key:
+                return False
+            handler = self.slots[index]
+            if handler is None:
+                return False
+            self.slots[index] = None
+            self.slots_free.append(index)
+            handler(msg)
+            return True
         handler = self.handlers.get(dst, None)
         if handler is None:
             return False
@@ -68,11 +92,39 @@ class Hub(object):
             return False
         return self.recv(dst, once_handler)
 
+    def recv_reply(self, handler):
+        """Allocate reply slot
+
+        Handler is called with the first message sent to returned address.
+        """
+        if self.slots_free:
+            index = self.slots_free.pop()
+            key = self.slots_addr[index] + (1 << self.SLOT_BITS)
+            self.slots_addr[index] = key
+            self.slots[index] = handler
+        else:
+            index = len(self.slots)
+            if index > self.SLOT_MASK:
+                raise RuntimeError('reply slots are exhausted')
+            key = self.SLOT_BASE + index
+            self.slots_addr.append(key)
+            self.slots.append(handler)
+        return Address((key,))
+
     def unrecv(self, dst):
+        key = dst[-1]
+        if key >= self.SLOT_BASE:
+            index = key & self.SLOT_MASK
+            if (index >= len(self.slots) or self.slots_addr[index] != key or
+                    self.slots[index] is None):
+                return False
+            self.slots[index] = None
+            self.slots_free.append(index)
+            return True
         return self.handlers.pop(dst, None) is not None
 
     def __len__(self):
-        return len(self.handlers)
+        return len(self.handlers) + len(self.slots) - len(self.slots_free)
 
     def __str__(self):
         return 'Hub(len:{})'.format(len(self))
@@ -125,8 +177,7 @@ class Sender(object):
     def __call__(self, msg):
         @async_block
         def sender_cont(ret):
-            addr = self.hub.addr()
-            self.hub.recv_once(addr, lambda msg, dst, src: ret(msg))
+            addr = self.hub.recv_reply(ret)
             try:
                 self.hub.send(msg, self.addr, Sender(self.hub, addr))
             except Exception:
@@ -1,10 +1,16 @@
 """Send-able lazy proxy object
 """
-from .hub import pair
-from .expr import ExprEnv, Arg, Const, Call, GetAttr, GetItem, Bind
-from ..monad import Cont, do_async, do_return
+import itertools
+import functools
+from time import time
+from collections import deque
+from .hub import Sender, pair
+from .expr import ExprEnv, Arg, Const, Call, GetAttr, GetItem, Bind, Deadline, Cancel
+from ..core import Core
+from ..monad import Cont, Result, async_block, do_async, do_return
+from ..uniform import TimeoutError, BrokenPipeError
 
-__all__ = ('Proxy', 'proxify', 'proxify_func',)
+__all__ = ('Proxy', 'proxify', 'proxify_func', 'proxify_iter', 'proxy_deadline',)
 
 
 class Proxy(object):
@@ -56,6 +62,70 @@ class Proxy(object):
         return False
 
 
+def proxy_deadline(proxy, timeout, core=None):
+    """Evaluate proxy with deadline
+
+    Deadline is sent along with proxy expression, and expression is not
+    evaluated by the other side if deadline is already exceeded. If reply is
+    not received before deadline, its slot is released, cancel request is sent
+    (other side does not send reply, but evaluation is not interrupted) and
+    ``TimeoutError`` is raised.
+    """
+    sender, expr = proxy._sender, proxy._expr
+
+    @async_block
+    def deadline_cont(ret):
+        hub = sender.hub
+        deadline = time() + timeout
+
+        def reply_handler(reply):
+            timer.dispose()
+            ret(reply)
+        addr = hub.recv_reply(reply_handler)
+        src = Sender(hub, addr)
+
+        def deadline_handler(_):
+            if hub.unrecv(addr):  # reply has not been received yet
+                hub.try_send(Cancel(src), sender.addr, None)
+                ret(Result.from_exception(TimeoutError('deadline exceeded')))
+        timer = (core or Core.local()).timer(deadline, deadline_handler)
+
+        try:
+            hub.send(Deadline(expr, deadline), sender.addr, src)
+        except Exception:
+            timer.dispose()
+            hub.unrecv(addr)
+            raise
+    return deadline_cont
+
+
+def proxy_request(cont, src, requests):
+    """Evaluate request and send its result to reply sender ``src``
+
+    Request is tracked by ``requests`` (reply address -> cancel function) until
+    its reply is sent, and is abandoned once canceled by ``Cancel`` expression.
+    Returned continuation is resolved once request is replied or canceled.
+    """
+    @async_block
+    def request_cont(ret):
+        def request_ret(value):
+            if requests.get(request) is not request_cancel:
+                return  # request has been canceled
+            del requests[request]
+            try:
+                src.send(value)
+            except Exception:
+                src.send(Result.from_current_error())
+            ret(None)
+
+        def request_cancel():
+            ret(None)
+        request = tuple(src.addr)
+        requests[request] = request_cancel
+        cont.__monad__()(request_ret)
+    return request_cont
+
+
 def proxify(target, dispose=None, hub=None):
     """Create send-able proxy object from target object
     """
@@ -67,18 +137,17 @@ def proxify(target, dispose=None, hub=None):
             if dispose is None or dispose:
                 getattr(target, '__exit__', lambda *_: None)(None, None, None)
             return False  # unsubscribe proxy handler
+        elif src is None:
+            expr(expr_env)(lambda value: isinstance(value, Result) and value.trace())
+            return True
         else:
-            def ret(value):
-                if src is None:
-                    value.trace()
-                else:
-                    src.send(value)
-            expr(expr_env)(ret)
+            proxy_request(expr(expr_env), src, requests)()
             return True
 
     recv, send = pair(hub=hub)
     recv(proxy_handler)
-    expr_env = ExprEnv(Cont, target=target)
+    requests = {}
+    expr_env = ExprEnv(Cont, target=target, requests=requests)
     return Proxy(send, Arg('target'))
 
 
@@ -133,3 +202,202 @@ def proxify_func(func, hub=None):
     recv, send = pair(hub=hub)
     recv(func_handler)
     return FuncProxy(send)
+
+
+class IterProxy(object):
+    """Streaming iterator proxy
+
+    Items are sent by producer in batches of at most ``batch`` items, but only
+    as many items as consumer has granted credits. Consumer grants credits to
+    keep at most ``window`` items buffered or in flight.
+    """
+    __slots__ = ('sender', 'batch', 'window', 'receiver', 'reply', 'buffer',
+                 'credit', 'result', 'waiter',)
+
+    def __init__(self, sender, batch, window):
+        self.sender = sender
+        self.batch = batch
+        self.window = window
+        self.receiver = None
+        self.reply = None
+        self.buffer = deque()
+        self.credit = 0  # granted but not yet received items
+        self.result = None  # error or end of iteration
+        self.waiter = None
+
+    def next_batch(self):
+        """Get next batch of items
+
+        Waits for at least one item, and returns list of all buffered items.
+        Empty list is returned when iteration is complete.
+        """
+        @async_block
+        def next_cont(ret):
+            if self.waiter is not None:
+                raise RuntimeError('concurrent next_batch is not allowed')
+            if self.sender is None and self.result is None:
+                raise RuntimeError('iterator proxy has been disposed')
+            self.waiter = ret
+            self.resume()
+        return next_cont
+
+    @do_async
+    def read_all(self):
+        """Get list of all remaining items
+        """
+        items = []
+        while True:
+            batch = yield self.next_batch()
+            if not batch:
+                do_return(items)
+            items.extend(batch)
+
+    def resume(self):
+        """Resume waiter and grant credits
+        """
+        if self.waiter is not None and (self.buffer or self.result is not None):
+            ret, self.waiter = self.waiter, None
+            if self.buffer:
+                items = list(self.buffer)
+                self.buffer.clear()
+                ret(items)
+            else:
+                ret(self.result)
+        if self.result is not None or self.sender is None:
+            return
+        credit = self.window - len(self.buffer) - self.credit
+        if credit >= self.batch or (credit > 0 and not self.credit):
+            if self.receiver is None:
+                self.receiver, self.reply = pair(hub=self.sender.hub)
+                self.receiver(self.handler)
+            self.credit += credit
+            if not self.sender.try_send(credit, self.reply):
+                self.receiver.dispose()
+                self.result = Result.from_exception(
+                    BrokenPipeError('iterator producer is disposed'))
+                self.resume()
+
+    def handler(self, msg, dst, src):
+        """Handle items batch sent by producer
+        """
+        if msg.error is None:
+            items, done = msg.value
+            self.credit -= len(items)
+            self.buffer.extend(items)
+            if done:
+                self.result = Result.from_value([])
+        else:
+            self.result = msg
+        if self.result is not None:
+            self.sender.try_send(None)  # confirm completion to producer
+        self.resume()
+        return self.result is None
+
+    def dispose(self):
+        sender, self.sender = self.sender, None
+        if sender is not None and self.result is None:
+            sender.try_send(None)  # completion is confirmed by handler
+        receiver, self.receiver = self.receiver, None
+        if receiver is not None and self.result is None:
+            # receiver is unsubscribed by handler once result is set
+            receiver.dispose()
+
+    def __reduce__(self):
+        return IterProxy, (self.sender, self.batch, self.window)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, et, eo, tb):
+        self.dispose()
+        return False
+
+    def __str__(self):
+        return '{}(addr:{}, batch:{}, window:{})'.format(type(self).__name__,
+               self.sender.addr if self.sender else None, self.batch, self.window)
+
+    def __repr__(self):
+        return str(self)
+
+
+def proxify_iter(iterable, batch=None, window=None, hub=None, conn=None):
+    """Create send-able streaming proxy of iterable
+
+    Items are produced only when consumer grants credits for them, and sent in
+    batches of ``batch`` items. Consumer keeps at most ``window`` items buffered.
+    If ``conn`` is specified, producer is disposed (and iterator is closed) once
+    connection is disposed, proxy of remote iterable is always bound to the
+    connection it is evaluated by.
+    """
+    batch = batch or 64
+    window = max(window or batch * 4, batch)
+    if isinstance(iterable, Proxy):
+        return Proxy(iterable._sender, Call(Const(functools.partial(proxify_iter,
+                     batch=batch, window=window)), iterable._expr, conn=Arg('conn')))
+
+    def iter_handler(credit, dst, src):
+        if state[1]:
+            # Credit is granted by consumer while items are being sent, items
+            # for it are produced by outer handler call.
+            state[0] = None if credit is None or state[0] is None else state[0] + credit
+            return True
+        if credit is None:
+            return iter_close()
+        if state[2]:
+            return True  # credit was granted before end of iteration was received
+        state[0] = credit
+        state[1] = True
+        try:
+            while state[0]:
+                count = min(state[0], batch)
+                items = []
+                try:
+                    for item in itertools.islice(iterator, count):
+                        items.append(item)
+                except Exception:
+                    # send already produced items before error
+                    error = Result.from_current_error()
+                    state[2] = True
+                    src.try_send(Result.from_value((items, False)))
+                    src.try_send(error)
+                    break
+                if len(items) < count:
+                    state[2] = True
+                    src.try_send(Result.from_value((items, True)))
+                    break
+                state[0] -= count
+                if not src.try_send(Result.from_value((items, False))):
+                    state[0] = None
+            if state[0] is None:
+                return iter_close()
+            # Once iteration is complete, handler is kept until consumer
+            # confirms it, as more credits may still be in flight.
+            return True
+        finally:
+            state[1] = False
+
+    def iter_close():
+        """Close iterator of producer being unsubscribed
+        """
+        state[0] = None
+        getattr(iterator, 'close', lambda: None)()
+        if conn_disp is not None:
+            conn.dispose.remove(conn_disp)
+        return False
+
+    def iter_dispose():
+        """Dispose producer along with connection
+        """
+        if state[0] is None:
+            return  # producer is already closed
+        state[0] = None
+        if not state[1]:  # otherwise closed by producing handler
+            recv.dispose()
+            getattr(iterator, 'close', lambda: None)()
+
+    state = [0, False, False]  # credit (None if closed), producing, complete
+    iterator = iter(iterable)
+    recv, send = pair(hub=hub)
+    recv(iter_handler)
+    conn_disp = None if conn is None else conn.dispose.add_action(iter_dispose)
+    return IterProxy(send, batch, window)
@@ -1,22 +1,70 @@
 import os
+import time
 import textwrap
 import unittest
 import functools
+import itertools
 import importlib
 from .proxy import Remote
-from ..hub import pair
-from ..conn import ForkConnection, SSHConnection
-from ..conn.conn import ConnectionProxy
-from ..proxy import Proxy, proxify
-from ...core import schedule
-from ...monad import Result, monad, async_all
+from ..hub import Address, pair
+from ..conn import (ForkConnection, SSHConnection, PickleWire, StructWire,
+                    compressor_names, compressor_create)
+from ..conn.conn import Connection, ConnectionProxy
+from ..conn.stream import StreamConnection
+from ..expr import ExprEnv, Const, Arg, Call, GetAttr, Deadline
+from ..proxy import Proxy, proxify, proxify_iter, proxy_deadline
+from ...core import Core, schedule, sleep
+from ...monad import Result, Identity, monad, async_all, do_async, do_return
 from ...boot import BootLoader, boot_pack
 from ...process import process_call
 from ...tests import async_test
+from ...uniform import BrokenPipeError, TimeoutError
 from ...utils import identity
 from ... import PRETZEL_POLLER, __name__ as pretzel
 
-__all__ = ('ForkConnectionTest', 'SSHConnectionTest',)
+__all__ = ('WireTest', 'CompressTest', 'ForkConnectionTest', 'CorkForkConnectionTest',
+           'StructWireForkConnectionTest', 'BatchForkConnectionTest',
+           'CompressForkConnectionTest', 'KeepaliveForkConnectionTest', 'SSHConnectionTest',)
+
+
+class WireTest(unittest.TestCase):
+    def test(self):
+        for wire in (PickleWire, StructWire):
+            with Connection(wire=wire) as local, Connection(wire=wire) as remote:
+                recv, send = pair(hub=local.hub)
+                msg = Call(GetAttr(Const('value'), 'upper'))
+                first = local.wire.pack(msg, Address((1, 2)), send)
+                second = local.wire.pack(msg, Address((1, 2)), send)
+                self.assertTrue(len(second) < len(first))  # template is sent once
+
+                for data in (first, second):
+                    expr, dst, src = remote.wire.unpack(data)
+                    self.assertEqual(expr(ExprEnv(Identity)).value.value, 'VALUE')
+                    self.assertEqual(tuple(dst), (1, 2))
+                    self.assertEqual(tuple(src.addr), tuple(send.addr) + tuple(remote.sender.addr))
+                    self.assertEqual(local.wire.unpack(remote.wire.pack(None, dst, src))[2], send)
+
+                with Connection(wire=wire) as other:
+                    with self.assertRaises(ValueError):
+                        other.wire.unpack(second)
+
+    def test_codec(self):
+        # delimited codec corrupts binary messages
+        with self.assertRaises(ValueError):
+            StreamConnection(codec='line')
+
+
+class CompressTest(unittest.TestCase):
+    def test(self):
+        self.assertTrue('zlib' in compressor_names())
+        msgs = [b'message ' * 64, b'message ' * 64, b'other message' * 32, b'']
+        for name in compressor_names():
+            local, remote = compressor_create(name), compressor_create(name)
+            datas = [local.compress(msg) for msg in msgs]
+            self.assertEqual([remote.decompress(data) for data in datas], msgs, name)
+            self.assertTrue(len(datas[0]) < len(msgs[0]), name)
+        with self.assertRaises(ValueError):
+            compressor_create('unknown')
 
 
 class ForkConnectionTest(unittest.TestCase):
@@ -112,6 +160,83 @@ class ForkConnectionTest(unittest.TestCase):
         yield schedule()  # make sure we are not in handler
         self.assertFalse(c0.hub.handlers)
 
+    @async_test
+    def test_iter(self):
+        with (yield self.conn_type()) as conn:
+            with (yield proxify_iter(conn(range)(1000), batch=16)) as items:
+                self.assertEqual((yield items.read_all()), list(range(1000)))
+            with (yield proxify_iter(conn(iter)(()))) as items:
+                self.assertEqual((yield items.next_batch()), [])
+
+        # consumer fails once connection is closed
+        with (yield self.conn_type()) as conn:
+            items = yield proxify_iter(conn(itertools.count)(), batch=4, window=4)
+            self.assertEqual((yield items.next_batch()), [0, 1, 2, 3])
+            yield schedule()
+            self.assertEqual(conn.inflight, 1)  # no credit is granted
+        with self.assertRaises(BrokenPipeError):
+            while True:
+                yield items.next_batch()
+        items.dispose()
+
+    @async_test
+    def test_channel(self):
+        data = b'0123456789' * (1 << 17)
+        with (yield self.conn_type()) as conn:
+            with conn.channel(window=1 << 16) as channel:
+                echo = monad(~conn(channel_echo)(channel)).future()
+
+                @do_async
+                def echo_read():
+                    chunks, size = [], 0
+                    while size < len(data):
+                        chunk = yield channel.read(1 << 16)
+                        chunks.append(chunk)
+                        size += len(chunk)
+                    do_return(b''.join(chunks))
+                echo_data = echo_read().future()
+
+                offset = 0
+                while offset < len(data):
+                    offset += yield channel.write(data[offset:offset + (1 << 14)])
+                    if offset == len(data) // 2:
+                        # messages are not blocked by channel data
+                        self.assertEqual((yield conn(len)('message')), 7)
+                self.assertEqual((yield echo_data), data)
+            self.assertEqual((yield echo), len(data))
+
+            # channel can only be sent over its connection
+            with ForkConnection() as other, self.assertRaises(ValueError):
+                yield conn(identity)(other.channel())
+
+    @async_test
+    def test_deadline(self):
+        with (yield self.conn_type()) as conn:
+            remote_conn = Proxy(conn.sender, Arg('conn'))
+            timers = len(Core.local().time_queue)
+            self.assertEqual((yield proxy_deadline(conn(len)('abc'), 10)), 3)
+            self.assertEqual(len(Core.local().time_queue), timers)  # timer is canceled
+
+            # reply slot is released and remote request is canceled
+            hub_size = len(conn.hub)
+            with self.assertRaises(TimeoutError):
+                yield proxy_deadline(~conn(sleep)(0.3), 0.1)
+            self.assertEqual(len(conn.hub), hub_size)
+            self.assertEqual(conn.inflight, 0)
+            self.assertEqual((yield remote_conn.requests.__len__()), 0)
+            yield sleep(0.3)  # late reply is not sent
+
+            # canceled request stops waiting for remote sleep
+            begin = time.time()
+            with self.assertRaises(TimeoutError):
+                yield proxy_deadline(~conn(sleep)(60), 0.1)
+            self.assertEqual((yield remote_conn.requests.__len__()), 0)
+            self.assertTrue(time.time() - begin < 1)
+
+            # expression is not evaluated once deadline is exceeded
+            with self.assertRaises(TimeoutError):
+                yield conn.sender(Deadline(Call(Const(os.getpid)), time.time() - 1))
+
     @async_test
     def test_sender_roundtrip(self):
         r, s = pair()
@@ -137,6 +262,70 @@ class ForkConnectionTest(unittest.TestCase):
                              BootLoader)
 
 
+class CorkForkConnectionTest(ForkConnectionTest):
+    conn_type = functools.partial(ForkConnection, cork=True,
+                                  environ=ForkConnectionTest.conn_env)
+
+
+class StructWireForkConnectionTest(ForkConnectionTest):
+    conn_type = functools.partial(ForkConnection, codec='varint', wire=StructWire,
+                                  environ=ForkConnectionTest.conn_env)
+
+
+class BatchForkConnectionTest(ForkConnectionTest):
+    conn_type = functools.partial(ForkConnection, batch=True,
+                                  environ=ForkConnectionTest.conn_env)
+
+    @async_test
+    def test_batch(self):
+        with (yield self.conn_type()) as conn:
+            msgs = []
+            conn.recv_ev.on(lambda msg: msgs.append(msg) or True)
+            self.assertEqual(list((yield async_all(conn(str)(index) for index in range(64)))),
+                             [str(index) for index in range(64)])
+            self.assertEqual(len(msgs), 1)
+
+            # not pack-able message fails only its own call
+            futures = [conn(identity)(arg).__monad__().future()
+                       for arg in (1, lambda: None, 2)]
+            self.assertEqual((yield futures[0]), 1)
+            with self.assertRaises(Exception):
+                yield futures[1]
+            self.assertEqual((yield futures[2]), 2)
+
+
+class CompressForkConnectionTest(ForkConnectionTest):
+    conn_type = functools.partial(ForkConnection, compress=True,
+                                  environ=ForkConnectionTest.conn_env)
+
+    @async_test
+    def test_compress(self):
+        with (yield self.conn_type()) as conn:
+            self.assertEqual(conn.compressor.name, compressor_names()[0])
+            remote_conn = Proxy(conn.sender, Arg('conn'))
+            self.assertEqual((yield remote_conn.compressor.name), compressor_names()[0])
+            self.assertEqual((yield remote_conn.decompressors.__len__()), 1)
+
+
+class KeepaliveForkConnectionTest(ForkConnectionTest):
+    conn_type = functools.partial(ForkConnection, keepalive=1,
+                                  environ=ForkConnectionTest.conn_env)
+
+    @async_test
+    def test_keepalive(self):
+        with (yield self.conn_type(keepalive=0.1)) as conn:
+            yield sleep(0.3)
+            self.assertTrue(conn.rtt > 0)
+
+            # peer is not responding
+            reply = monad(conn(time.sleep)(2)).future()
+            self.assertEqual(conn.inflight, 1)
+            with self.assertRaises(BrokenPipeError):
+                yield reply
+            self.assertTrue(conn.disposed)
+            self.assertEqual(conn.inflight, 0)
+
+
 class SSHConnectionTest(ForkConnectionTest):
     conn_type = functools.partial(SSHConnection, host='localhost',
                                   environ=ForkConnectionTest.conn_env)
@@ -159,6 +348,25 @@ class SSHConnectionTest(ForkConnectionTest):
         self.assertEqual(result, (b'', b'done', 0))
 
 
+@do_async
+def channel_echo(channel):  # pragma: no cover
+    """Send channel data back until channel is closed
+
+    Called from remote connection.
+    """
+    size = 0
+    with channel:
+        try:
+            while True:
+                data = yield channel.read(1 << 16)
+                size += len(data)
+                while data:
+                    data = data[(yield channel.write(data)):]
+        except BrokenPipeError:
+            pass
+    do_return(size)
+
+
 def clean_path():  # pragma: no cover
     """Clean system path to force use of connection importer
 
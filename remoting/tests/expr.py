@@ -1,3 +1,4 @@
+import time
 import pickle
 import operator
 import unittest
@@ -5,6 +6,7 @@ import unittest
 from ..expr import *
 from ...event import Event
 from ...monad import Result, Identity, Cont, do, do_return
+from ...uniform import TimeoutError
 
 __all__ = ('ExprTest',)
 
@@ -79,6 +81,62 @@ class ExprTest(unittest.TestCase):
         ev('Done')
         self.assertEqual(ev_future.value, 'Yes, Done!')
 
+    def test_sync(self):
+        expr = Call(Const(dict), GetItem(Arg('args'), Const(0)), two=Const(2))
+        self.assertTrue(expr.sync)
+        self.assertEqual(expr.eval(ExprEnv(Identity, args=({'one': 1},))), {'one': 1, 'two': 2})
+        self.assertFalse(Call(Const(len), Bind(Arg('ev'))).sync)
+
+        # constant result is unwrapped the same way as by monadic evaluation
+        expr = Call(Const(str), Const(Result.from_value(1)))
+        self.assertEqual(expr.eval(ExprEnv(Identity)), '1')
+        self.assertEqual(run(expr), '1')
+        with self.assertRaises(RuntimeError):
+            Call(Const(str), Const(Result.from_exception(RuntimeError()))).eval(ExprEnv(Identity))
+        with self.assertRaises(TypeError):
+            Bind(Arg('ev')).eval(ExprEnv(Identity))
+
+    def test_deadline(self):
+        expr = Deadline(Call(Const(len), Const('abc')), time.time() + 60)
+        self.assertTrue(expr.sync)
+        self.assertEqual(expr.eval(ExprEnv(Identity)), 3)
+        self.assertEqual(run(expr), 3)
+
+        # deadline is pickled as remaining time
+        expr_load = pickle.loads(pickle.dumps(expr))
+        self.assertTrue(abs(expr_load.deadline - expr.deadline) < 1)
+
+        # target is not evaluated once deadline is exceeded
+        evaluated = []
+        expr = Deadline(Call(Const(evaluated.append), Const(1)), time.time() - 1)
+        with self.assertRaises(TimeoutError):
+            expr.eval(ExprEnv(Identity))
+        with self.assertRaises(TimeoutError):
+            run(expr)
+        self.assertEqual(evaluated, [])
+
+    def test_template(self):
+        exprs = (Const('constant'), Arg('first'), GetItem(GetAttr(Env(), 'args'), Const('first')),
+                 Call(Const(divmod), Const(7), Arg('first')),
+                 Call(Const(dict), Const({'zero': 0}), one=Arg('first'), two=Const(2)),
+                 If(Call(Const(operator.gt), Arg('first'), Const(0)), Const('a'), Const('b')))
+        for expr in exprs:
+            template = reload(TemplateExpr.from_expr(expr))
+            self.assertEqual(run(template, first=1), run(expr, first=1))
+            self.assertEqual(reload(TemplateExpr.from_expr(template)).template,
+                             template.template)
+
+        # structurally identical expressions
+        one, two = (TemplateExpr.from_expr(Call(GetAttr(Const(val), 'upper')))
+                    for val in ('one', 'two'))
+        self.assertEqual(one.template, two.template)
+        self.assertEqual((run(one), run(two)), ('ONE', 'TWO'))
+
+        # errors
+        with self.assertRaises(AttributeError):
+            run(TemplateExpr.from_expr(GetAttr(Const(1), 'bad_attr')))
+        self.assertEqual(TemplateExpr.from_expr(Call(Const(len), Bind(Arg('ev')))), None)
+
 
 def run(expr, **args):
     """Run expression with Identity monad
@@ -57,6 +57,26 @@ class HubTest(unittest.TestCase):
 
         self.assertEqual(len(Hub.local()), 0)
 
+    def test_reply_slots(self):
+        hub = Hub()
+        replies = []
+        addr = hub.recv_reply(replies.append)
+        self.assertEqual(len(hub), 1)
+        self.assertTrue(hub.try_send('1', addr, None))
+        self.assertFalse(hub.try_send('2', addr, None))  # slot is released
+        self.assertEqual(replies, ['1'])
+
+        # slot is reused with new address
+        addr_next = hub.recv_reply(replies.append)
+        self.assertEqual(len(hub.slots), 1)
+        self.assertNotEqual(tuple(addr_next), tuple(addr))
+        self.assertFalse(hub.try_send('late', addr, None))
+        self.assertTrue(hub.unrecv(addr_next))
+        self.assertFalse(hub.unrecv(addr_next))
+        self.assertFalse(hub.try_send('3', addr_next, None))
+        self.assertEqual(replies, ['1'])
+        self.assertEqual(len(hub), 0)
+
     def test_faulty_handler(self):
         recv, send = pair()
 
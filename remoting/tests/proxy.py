@@ -1,9 +1,11 @@
 import unittest
 from ..hub import Hub
-from ..proxy import Proxy, proxify
+from ..proxy import Proxy, proxify, proxify_iter, proxy_deadline
+from ..conn.conn import Connection
 from ...event import Event
 from ...monad import monad, do_async, do_return
 from ...core import schedule
+from ...uniform import BrokenPipeError, TimeoutError
 from ...tests import async_test
 
 __all__ = ('ProxyTest',)
@@ -44,9 +46,68 @@ class ProxyTest(unittest.TestCase):
             with (yield proxify(proxy.value)) as value_proxy:
                 self.assertTrue(isinstance(value_proxy, Proxy))
 
+            # canceled request is not replied
+            with self.assertRaises(TimeoutError):
+                yield proxy_deadline(~proxy.method_async(), 0.01)
+            self.assertEqual((yield proxy('test')), 'test')
+
         yield schedule()  # handlers will be cleaned when coroutine is interrupted
         self.assertFalse(len(Hub.local()), 0)
 
+    @async_test
+    def test_iter(self):
+        produced = []
+
+        def source(count):
+            for item in range(count):
+                produced.append(item)
+                yield item
+
+        # credit based flow control
+        with proxify_iter(source(100), batch=8, window=32) as items:
+            batch = yield items.next_batch()
+            self.assertEqual(batch, list(range(len(batch))))
+            self.assertTrue(len(produced) <= 32)
+            consumed = list(batch)
+            while True:
+                batch = yield items.next_batch()
+                if not batch:
+                    break
+                consumed.extend(batch)
+                self.assertTrue(len(produced) - len(consumed) <= 32)
+            self.assertEqual(consumed, list(range(100)))
+            self.assertEqual((yield items.next_batch()), [])
+
+        # error
+        def source_error():
+            yield 1
+            raise RuntimeError()
+        with proxify_iter(source_error()) as items:
+            with self.assertRaises(RuntimeError):
+                yield items.read_all()
+
+        # early dispose closes generator
+        del produced[:]
+        source_iter = source(100)
+        with proxify_iter(source_iter, batch=4, window=4) as items:
+            self.assertEqual((yield items.next_batch()), [0, 1, 2, 3])
+        yield schedule()
+        with self.assertRaises(StopIteration):
+            next(source_iter)
+
+        # producer is disposed with connection
+        source_iter = source(100)
+        with Connection() as conn:
+            items = proxify_iter(source_iter, conn=conn)
+        with self.assertRaises(StopIteration):
+            next(source_iter)
+        with self.assertRaises(BrokenPipeError):
+            yield items.next_batch()
+        items.dispose()
+
+        yield schedule()
+        self.assertFalse(len(Hub.local()), 0)
+
 
 class Remote (object):
     def __init__(self, value):
@@ -1,4 +1,5 @@
-from . import stream, file, sock, sock_ssl, wrapped, buffered
+from . import (stream, file, sock, sock_ssl, wrapped, buffered, mapped, server, resolver,
+               pool, tls, datagram, http, codec)
 
 from .stream import *
 from .file import *
@@ -6,9 +7,19 @@ from .sock import *
 from .sock_ssl import *
 from .wrapped import *
 from .buffered import *
+from .mapped import *
+from .server import *
+from .resolver import *
+from .pool import *
+from .tls import *
+from .datagram import *
+from .http import *
+from .codec import *
 
 __all__ = (stream.__all__ + file.__all__ + sock.__all__ + sock_ssl.__all__ +
-           wrapped.__all__ + buffered.__all__)
+           wrapped.__all__ + buffered.__all__ + mapped.__all__ + server.__all__ +
+           resolver.__all__ + pool.__all__ + tls.__all__ + datagram.__all__ + http.__all__ +
+           codec.__all__)
 
 
 def load_tests(loader, tests, pattern):
@@ -22,3 +33,10 @@ def load_tests(loader, tests, pattern):
         suite.addTests(loader.loadTestsFromModule(test))
 
     return suite
+
+
+def load_bench(runner):
+    """Load benchmarks protocol
+    """
+    from . import bench
+    bench.load_bench(runner)
@@ -0,0 +1,61 @@
+"""Stream benchmarks
+"""
+from .http import HTTPServer, HTTPConnection, HTTPResponse
+from ..monad import do_async, do_return, async_all
+from ..bench import Benchmark
+
+
+class HTTPBench(Benchmark):
+    """Benchmark HTTP request over loopback connection
+    """
+    def __init__(self, name=None, factor=None):
+        Benchmark.__init__(self, name or 'stream.http', factor)
+        self.server = None
+        self.conn = None
+
+    @do_async
+    def init(self):
+        self.server = HTTPServer(handler).listen(('127.0.0.1', 0))
+        self.server.serve()()
+        self.conn = yield HTTPConnection.connect(self.server.address)
+        if (yield self.request()) != b'pong':
+            raise ValueError('initialization test failed')
+
+    @do_async
+    def request(self):
+        response = yield self.conn.request(b'GET', b'/ping')
+        do_return((yield response.body.read_all()))
+
+    def body(self):
+        return self.request()
+
+    def dispose(self):
+        conn, self.conn = self.conn, None
+        if conn:
+            conn.dispose()
+        server, self.server = self.server, None
+        if server:
+            server.dispose()
+
+
+class HTTPPipelineBench(HTTPBench):
+    """Benchmark pipelined HTTP requests over loopback connection
+    """
+    def __init__(self):
+        HTTPBench.__init__(self, 'stream.http_pipeline', 128)
+
+    def body(self):
+        return async_all(self.request() for _ in range(self.factor))
+
+
+@do_async
+def handler(request):
+    return pong
+pong = HTTPResponse(200, ((b'Content-Type', b'text/plain'),), b'pong')
+
+
+def load_bench(runner):
+    """Load benchmarks
+    """
+    for bench in (HTTPBench(), HTTPPipelineBench(),):
+        runner.add(bench)
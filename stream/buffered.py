@@ -4,27 +4,37 @@ Buffered stream is wrapped stream. Implements additional methods which leverage
 buffered nature of the stream.
 """
 import struct
+from time import time
 from collections import deque
 from .wrapped import WrappedStream
+from .codec import codec_get
 from .. import PRETZEL_BUFSIZE
+from ..core import Core
 from ..uniform import BrokenPipeError
-from ..parser import ParserResult, ParserError
+from ..parser import ParserResult, ParserError, varint_encode, varint_decode, varint_octets
 from ..monad import do_async, async_single, do_return
 
-__all__ = ('BufferedStream',)
+__all__ = ('BufferedStream', 'BufferSize',)
 
 
 class BufferedStream(WrappedStream):
     """Buffered stream
+
+    Size of reads from base stream and write buffer flush threshold are equal
+    to ``bufsize`` unless ``bufsize_min`` or ``bufsize_max`` bounds are
+    specified, in which case they are adapted to observed traffic.
     """
     size_struct = struct.Struct('>I')
 
-    def __init__(self, base, bufsize=None):
+    def __init__(self, base, bufsize=None, bufsize_min=None, bufsize_max=None):
         WrappedStream.__init__(self, base)
 
         self.bufsize = bufsize or PRETZEL_BUFSIZE
+        self.read_size = BufferSize(self.bufsize, bufsize_min, bufsize_max)
+        self.write_size = BufferSize(self.bufsize, bufsize_min, bufsize_max)
         self.read_buffer = Buffer()
         self.write_buffer = Buffer()
+        self.flush_pending = False
 
         @async_single
         @do_async
@@ -32,32 +42,43 @@ class BufferedStream(WrappedStream):
             """Flush write buffers
             """
             with self.writing:
+                self.write_size.observe(len(self.write_buffer))
                 while self.write_buffer:
-                    block = self.write_buffer.slice(self.bufsize)
+                    block = self.write_buffer.slice(self.write_size.size)
                     self.write_buffer.dequeue((yield self.base.write(block)), False)
                 yield self.base.flush()
         self.flush = flush
 
+    def read_base(self):
+        """Read chunk from base stream
+
+        Size of the chunk is defined by current read size, resulting chunk must
+        be observed by read size.
+        """
+        return self.base.read(self.read_size.size)
+
     @do_async
     def read(self, size):
         if not size:
             do_return(b'')
         with self.reading:
             if not self.read_buffer:
-                self.read_buffer.enqueue((yield self.base.read(self.bufsize)))
+                self.read_buffer.enqueue(self.read_size((yield self.read_base())))
             do_return(self.read_buffer.dequeue(size))
 
     @do_async
-    def parse(self, parser):
+    def parse(self, parser, limit=None):
         """Parse stream with specified `parser`, parser fails it does not consume data.
 
-        Return result of the parsing.
+        If ``limit`` is specified, parsing fails once parser has consumed more
+        then ``limit`` bytes without result. Return result of the parsing.
         """
         with self.reading:
-            chunks = [self.read_buffer.dequeue() or (yield self.base.read(self.bufsize))]
+            parser = parser.__parser__().start  # independent of running parser
+            chunks = [self.read_buffer.dequeue() or self.read_size((yield self.read_base()))]
             try:
                 while True:
-                    tupe, result = parser.__parser__()(chunks[-1], False)
+                    tupe, result = parser(chunks[-1], False)
                     if tupe & ParserResult.DONE:
                         value, chunk, _ = result
                         del chunks[:]
@@ -65,12 +86,16 @@ class BufferedStream(WrappedStream):
                         do_return(value)
                     elif tupe & ParserResult.PARTIAL:
                         parser = result
-                        chunks.append((yield self.base.read(self.bufsize)))
+                        if limit is not None:
+                            limit -= len(chunks[-1])
+                            if limit < 0:
+                                raise ParserError('parser input limit is exceeded')
+                        chunks.append(self.read_size((yield self.read_base())))
                     else:
                         raise ParserError(result)
             except BrokenPipeError:
                 # try to terminate parser with last chunk
-                tupe, result = parser.__parser__()(b'', True)
+                tupe, result = parser(b'', True)
                 if tupe & ParserResult.DONE:
                     value, chunk, _ = result
                     del chunks[:]
@@ -89,7 +114,7 @@ class BufferedStream(WrappedStream):
             do_return(b'')
         with self.reading:
             while len(self.read_buffer) < size:
-                self.read_buffer.enqueue((yield self.base.read(self.bufsize)))
+                self.read_buffer.enqueue(self.read_size((yield self.read_base())))
             do_return(self.read_buffer.dequeue(size))
 
     @do_async
@@ -99,7 +124,7 @@ class BufferedStream(WrappedStream):
         with self.reading:
             try:
                 while True:
-                    self.read_buffer.enqueue((yield self.base.read(self.bufsize)))
+                    self.read_buffer.enqueue(self.read_size((yield self.read_base())))
             except BrokenPipeError:
                 pass
             do_return(self.read_buffer.dequeue())
@@ -119,7 +144,7 @@ class BufferedStream(WrappedStream):
                 if find_offset >= 0:
                     break
                 offset = max(0, len(data) - len(sub))
-                self.read_buffer.enqueue((yield self.base.read(self.bufsize)))
+                self.read_buffer.enqueue(self.read_size((yield self.read_base())))
             do_return(self.read_buffer.dequeue(offset + find_offset + len(sub)))
 
     @do_async
@@ -134,7 +159,7 @@ class BufferedStream(WrappedStream):
                 match = regex.search(data)
                 if match:
                     break
-                self.read_buffer.enqueue((yield self.base.read(self.bufsize)))
+                self.read_buffer.enqueue(self.read_size((yield self.read_base())))
             do_return((self.read_buffer.dequeue(match.end()), match))
 
     @do_async
@@ -147,12 +172,36 @@ class BufferedStream(WrappedStream):
         """
         with self.writing:  # state check
             self.write_buffer.enqueue(data)
-        if len(self.write_buffer) > 2 * self.bufsize:
+        if len(self.write_buffer) > 2 * self.write_size.size:
             yield self.flush()
-        elif len(self.write_buffer) > self.bufsize:
+        elif len(self.write_buffer) > self.write_size.size:
             self.flush()()
         do_return(len(data))
 
+    def flush_schedule(self, delay=None):
+        """Schedule flush to the end of current core iteration
+
+        Writes issued before scheduled flush is executed are coalesced and
+        written together (corked flush). If ``delay`` (in seconds) is specified,
+        flush is scheduled no later than ``delay`` after the first write which
+        has scheduled it, so writes are coalesced across core iterations while
+        latency stays bounded. Flush is started immediately if write buffer's
+        length is more then buffer size limit.
+        """
+        if len(self.write_buffer) > self.write_size.size:
+            self.flush()()
+        elif not self.flush_pending:
+            def flush(_):
+                self.flush_pending = False
+                if not self.disposed:
+                    self.flush()()
+            self.flush_pending = True
+            core = getattr(self.base, 'core', None) or Core.local()
+            if delay:
+                core.timer(time() + delay, flush)
+            else:
+                core.schedule()(flush)
+
     def write_schedule(self, data):
         """Enqueue data to write buffer
 
@@ -169,12 +218,70 @@ class BufferedStream(WrappedStream):
         do_return((yield self.read_until_size(self.size_struct.unpack
                  ((yield self.read_until_size(self.size_struct.size)))[0])))
 
+    def read_bytes_batch(self, max_count=None, max_bytes=None):
+        """Read batch of bytes objects
+
+        Waits for at least one complete bytes object, then returns list of all
+        complete bytes objects already available in the buffer in one pass.
+        Size of the batch is limited by ``max_count`` objects and ``max_bytes``
+        total payload size (first object is always returned).
+        """
+        return self.read_frames('u32', max_count, max_bytes)
+
+    @do_async
+    def read_frames(self, codec, max_count=None, max_bytes=None):
+        """Read batch of frames decoded with ``codec`` (instance or name)
+
+        Waits for at least one complete frame, then returns list of all complete
+        frames already available in the buffer (limited by ``max_count`` frames
+        and ``max_bytes`` total payload size).
+        """
+        codec = codec_get(codec)
+        with self.reading:
+            while True:
+                frames = self.read_buffer.dequeue_codec(codec, max_count, max_bytes)
+                if frames:
+                    do_return(frames)
+                pending = codec.pending(self.read_buffer.slice()) if self.read_buffer else 1
+                while len(self.read_buffer) < pending:
+                    self.read_buffer.enqueue(self.read_size((yield self.read_base())))
+
+    def write_frames(self, codec, frames):
+        """Write frames encoded with ``codec`` (instance or name) to buffer
+
+        Encoded chunks are enqueued without concatenation, flush need to be
+        called manually. Returns size of encoded frames.
+        """
+        size = 0
+        for chunk in codec_get(codec).encode(frames):
+            self.write_buffer.enqueue(chunk)
+            size += len(chunk)
+        return size
+
     def write_bytes(self, bytes):
         """Write bytes object to buffer
         """
         self.write_schedule(self.size_struct.pack(len(bytes)))
         self.write_schedule(bytes)
 
+    @do_async
+    def read_varint(self):
+        """Read varint (see ``Varint``)
+
+        Varint is decoded directly from read buffer, without parser.
+        """
+        with self.reading:
+            while True:
+                value = self.read_buffer.dequeue_varint()
+                if value is not None:
+                    do_return(value)
+                self.read_buffer.enqueue(self.read_size((yield self.read_base())))
+
+    def write_varint(self, value):
+        """Write varint to buffer
+        """
+        return self.write_schedule(varint_encode(value))
+
     @do_async
     def read_struct_list(self, struct, complex=None):
         """Read list of structures
@@ -216,6 +323,74 @@ class BufferedStream(WrappedStream):
         for bytes in bytes_list:
             self.write_schedule(bytes)
 
+    def metrics(self):
+        """Current buffer sizes
+        """
+        return {
+            'read_size': self.read_size.size,
+            'write_size': self.write_size.size,
+            'read_buffer': len(self.read_buffer),
+            'write_buffer': len(self.write_buffer),
+        }
+
+    def __str__(self):
+        return ('{}(read_size:{}, write_size:{}, base:{})'.format(type(self).__name__,
+                self.read_size.size, self.write_size.size, self.base))
+
+
+class BufferSize(object):
+    """Adaptive buffer size
+
+    Size is doubled when observed sample fills it completely, and halved when
+    observed samples stay below a quarter of it for ``SHRINK_COUNT`` consecutive
+    observations. Size is always kept within [size_min, size_max] range.
+    """
+    __slots__ = ('size', 'size_min', 'size_max', 'shrink',)
+    SHRINK_COUNT = 8
+
+    def __init__(self, size, size_min=None, size_max=None):
+        self.size_min = size_min or size
+        self.size_max = max(size_max or size, self.size_min)
+        self.size = min(max(size, self.size_min), self.size_max)
+        self.shrink = 0
+
+    def observe(self, sample):
+        """Observe sample size and adapt buffer size
+        """
+        if sample >= self.size:
+            self.shrink = 0
+            if self.size < self.size_max:
+                self.size = min(self.size << 1, self.size_max)
+        elif sample << 2 < self.size:
+            self.shrink += 1
+            if self.shrink >= self.SHRINK_COUNT:
+                self.shrink = 0
+                self.size = max(self.size >> 1, self.size_min)
+        else:
+            self.shrink = 0
+
+    def __call__(self, data):
+        """Observe size of data chunk
+
+        Returns provided data.
+        """
+        self.observe(len(data))
+        return data
+
+    @property
+    def adaptive(self):
+        return self.size_min != self.size_max
+
+    def __int__(self):
+        return self.size
+
+    def __str__(self):
+        return '{}(size:{}, min:{}, max:{})'.format(type(self).__name__,
+                                                    self.size, self.size_min, self.size_max)
+
+    def __repr__(self):
+        return str(self)
+
 
 class Buffer(object):
     """Bytes FIFO buffer
@@ -297,6 +472,35 @@ class Buffer(object):
         if returns is None or returns:
             return b''.join(data)[offset:size]
 
+    def dequeue_codec(self, codec, count=None, size=None):
+        """Dequeue complete frames decoded with codec from buffer
+
+        Returns list of frames (see ``Codec.decode``).
+        """
+        if not self.chunks:
+            return []
+        frames, offset = codec.decode(self.slice(), count, size)
+        if offset:
+            self.dequeue(offset, False)
+        return frames
+
+    def dequeue_varint(self):
+        """Dequeue varint from buffer
+
+        Returns None if buffer does not contain complete varint.
+        """
+        if not self.chunks:
+            return None
+        data = self.slice(self.varint_size)
+        match = varint_octets.match(data)
+        if match is None:
+            if len(data) >= self.varint_size:
+                raise ValueError('varint is too long')
+            return None
+        self.dequeue(match.end(), False)
+        return varint_decode(match.group())
+    varint_size = 10  # maximum size of 64-bit varint
+
     def __len__(self):
         return self.chunks_size - self.offset
 
@@ -0,0 +1,297 @@
+"""Framing codecs
+
+Codecs split byte stream into frames (messages). Frames are decoded in batches
+from the whole buffered data, and encoded as a list of chunks (vectored) which
+are enqueued to write buffer without concatenation.
+"""
+import struct
+from ..parser import varint_encode, varint_decode, varint_octets, varint_tables
+
+__all__ = ('Codec', 'LengthCodec', 'VarintCodec', 'LineCodec', 'NetstringCodec',
+           'FixedCodec', 'codec_register', 'codec_get',)
+
+
+class Codec(object):
+    """Framing codec
+    """
+    def encode(self, frames):
+        """Encode frames
+
+        Returns list of chunks, concatenation of which is encoded frames.
+        """
+        raise NotImplementedError()
+
+    def decode(self, data, count=None, size=None):
+        """Decode complete frames from data
+
+        At most ``count`` frames with total payload size not exceeding ``size``
+        are decoded (except the first one). Returns list of frames and offset
+        of the first not decoded byte.
+        """
+        raise NotImplementedError()
+
+    def pending(self, data):
+        """Size of data required to decode the first frame
+
+        Data does not contain complete frame. Returns size which is at least
+        one byte more then size of data, if it is unknown.
+        """
+        return len(data) + 1
+
+    def __str__(self):
+        return '{}()'.format(type(self).__name__)
+
+    def __repr__(self):
+        return str(self)
+
+
+class LengthCodec(Codec):
+    """Frames prefixed with length packed with ``format`` struct
+
+    Frames larger then ``frame_max`` (i.g. 65535 bytes for "u16") cannot be
+    encoded.
+    """
+    def __init__(self, format):
+        self.format = format
+        self.struct = struct.Struct(format)
+        self.frame_max = (1 << (8 * self.struct.size)) - 1
+
+    def encode(self, frames):
+        pack, frame_max = self.struct.pack, self.frame_max
+        chunks = []
+        for frame in frames:
+            if len(frame) > frame_max:
+                raise ValueError('frame size {} exceeds {}'.format(len(frame), frame_max))
+            chunks.append(pack(len(frame)))
+            chunks.append(frame)
+        return chunks
+
+    def decode(self, data, count=None, size=None):
+        header_size = self.struct.size
+        unpack_from = self.struct.unpack_from
+        data_size = len(data)
+        frames, frames_size, offset = [], 0, 0
+        while offset + header_size <= data_size:
+            if count is not None and len(frames) >= count:
+                break
+            frame_size = unpack_from(data, offset)[0]
+            frame_end = offset + header_size + frame_size
+            if frame_end > data_size:
+                break
+            if size is not None and frames and frames_size + frame_size > size:
+                break
+            frames.append(data[offset + header_size:frame_end])
+            frames_size += frame_size
+            offset = frame_end
+        return frames, offset
+
+    def pending(self, data):
+        if len(data) < self.struct.size:
+            return self.struct.size
+        return self.struct.size + self.struct.unpack_from(data)[0]
+
+    def __reduce__(self):
+        return LengthCodec, (self.format,)
+
+    def __str__(self):
+        return '{}(format:{})'.format(type(self).__name__, self.format)
+
+
+class VarintCodec(Codec):
+    """Frames prefixed with varint length
+
+    Frame encoding is the same as of ``parser.Bytes``.
+    """
+    def encode(self, frames):
+        table = varint_tables()[0]
+        chunks = []
+        for frame in frames:
+            chunks.append(table.get(len(frame)) or varint_encode(len(frame)))
+            chunks.append(frame)
+        return chunks
+
+    def decode(self, data, count=None, size=None):
+        table = varint_tables()[1]
+        match = varint_octets.match
+        data_size = len(data)
+        frames, frames_size, offset = [], 0, 0
+        while offset < data_size:
+            if count is not None and len(frames) >= count:
+                break
+            header = match(data, offset)
+            if header is None:
+                break
+            header = header.group()
+            frame_size = table.get(header)
+            if frame_size is None:
+                frame_size = varint_decode(header)
+            if frame_size < 0:
+                raise ValueError('negative frame size: {}'.format(frame_size))
+            frame_start = offset + len(header)
+            frame_end = frame_start + frame_size
+            if frame_end > data_size:
+                break
+            if size is not None and frames and frames_size + frame_size > size:
+                break
+            frames.append(data[frame_start:frame_end])
+            frames_size += frame_size
+            offset = frame_end
+        return frames, offset
+
+    def pending(self, data):
+        header = varint_octets.match(data)
+        if header is None:
+            return len(data) + 1
+        return header.end() + varint_decode(header.group())
+
+
+class LineCodec(Codec):
+    """Frames terminated with ``delimiter`` (newline by default)
+
+    Frames must not contain delimiter, decoded frames do not include it.
+    """
+    def __init__(self, delimiter=None):
+        self.delimiter = delimiter or b'\n'
+
+    def encode(self, frames):
+        delimiter = self.delimiter
+        chunks = []
+        for frame in frames:
+            chunks.append(frame)
+            chunks.append(delimiter)
+        return chunks
+
+    def decode(self, data, count=None, size=None):
+        delimiter, delimiter_size = self.delimiter, len(self.delimiter)
+        find = data.find
+        frames, frames_size, offset = [], 0, 0
+        while count is None or len(frames) < count:
+            frame_end = find(delimiter, offset)
+            if frame_end < 0:
+                break
+            frame_size = frame_end - offset
+            if size is not None and frames and frames_size + frame_size > size:
+                break
+            frames.append(data[offset:frame_end])
+            frames_size += frame_size
+            offset = frame_end + delimiter_size
+        return frames, offset
+
+    def __str__(self):
+        return '{}(delimiter:{!r})'.format(type(self).__name__, self.delimiter)
+
+
+class NetstringCodec(Codec):
+    """Netstring frames
+
+    Frame is encoded as "<decimal length>:<frame>,".
+    """
+    header_max = 20  # maximum size of length and colon
+
+    def encode(self, frames):
+        chunks = []
+        for frame in frames:
+            chunks.append(str(len(frame)).encode() + b':')
+            chunks.append(frame)
+            chunks.append(b',')
+        return chunks
+
+    def decode(self, data, count=None, size=None):
+        find = data.find
+        data_size = len(data)
+        frames, frames_size, offset = [], 0, 0
+        while offset < data_size:
+            if count is not None and len(frames) >= count:
+                break
+            colon = find(b':', offset, offset + self.header_max)
+            if colon < 0:
+                if data_size - offset >= self.header_max:
+                    raise ValueError('invalid netstring length')
+                break
+            frame_size = self.frame_size(data[offset:colon])
+            frame_end = colon + 1 + frame_size
+            if frame_end >= data_size:
+                break
+            if data[frame_end:frame_end + 1] != b',':
+                raise ValueError('netstring is not terminated with comma')
+            if size is not None and frames and frames_size + frame_size > size:
+                break
+            frames.append(data[colon + 1:frame_end])
+            frames_size += frame_size
+            offset = frame_end + 1
+        return frames, offset
+
+    def pending(self, data):
+        colon = data.find(b':', 0, self.header_max)
+        if colon < 0:
+            return len(data) + 1
+        return colon + 2 + self.frame_size(data[:colon])
+
+    @staticmethod
+    def frame_size(length):
+        if not length.isdigit():
+            raise ValueError('invalid netstring length: {!r}'.format(length))
+        return int(length)
+
+
+class FixedCodec(Codec):
+    """Frames of fixed ``size``
+    """
+    def __init__(self, size):
+        if size <= 0:
+            raise ValueError('frame size must be positive')
+        self.size = size
+
+    def encode(self, frames):
+        frames = list(frames)
+        for frame in frames:
+            if len(frame) != self.size:
+                raise ValueError('frame size {} is not {}'.format(len(frame), self.size))
+        return frames
+
+    def decode(self, data, count=None, size=None):
+        frame_size = self.size
+        frames_count = len(data) // frame_size
+        if count is not None:
+            frames_count = min(frames_count, count)
+        if size is not None:
+            frames_count = min(frames_count, max(1, size // frame_size))
+        frames = [data[offset:offset + frame_size]
+                  for offset in range(0, frames_count * frame_size, frame_size)]
+        return frames, frames_count * frame_size
+
+    def pending(self, data):
+        return self.size
+
+    def __str__(self):
+        return '{}(size:{})'.format(type(self).__name__, self.size)
+
+
+def codec_register(name, codec):
+    """Register codec with name
+
+    Returns registered codec.
+    """
+    codecs[name] = codec
+    return codec
+
+
+def codec_get(codec):
+    """Get codec by its registered name
+
+    Codec instance is returned as is.
+    """
+    if isinstance(codec, Codec):
+        return codec
+    try:
+        return codecs[codec]
+    except KeyError:
+        raise ValueError('unknown codec: {}'.format(codec))
+
+
+codecs = {}
+codec_register('u16', LengthCodec('>H'))
+codec_register('u32', LengthCodec('>I'))
+codec_register('varint', VarintCodec())
+codec_register('line', LineCodec())
+codec_register('netstring', NetstringCodec())
@@ -0,0 +1,302 @@
+"""Datagram socket
+
+Datagram (UDP) socket with batched receiving and sending of datagrams.
+"""
+import os
+import sys
+import errno
+import socket
+import struct
+try:
+    import ctypes
+except ImportError:
+    ctypes = None
+
+from .sock import Socket
+from ..core import POLL_READ, POLL_WRITE
+from ..monad import do_async, do_return
+from ..uniform import BlockingErrorSet
+
+__all__ = ('DatagramSocket',)
+
+
+class DatagramSocket(Socket):
+    """Datagram socket
+
+    Socket must be bound or connected before it is used (or created with
+    ``init`` set). ``recv_batch`` and ``send_batch`` receive and send all
+    datagrams available on single readiness event. If ``mmsg`` is set and
+    recvmmsg/sendmmsg are available (linux), each batch is transferred with
+    single system call, otherwise with system call per datagram. It pays off
+    only if system calls are expensive, as headers of the batch are packed and
+    unpacked in python.
+    """
+    def __init__(self, sock=None, init=None, core=None, family=None, mmsg=None):
+        if sock is None:
+            sock = socket.socket(family or socket.AF_INET, socket.SOCK_DGRAM)
+        Socket.__init__(self, sock, init, core)
+        self.mmsg = bool(mmsg) and _mmsg is not None and sock.family in _SOCKADDR_FAMILIES
+        self.recv_bufs = None
+        self.send_names = {}  # address -> sockaddr cache
+
+    @do_async
+    def recv(self, size=None):
+        """Receive datagram
+
+        Returns (data, address) pair.
+        """
+        do_return((yield self.recv_batch(1, size))[0])
+
+    @do_async
+    def send(self, data, address=None):
+        """Send datagram
+
+        Sent to connected address if address is not specified.
+        """
+        yield self.send_batch(((data, address),))
+
+    @do_async
+    def recv_batch(self, count=None, size=None):
+        """Receive datagrams in batch
+
+        Waits for at least one datagram, then receives datagrams until there
+        are no more available or ``count`` (64 by default) datagrams has been
+        received. Datagrams longer then ``size`` (65535 by default) are
+        truncated. Returns list of (data, address) pairs.
+        """
+        count = count or 64
+        size = size or 65535
+        with self.reading:
+            while True:
+                msgs = (self.recv_mmsg(count, size) if self.mmsg else
+                        self.recv_many(count, size))
+                if msgs:
+                    do_return(msgs)
+                yield self.core.poll(self.fd, POLL_READ)
+
+    @do_async
+    def send_batch(self, msgs):
+        """Send datagrams in batch
+
+        Each message is either data (sent to connected address) or (data,
+        address) pair. Returns number of sent datagrams.
+        """
+        msgs = [(msg, None) if isinstance(msg, bytes) else msg for msg in msgs]
+        with self.writing:
+            sent = 0
+            while sent < len(msgs):
+                count = (self.send_mmsg(msgs, sent) if self.mmsg else
+                         self.send_many(msgs, sent))
+                if count:
+                    sent += count
+                else:
+                    yield self.core.poll(self.fd, POLL_WRITE)
+            do_return(sent)
+
+    def recv_many(self, count, size):
+        """Receive available datagrams with python call per datagram
+        """
+        msgs = []
+        try:
+            while len(msgs) < count:
+                msgs.append(self.sock.recvfrom(size))
+        except socket.error as error:
+            if error.errno not in BlockingErrorSet and not msgs:
+                raise
+        return msgs
+
+    def send_many(self, msgs, offset):
+        """Send datagrams with python call per datagram
+
+        Returns number of datagrams sent until socket would block.
+        """
+        sent = 0
+        try:
+            for data, address in msgs[offset:]:
+                if address is None:
+                    self.sock.send(data)
+                else:
+                    self.sock.sendto(data, address)
+                sent += 1
+        except socket.error as error:
+            if error.errno not in BlockingErrorSet and not sent:
+                raise
+        return sent
+
+    def recv_mmsg(self, count, size):
+        """Receive available datagrams with single recvmmsg call
+        """
+        bufs = self.recv_bufs
+        if bufs is None or bufs.count < count or bufs.size != size:
+            bufs = self.recv_bufs = _RecvBuffers(count, size)
+        while True:
+            received = _mmsg.recvmmsg(self.fd, bufs.hdrs_addr, count, _MSG_DONTWAIT, None)
+            if received >= 0:
+                return bufs.messages(received)
+            error = ctypes.get_errno()
+            if error in BlockingErrorSet:
+                return []
+            elif error != errno.EINTR:
+                raise socket.error(error, os.strerror(error))
+
+    def send_mmsg(self, msgs, offset):
+        """Send datagrams with single sendmmsg call
+
+        Returns number of datagrams sent until socket would block.
+        """
+        msgs = msgs[offset:offset + _MMSG_MAX]
+        count = len(msgs)
+        datas, names, names_cache = [], [], self.send_names
+        for data, address in msgs:
+            name = names_cache.get(address)
+            if name is None:
+                name = b'' if address is None else _sockaddr_pack(address)
+                if name is None:
+                    return self.send_many(msgs, 0)  # address must be resolved
+                if len(names_cache) > 1024:
+                    names_cache.clear()
+                names_cache[address] = name
+            datas.append(data)
+            names.append(name)
+
+        data_buf, data_addr = _buffer(b''.join(datas))
+        names_buf, names_addr = _buffer(b''.join(names))
+        iovs, data_offset = [], 0
+        for data in datas:
+            iovs.extend((data_addr + data_offset, len(data)))
+            data_offset += len(data)
+        iovs_buf, iovs_addr = _buffer(struct.pack('@' + _iovec_format * count, *iovs))
+        hdrs, name_offset = [], 0
+        for index, name in enumerate(names):
+            hdrs.extend((names_addr + name_offset if name else 0, len(name),
+                         iovs_addr + index * _iovec.size, 1, 0, 0, 0, 0))
+            name_offset += len(name)
+        hdrs_buf, hdrs_addr = _buffer(struct.pack('@' + _mmsghdr_format * count, *hdrs))
+
+        while True:
+            sent = _mmsg.sendmmsg(self.fd, hdrs_addr, count, _MSG_DONTWAIT)
+            if sent >= 0:
+                return sent
+            error = ctypes.get_errno()
+            if error in BlockingErrorSet:
+                return 0
+            elif error != errno.EINTR:
+                raise socket.error(error, os.strerror(error))
+
+
+# recvmmsg/sendmmsg bindings
+_MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+_MMSG_MAX = 1024  # UIO_MAXIOV
+_SOCKADDR_FAMILIES = (socket.AF_INET, getattr(socket, 'AF_INET6', None))
+_SOCKADDR_SIZE = 128  # sizeof(struct sockaddr_storage)
+_size_t = {4: 'L', 8: 'Q'}[ctypes.sizeof(ctypes.c_size_t) if ctypes else struct.calcsize('P')]
+_iovec_format = 'P' + _size_t  # struct iovec
+_iovec = struct.Struct('@' + _iovec_format)
+_mmsghdr_format = 'PIP{0}P{0}i0PI0P'.format(_size_t)  # struct mmsghdr
+_mmsghdr = struct.Struct('@' + _mmsghdr_format)
+_mmsghdr_namelen = struct.calcsize('@P')  # offset of msg_hdr.msg_namelen
+_mmsghdr_len = struct.calcsize('@PIP{0}P{0}i0P'.format(_size_t))  # offset of msg_len
+_mmsg = None
+
+
+def _buffer(data):
+    """Create mutable buffer with data
+
+    Returns buffer (must be kept alive while address is used) and its address.
+    """
+    buf = bytearray(data or b'\0')
+    return buf, ctypes.addressof(ctypes.c_char.from_buffer(buf))
+
+
+class _RecvBuffers(object):
+    """Preallocated receive buffers and headers for recvmmsg
+    """
+    def __init__(self, count, size):
+        self.count = count
+        self.size = size
+        self.data, data_addr = _buffer(b'\0' * (count * size))
+        self.names, names_addr = _buffer(b'\0' * (count * _SOCKADDR_SIZE))
+        self.iovs, iovs_addr = _buffer(b''.join(_iovec.pack(data_addr + index * size, size)
+                                                for index in range(count)))
+        self.hdrs, self.hdrs_addr = _buffer(b''.join(_mmsghdr.pack(
+            names_addr + index * _SOCKADDR_SIZE, _SOCKADDR_SIZE,
+            iovs_addr + index * _iovec.size, 1, 0, 0, 0, 0) for index in range(count)))
+        self.hdrs_init = bytes(self.hdrs)
+        self.addrs = {}  # sockaddr -> address cache
+        self.lens = {}  # count -> headers lengths struct
+
+    def messages(self, count):
+        """Received (data, address) pairs
+
+        Headers are reset to initial state, so buffers can be reused.
+        """
+        lens = self.lens.get(count)
+        if lens is None:
+            lens = self.lens[count] = struct.Struct('=' + '{}xI{}xI{}x'.format(
+                _mmsghdr_namelen, _mmsghdr_len - _mmsghdr_namelen - 4,
+                _mmsghdr.size - _mmsghdr_len - 4) * count)
+        lens = lens.unpack_from(self.hdrs)
+        self.hdrs[:count * _mmsghdr.size] = self.hdrs_init[:count * _mmsghdr.size]
+
+        data, names, size, addrs = self.data, self.names, self.size, self.addrs
+        msgs = []
+        for index in range(count):
+            name = bytes(names[index * _SOCKADDR_SIZE:index * _SOCKADDR_SIZE + lens[2 * index]])
+            address = addrs.get(name)
+            if address is None:
+                if len(addrs) > 1024:
+                    addrs.clear()
+                address = addrs[name] = _sockaddr_unpack(name)
+            msgs.append((bytes(data[index * size:index * size + lens[2 * index + 1]]), address))
+        return msgs
+
+
+if ctypes is not None and sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint,
+                                   ctypes.c_int, ctypes.c_void_p]
+        _libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint,
+                                   ctypes.c_int]
+        _mmsg = _libc
+    except (OSError, AttributeError):
+        pass
+
+
+_sockaddr_in = struct.Struct('=H2s4s8x')
+_sockaddr_in6 = struct.Struct('=H2s4s16sI')
+
+
+def _sockaddr_pack(address):
+    """Pack numeric IPv4 or IPv6 address to sockaddr structure
+
+    Returns None if address is not numeric.
+    """
+    host, port = address[0], struct.pack('>H', address[1])
+    try:
+        return _sockaddr_in.pack(socket.AF_INET, port, socket.inet_pton(socket.AF_INET, host))
+    except (socket.error, ValueError, TypeError):
+        pass
+    try:
+        flowinfo = struct.pack('>I', address[2] if len(address) > 2 else 0)
+        return _sockaddr_in6.pack(socket.AF_INET6, port, flowinfo,
+                                  socket.inet_pton(socket.AF_INET6, host),
+                                  address[3] if len(address) > 3 else 0)
+    except (socket.error, ValueError, TypeError, AttributeError):
+        return None
+
+
+def _sockaddr_unpack(name):
+    """Unpack sockaddr structure to python address
+    """
+    if not name:
+        return None
+    family = struct.unpack_from('=H', name)[0]
+    if family == socket.AF_INET:
+        _, port, host = _sockaddr_in.unpack_from(name)
+        return socket.inet_ntop(socket.AF_INET, host), struct.unpack('>H', port)[0]
+    elif family == getattr(socket, 'AF_INET6', None):
+        _, port, flowinfo, host, scope = _sockaddr_in6.unpack_from(name)
+        return (socket.inet_ntop(socket.AF_INET6, host), struct.unpack('>H', port)[0],
+                struct.unpack('>I', flowinfo)[0], scope)
+    return name
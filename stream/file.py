@@ -3,12 +3,15 @@
 File stream is stream created from file descriptor.
 """
 import os
+import stat
 import errno
 import fcntl
+import threading
 from .stream import Stream
 from .buffered import BufferedStream
 from ..core import Core, POLL_READ, POLL_WRITE
-from ..monad import do_async, do_return
+from ..task import ThreadPool
+from ..monad import Result, async_block, async_limit, do_async, do_return
 from ..uniform import BrokenPipeError, BlockingErrorSet, PipeErrorSet
 
 __all__ = ('File', 'BufferedFile', 'fd_close_on_exec', 'fd_blocking',)
@@ -17,7 +20,14 @@ __all__ = ('File', 'BufferedFile', 'fd_close_on_exec', 'fd_blocking',)
 class File(Stream):
     """File stream
 
-    File stream is stream created from file descriptor.
+    File stream is stream created from file descriptor. Regular files and block
+    devices are always reported ready by poller, so their reads and writes are
+    executed on thread pool (one operation at a time per file) with positional
+    I/O, and file position is tracked by the stream itself. Waiting operations
+    fail with BrokenPipeError once file is disposed, but descriptor is closed
+    only after operation being executed is completed. Result of operation
+    completed after file has been detached or disposed is dropped, so detached
+    descriptor is positioned after delivered results.
     """
     def __init__(self, fd, closefd=None, init=None, core=None):
         Stream.__init__(self)
@@ -26,6 +36,18 @@ class File(Stream):
         self.closefd = closefd is None or closefd
         self.core = core or Core.local()
         self.blocking(False)
+
+        mode = os.fstat(self.fd).st_mode
+        self.regular = stat.S_ISREG(mode) or stat.S_ISBLK(mode)
+        if self.regular:
+            self.offset = os.lseek(self.fd, 0, os.SEEK_CUR)
+            self.append = bool(fcntl.fcntl(self.fd, fcntl.F_GETFL) & os.O_APPEND)
+            self.queue = async_limit(1)(lambda *args: ThreadPool.main()(*args))
+            self.waiters = set()
+            self.pending = 0  # count of queued operations
+            self.closing = None  # descriptor to be closed once operations are completed
+        self.lock = threading.Lock()  # held by operations using file position
+
         if init is None or init:
             self.initing()
 
@@ -35,6 +57,11 @@ class File(Stream):
     @do_async
     def read(self, size):
         with self.reading:
+            if self.regular:
+                data = yield self.regular_call(self.regular_read, size)
+                if size and not data:
+                    raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+                do_return(data)
             while True:
                 try:
                     data = os.read(self.fd, size)
@@ -51,6 +78,8 @@ class File(Stream):
     @do_async
     def write(self, data):
         with self.writing:
+            if self.regular:
+                do_return((yield self.regular_call(self.regular_write, data)))
             while True:
                 try:
                     do_return(os.write(self.fd, data))
@@ -61,22 +90,104 @@ class File(Stream):
                         raise
                 yield self.core.poll(self.fd, POLL_WRITE)
 
+    def regular_call(self, func, *args):
+        """Execute regular file operation on thread pool
+
+        Operation returns its result and new offset, offset is updated only if
+        result is delivered (file has neither been detached nor disposed).
+        """
+        @async_block
+        def regular_cont(ret):
+            if self.fd < 0:
+                raise BrokenPipeError(errno.EPIPE, 'file is disposed')
+
+            def regular_ret(result):
+                self.pending -= 1
+                if not self.pending and self.closing is not None:
+                    fd, self.closing = self.closing, None
+                    os.close(fd)
+                if ret not in self.waiters:
+                    return  # file is detached or disposed
+                self.waiters.discard(ret)
+                if result.error is None:
+                    value, self.offset = result.value
+                    result = Result.from_value(value)
+                ret(result)
+            self.waiters.add(ret)
+            self.pending += 1
+            self.queue(func, self.fd, *args)(regular_ret)
+        return regular_cont
+
+    def regular_read(self, fd, size):
+        """Read regular file at current offset
+
+        Executed on thread pool.
+        """
+        if pread is None:
+            with self.lock:  # file position is shared with detach
+                self.regular_check()
+                os.lseek(fd, self.offset, os.SEEK_SET)
+                data = os.read(fd, size)
+        else:
+            self.regular_check()
+            data = pread(fd, size, self.offset)
+        return data, self.offset + len(data)
+
+    def regular_write(self, fd, data):
+        """Write regular file at current offset
+
+        Executed on thread pool.
+        """
+        if self.append:
+            self.regular_check()
+            size = os.write(fd, data)
+            return size, os.lseek(fd, 0, os.SEEK_CUR)
+        elif pwrite is None:
+            with self.lock:  # file position is shared with detach
+                self.regular_check()
+                os.lseek(fd, self.offset, os.SEEK_SET)
+                size = os.write(fd, data)
+        else:
+            self.regular_check()
+            size = pwrite(fd, data, self.offset)
+        return size, self.offset + size
+
+    def regular_check(self):
+        """Check that file is neither detached nor disposed
+        """
+        if self.fd < 0:
+            raise BrokenPipeError(errno.EPIPE, 'file is disposed')
+
     def dispose(self):
         if Stream.dispose(self):
             fd, self.fd = self.fd, -1
-            self.core.poll(fd, None)()  # resolve with BrokenPipeError
+            if not self.regular:
+                self.core.poll(fd, None)()  # resolve with BrokenPipeError
+            else:
+                waiters, self.waiters = self.waiters, set()
+                error = Result.from_exception(BrokenPipeError(errno.EPIPE, 'file is disposed'))
+                for ret in waiters:
+                    ret(error)
             if self.closefd:
-                os.close(fd)
+                if self.regular and self.pending:
+                    self.closing = fd  # closed once operations are completed
+                else:
+                    os.close(fd)
             return True
         return False
 
     def detach(self):
         if self.disposed:
             raise ValueError('file is disposed')
+        fd = self.fd
         try:
             self.closefd = False
             self.blocking(True)
-            return self.fd
+            if self.regular:
+                with self.lock:  # wait for operation without positional I/O
+                    os.lseek(fd, self.offset, os.SEEK_SET)
+                    self.fd = -1
+            return fd
         finally:
             self.dispose()
 
@@ -106,6 +217,10 @@ class BufferedFile(BufferedStream):
         return BufferedStream.detach(self).detach()
 
 
+pread = getattr(os, 'pread', None)
+pwrite = getattr(os, 'pwrite', None)
+
+
 def fd_close_on_exec(fd, enable=None):
     """Set or get file descriptors close_on_exec flag
     """
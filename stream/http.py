@@ -0,0 +1,526 @@
+"""HTTP/1.1 protocol
+
+Streaming HTTP/1.1 client and server over buffered streams. Message heads are
+parsed incrementally with parser combinators, bodies are read and written as
+sequences of chunks (chunked transfer encoding is handled transparently),
+connections are kept alive and requests can be pipelined.
+"""
+import socket
+from .sock import BufferedSocket
+from .server import Server
+from .resolver import connect_host
+from ..event import Event
+from ..monad import Result, do_async, do_return, async_limit
+from ..parser import ParserError, fuse, string, take_while_bytes
+from ..uniform import BrokenPipeError
+try:
+    from http.client import responses as _REASONS
+except ImportError:
+    from httplib import responses as _REASONS
+
+__all__ = ('HTTPError', 'HTTPRequest', 'HTTPResponse', 'HTTPBody', 'HTTPConnection',
+           'HTTPServer',)
+
+
+class HTTPError(Exception):
+    """HTTP protocol error
+    """
+
+
+class HTTPMessage(object):
+    """HTTP message
+
+    Headers are list of (name, value) pairs. Body of outgoing message is bytes,
+    iterable of bytes, or object with asynchronous ``read`` method returning
+    chunks until empty chunk (such as ``HTTPBody`` of received message). Body
+    of received message is always ``HTTPBody``.
+    """
+    def __init__(self, headers=None, body=None, version=None):
+        self.headers = list(headers or ())
+        self.body = body
+        self.version = version or b'1.1'
+
+    def header(self, name, default=None):
+        """Value of the first header with name (case insensitive)
+        """
+        name = _bytes(name).lower()
+        for key, value in self.headers:
+            if _bytes(key).lower() == name:
+                return value
+        return default
+
+    @property
+    def keep_alive(self):
+        """Whether connection can be reused after this message
+        """
+        connection = _bytes(self.header(b'connection', b'')).lower()
+        if _bytes(self.version) == b'1.0':
+            return b'keep-alive' in connection
+        return b'close' not in connection
+
+
+class HTTPRequest(HTTPMessage):
+    """HTTP request
+    """
+    def __init__(self, method, target, headers=None, body=None, version=None):
+        HTTPMessage.__init__(self, headers, body, version)
+        self.method = _bytes(method)
+        self.target = _bytes(target)
+
+    def __str__(self):
+        return '{}(method:{}, target:{})'.format(type(self).__name__,
+                                                 self.method.decode(), self.target.decode())
+
+    def __repr__(self):
+        return str(self)
+
+
+class HTTPResponse(HTTPMessage):
+    """HTTP response
+    """
+    def __init__(self, status=None, headers=None, body=None, reason=None, version=None):
+        HTTPMessage.__init__(self, headers, body, version)
+        self.status = status or 200
+        self.reason = _bytes(_REASONS.get(self.status, '') if reason is None else reason)
+
+    def __str__(self):
+        return '{}(status:{}, reason:{})'.format(type(self).__name__,
+                                                 self.status, self.reason.decode())
+
+    def __repr__(self):
+        return str(self)
+
+
+class HTTPBody(object):
+    """Body of received HTTP message
+
+    Body is read from ``stream`` with ``read`` as data arrives. Body is delimited
+    by ``length`` or by chunked transfer encoding if ``chunked`` is set, if
+    neither is specified body is delimited by closed connection.
+    """
+    def __init__(self, stream, length=None, chunked=None):
+        self.stream = stream
+        self.length = length  # remaining length of the body or of the current chunk
+        self.chunked = bool(chunked)
+        self.trailers = []
+        self.done = not chunked and length == 0
+        self.on_done = Event()
+
+    @do_async
+    def read(self):
+        """Read next chunk of the body
+
+        Returns empty chunk if body has been read completely.
+        """
+        if self.done:
+            do_return(b'')
+        stream = self.stream
+        try:
+            if self.chunked:
+                if not self.length:
+                    # previous chunk is followed by CRLF
+                    line = yield stream.parse(_chunk_size if self.length is None else
+                                              _chunk_next, _HEAD_MAX)
+                    try:
+                        self.length = int(line[-3], 16)
+                    except ValueError:
+                        raise HTTPError('invalid chunk size: {!r}'.format(line[-3]))
+                    if not self.length:
+                        self.trailers = _head_headers((yield stream.parse(_headers, _HEAD_MAX)))
+                        self.finish()
+                        do_return(b'')
+                data = yield stream.read(self.length)
+                self.length -= len(data)
+            elif self.length is None:
+                try:
+                    data = yield stream.read(stream.bufsize)
+                except BrokenPipeError:
+                    self.finish()
+                    do_return(b'')
+            else:
+                data = yield stream.read(min(self.length, stream.bufsize))
+                self.length -= len(data)
+                if not self.length:
+                    self.finish()
+        except Exception:
+            self.finish()
+            raise
+        do_return(data)
+
+    @do_async
+    def read_all(self):
+        """Read the whole body
+        """
+        if not self.chunked and self.length:
+            try:
+                data = yield self.stream.read_until_size(self.length)
+            finally:
+                self.length = 0
+                self.finish()
+            do_return(data)
+        chunks = []
+        while True:
+            chunk = yield self.read()
+            if not chunk:
+                break
+            chunks.append(chunk)
+        do_return(b''.join(chunks))
+
+    @do_async
+    def drain(self):
+        """Read and discard rest of the body
+        """
+        while not self.done:
+            yield self.read()
+
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.on_done(self)
+
+    def __str__(self):
+        return '{}(length:{}, chunked:{}, done:{})'.format(type(self).__name__,
+                                                          self.length, self.chunked, self.done)
+
+    def __repr__(self):
+        return str(self)
+
+
+class HTTPConnection(object):
+    """HTTP/1.1 client connection
+
+    Requests are sent over buffered ``stream`` in order in which continuations
+    returned by ``request`` are started. Request is sent without waiting for
+    responses to previous requests (pipelining), writes of requests issued
+    during the same core iteration are coalesced. Response is resolved once its
+    head is received, its body must be read (or drained) before response to
+    the next request can be received.
+    """
+    def __init__(self, stream, host=None):
+        self.stream = stream
+        self.host = _bytes(host) if host is not None else None
+        self.body = None  # body of the last received response
+        self.send = async_limit(1)(self.send_request)
+        self.recv = async_limit(1)(self.recv_response)
+
+    @classmethod
+    @do_async
+    def connect(cls, address, bufsize=None, core=None):
+        """Connect to HTTP server
+
+        Address is either (host, port) pair or unix socket path.
+        """
+        if isinstance(address, tuple):
+            stream = yield connect_host(address[0], address[1], core=core,
+                                        factory=lambda sock: BufferedSocket(sock, bufsize,
+                                                                            core=core))
+            do_return(cls(stream, '{}:{}'.format(*address[:2])))
+        stream = BufferedSocket(socket.socket(socket.AF_UNIX), bufsize, core=core)
+        try:
+            yield stream.connect(address)
+        except Exception:
+            stream.dispose()
+            raise
+        do_return(cls(stream))
+
+    @do_async
+    def request(self, method, target, headers=None, body=None):
+        """Send request and receive response
+
+        Returns response, with body which has not been read yet.
+        """
+        request = HTTPRequest(method, target, headers, body)
+        send = self.send(request).future()
+        recv = self.recv(request).future()
+        yield send
+        do_return((yield recv))
+
+    @do_async
+    def send_request(self, request):
+        """Write request to the stream
+
+        Must only be called with ``send`` which preserves order of requests.
+        """
+        headers = request.headers
+        if self.host is not None and request.header(b'host') is None:
+            headers = [(b'Host', self.host)] + headers
+        try:
+            body, _ = _write_message(self.stream, b''.join((request.method, b' ', request.target,
+                                                            b' HTTP/1.1\r\n')),
+                                     headers, request.body, request.body is not None)
+            if body is not None:
+                yield body
+            self.stream.flush_schedule()
+        except Exception:
+            self.stream.dispose()  # connection state is unknown, fail pending responses
+            raise
+
+    @do_async
+    def recv_response(self, request):
+        """Read response from the stream
+
+        Must only be called with ``recv`` which preserves order of responses.
+        """
+        body = self.body
+        if body is not None and not body.done:
+            yield body.on_done
+        response = yield _read_response(self.stream, request.method)
+        self.body = response.body
+        do_return(response)
+
+    def dispose(self):
+        self.stream.dispose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, et, eo, tb):
+        self.dispose()
+        return False
+
+    def __str__(self):
+        return '{}(host:{}, stream:{})'.format(type(self).__name__, self.host, self.stream)
+
+    def __repr__(self):
+        return str(self)
+
+
+class HTTPServer(Server):
+    """HTTP/1.1 server
+
+    Calls asynchronous ``handler(request)`` for each received request, which
+    must return ``HTTPResponse``. Connections are kept alive, pipelined requests
+    are handled one after another and responses to requests which has already
+    been received are written together. Request body which has not been read by
+    handler is discarded. Malformed requests and requests with head larger then
+    ``_HEAD_MAX`` bytes are answered with 400 and connection is closed.
+    """
+    def __init__(self, handler, limit=None, bufsize=None, core=None):
+        Server.__init__(self, self.serve_client, limit, bufsize, core)
+        self.request_handler = handler
+
+    @do_async
+    def serve_client(self, stream, address):
+        """Serve requests received from client stream
+        """
+        while True:
+            try:
+                request = yield _read_request(stream)
+            except BrokenPipeError:
+                break  # client has closed connection
+            except (ParserError, HTTPError):
+                _write_message(stream, _status_line(400, None),
+                               ((b'Connection', b'close'),), None, True)
+                yield stream.flush()
+                break
+
+            if not request.body.done and _bytes(request.header(b'expect', b'')).lower() == \
+                    b'100-continue':
+                stream.write_schedule(b'HTTP/1.1 100 Continue\r\n\r\n')
+                stream.flush_schedule()
+            try:
+                response = yield self.request_handler(request)
+            except Exception:
+                Result.from_current_error().trace(
+                    banner=lambda: '[http] handler failed: {} {}'.format(address, request))
+                response = HTTPResponse(500, ((b'Connection', b'close'),))
+
+            keep_alive = request.keep_alive and response.keep_alive
+            headers = response.headers
+            if not keep_alive:
+                if response.header(b'connection') is None:
+                    headers = headers + [(b'Connection', b'close')]
+            elif request.version == b'1.0':
+                headers = headers + [(b'Connection', b'keep-alive')]
+            status = response.status
+            body, close = _write_message(stream, _status_line(status, response.reason),
+                                         headers, response.body,
+                                         status >= 200 and status not in (204, 304),
+                                         request.method == b'HEAD', request.version != b'1.0')
+            if body is not None:
+                yield body
+            if close or not keep_alive:
+                yield stream.flush()
+                break
+            elif len(stream.write_buffer) > stream.bufsize:
+                yield stream.flush()  # client does not keep up with pipelined responses
+            else:
+                stream.flush_schedule()
+            if not request.body.done:
+                yield request.body.drain()
+
+
+@do_async
+def _read_request(stream):
+    """Read request head from the stream
+    """
+    line, headers = yield stream.parse(_request_head, _HEAD_MAX)
+    method, _, target, _, version, _ = line
+    if not method or not target:
+        raise HTTPError('invalid request line: {!r}'.format(line))
+    headers = _head_headers(headers)
+    request = HTTPRequest(method, target, headers, None, version)
+    request.body = HTTPBody(stream, *_head_framing(headers, 0))
+    do_return(request)
+
+
+@do_async
+def _read_response(stream, method):
+    """Read response head from the stream
+
+    Informational responses are skipped.
+    """
+    while True:
+        line, headers = yield stream.parse(_status_head, _HEAD_MAX)
+        _, version, _, status, reason, _ = line
+        try:
+            status = int(status)
+        except ValueError:
+            raise HTTPError('invalid status line: {!r}'.format(line))
+        if status >= 200 or status == 101:
+            break
+    headers = _head_headers(headers)
+    response = HTTPResponse(status, headers, None, reason.strip(), version)
+    if method == b'HEAD' or status < 200 or status in (204, 304):
+        response.body = HTTPBody(stream, 0)
+    else:
+        response.body = HTTPBody(stream, *_head_framing(headers, None))
+    do_return(response)
+
+
+def _write_message(stream, line, headers, body, length, empty=None, chunked=True):
+    """Write message to the stream
+
+    Bytes body is written with content length (if ``length`` is required, even
+    when it is empty), streaming body with chunked encoding if ``chunked`` is
+    allowed, or delimited by connection close. Body of ``empty`` message (i.g.
+    response to HEAD) is not written. Returns continuation writing streaming
+    body (or None) and whether connection must be closed.
+    """
+    streaming = body is not None and not isinstance(body, bytes)
+    head = [line]
+    has_length = False
+    for name, value in headers:
+        name = _bytes(name)
+        if name.lower() == b'content-length':
+            has_length = True
+        head.extend((name, b': ', _bytes(value), b'\r\n'))
+    close = False
+    if has_length:
+        chunked = False
+    elif not streaming:
+        if body or (length and not empty):
+            head.extend((b'Content-Length: ', str(len(body or b'')).encode(), b'\r\n'))
+    elif chunked:
+        head.append(b'Transfer-Encoding: chunked\r\n')
+    else:
+        close = True
+    head.append(b'\r\n')
+    if empty or not streaming:
+        if body and not empty:
+            head.append(body)
+        stream.write_schedule(b''.join(head))
+        return None, close
+    stream.write_schedule(b''.join(head))
+    return _write_body(stream, body, chunked), close
+
+
+@do_async
+def _write_body(stream, body, chunked):
+    """Write streaming body to the stream
+    """
+    reader = getattr(body, 'read', None)
+    chunks = None if reader else iter(body)
+    while True:
+        if reader:
+            chunk = yield reader()
+            if not chunk:
+                break
+            stream.flush_schedule()  # chunks may be produced slowly
+        else:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            elif not chunk:
+                continue
+        if chunked:
+            stream.write_schedule('{:x}\r\n'.format(len(chunk)).encode())
+            yield stream.write(chunk)
+            stream.write_schedule(b'\r\n')
+        else:
+            yield stream.write(chunk)
+    if chunked:
+        stream.write_schedule(b'0\r\n\r\n')
+
+
+def _head_headers(headers):
+    """Convert parsed headers to (name, value) pairs
+    """
+    pairs = []
+    for name, _, value, _ in headers:
+        if not name:
+            raise HTTPError('invalid header: {!r}'.format(value))
+        pairs.append((name, value.strip(b' \t')))
+    return pairs
+
+
+def _head_framing(headers, length):
+    """Body (length, chunked) framing defined by headers
+
+    Default ``length`` is used if neither content length nor chunked transfer
+    encoding is specified.
+    """
+    chunked = False
+    for name, value in headers:
+        name = name.lower()
+        if name == b'transfer-encoding':
+            chunked = value.lower().endswith(b'chunked')
+        elif name == b'content-length':
+            try:
+                length = int(value)
+            except ValueError:
+                length = -1
+            if length < 0:
+                raise HTTPError('invalid content length: {!r}'.format(value))
+    return (None, True) if chunked else (length, False)
+
+
+def _status_line(status, reason):
+    """Response status line
+    """
+    line = _status_lines.get((status, reason))
+    if line is None:
+        if len(_status_lines) > 1024:
+            _status_lines.clear()
+        line = _status_lines[(status, reason)] = b''.join((
+            b'HTTP/1.1 ', str(status).encode(), b' ',
+            _bytes(_REASONS.get(status, '') if reason is None else reason), b'\r\n'))
+    return line
+_status_lines = {}
+
+
+def _bytes(value):
+    """Convert header value to bytes
+    """
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('latin-1')
+
+
+_HEAD_MAX = 65536  # maximum size of message head, chunk size line or trailers
+_TOKEN = b"!#$%&'*+-.^_`|~0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_TARGET = bytes(bytearray(range(0x21, 0x7f)))
+_TEXT = bytes(bytearray(set(range(256)) - set(bytearray(b'\r\n'))))
+_VERSION = b'0123456789.'
+_HEX = b'0123456789abcdefABCDEF'
+
+_headers = fuse(take_while_bytes(_TOKEN), string(b':'), take_while_bytes(_TEXT),
+                string(b'\r\n')).many_till(string(b'\r\n'))
+_request_head = fuse(take_while_bytes(_TOKEN), string(b' '), take_while_bytes(_TARGET),
+                     string(b' HTTP/'), take_while_bytes(_VERSION), string(b'\r\n')) & _headers
+_status_head = fuse(string(b'HTTP/'), take_while_bytes(_VERSION), string(b' '),
+                    take_while_bytes(b'0123456789'), take_while_bytes(_TEXT),
+                    string(b'\r\n')) & _headers
+_chunk_size = fuse(take_while_bytes(_HEX), take_while_bytes(_TEXT), string(b'\r\n'))
+_chunk_next = fuse(string(b'\r\n'), take_while_bytes(_HEX), take_while_bytes(_TEXT),
+                   string(b'\r\n'))
@@ -0,0 +1,318 @@
+"""Memory mapped file stream
+
+Read only stream over memory mapped file, which returns zero-copy slices of
+the mapping and prefetches file pages on thread pool.
+"""
+import io
+import os
+import mmap
+import errno
+import struct
+import threading
+from .stream import Stream
+from .file import pread
+from .. import PRETZEL_BUFSIZE
+from ..task import ThreadPool
+from ..parser import ParserResult, ParserError
+from ..monad import Cont, do_async, do_return, async_all
+from ..uniform import BrokenPipeError
+
+__all__ = ('MmapFile',)
+
+
+class MmapFile(Stream):
+    """Memory mapped file stream
+
+    Read only stream over memory mapped file. Reads return zero-copy memoryview
+    slices of the mapping (copies on python 2, where mmap does not export
+    buffer). Windows of ``readahead`` size ahead of current position are read to
+    page cache by thread pool (positional reads release GIL), so core is not
+    blocked by page faults waiting for disk. ``parse`` copies window sized chunks
+    as parsers operate on bytes.
+    """
+    size_struct = struct.Struct('>I')
+
+    def __init__(self, file, readahead=None, closefd=None, pool=None):
+        Stream.__init__(self)
+
+        if isinstance(file, (str, bytes)):
+            self.fd = os.open(file, os.O_RDONLY)
+            self.closefd = True
+        else:
+            self.fd = file if isinstance(file, int) else file.fileno()
+            self.closefd = closefd is None or closefd
+        self.pool = pool
+
+        readahead = readahead or PRETZEL_BUFSIZE * 16
+        self.readahead = max(1, readahead // mmap.PAGESIZE) * mmap.PAGESIZE
+        self.windows = {}
+        self.windows_lock = None if pread else threading.Lock()  # guards file position
+
+        self.size = os.fstat(self.fd).st_size
+        self.position = 0
+        if self.size:
+            self.mmap = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+            try:
+                self.view = memoryview(self.mmap)
+            except TypeError:
+                self.view = None  # python 2 mmap does not support memoryview
+        else:
+            self.mmap = None
+            self.view = None
+        self.initing()
+
+    def fileno(self):
+        return self.fd
+
+    def seek(self, offset, whence=None):
+        """Change stream position
+
+        Returns new position.
+        """
+        if self.disposed:
+            raise ValueError('stream is disposed')
+        if whence is None or whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError('invalid whence: {}'.format(whence))
+        if position < 0:
+            raise ValueError('negative seek position: {}'.format(position))
+        self.position = position
+        return position
+
+    def tell(self):
+        return self.position
+
+    def slice(self, start, stop):
+        """Memoryview of the mapping in range [start, stop)
+        """
+        if self.view is None:
+            return memoryview(self.mmap[start:stop])
+        return self.view[start:stop]
+
+    def prefetch(self, offset, size):
+        """Prefetch pages in range [offset, offset + size)
+
+        Prefetch of the next window after the range is started in the background.
+        Returns continuation resolved when pages of the range are resident.
+        """
+        if self.disposed:
+            raise BrokenPipeError(errno.EPIPE, 'stream is disposed')
+        first = offset // self.readahead
+        last = (min(offset + size, self.size) - 1) // self.readahead
+        for index in tuple(self.windows):
+            if index < first:
+                del self.windows[index]
+
+        waits = []
+        for index in range(first, last + 2):
+            window_offset = index * self.readahead
+            if window_offset >= self.size:
+                break
+            window = self.windows.get(index)
+            if window is None:
+                window_size = min(self.readahead, self.size - window_offset)
+                pool = self.pool or ThreadPool.main()
+                window = pool(_window_load, self.fd, window_offset, window_size,
+                              self.windows_lock).future()
+                self.windows[index] = window
+            if index <= last and not window.completed:
+                waits.append(window)
+        return async_all(waits) if waits else Cont.unit(None)
+
+    @do_async
+    def read_at(self, offset, size):
+        """Read at most ``size`` bytes at specified ``offset``
+
+        Does not change stream position.
+        """
+        if offset >= self.size:
+            raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+        yield self.prefetch(offset, size)
+        do_return(self.slice(offset, offset + size))
+
+    @do_async
+    def read(self, size):
+        with self.reading:
+            if not size:
+                do_return(b'')
+            data = yield self.read_at(self.position, size)
+            self.position += len(data)
+            do_return(data)
+
+    @do_async
+    def write(self, data):
+        with self.writing:
+            raise ValueError('memory mapped file stream is read only')
+
+    @do_async
+    def read_until_size(self, size):
+        """Read exactly size bytes
+        """
+        if not size:
+            do_return(b'')
+        with self.reading:
+            if self.position + size > self.size:
+                raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+            data = yield self.read_at(self.position, size)
+            self.position += size
+            do_return(data)
+
+    @do_async
+    def read_until_eof(self):
+        """Read until end of file
+        """
+        with self.reading:
+            position = self.position
+            if position >= self.size:
+                do_return(b'')
+            data = yield self.read_at(position, self.size - position)
+            self.position = self.size
+            do_return(data)
+
+    @do_async
+    def read_until_sub(self, sub=None):
+        """Read until substring is found
+
+        Returns data including substring. Default substring is "\\n".
+        """
+        sub = sub or b'\n'
+        with self.reading:
+            position = offset = self.position
+            while True:
+                if offset >= self.size:
+                    raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+                yield self.prefetch(offset, self.readahead)
+                end = min(offset + self.readahead, self.size)
+                found = self.mmap.find(sub, max(position, offset - len(sub) + 1), end)
+                if found >= 0:
+                    break
+                offset = end
+            self.position = found + len(sub)
+            do_return(self.slice(position, self.position))
+
+    @do_async
+    def read_until_regex(self, regex):
+        """Read until regular expression is matched
+
+        Returns data (including match) and match object.
+        """
+        with self.reading:
+            position = offset = self.position
+            while True:
+                if offset >= self.size:
+                    raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+                yield self.prefetch(offset, self.readahead)
+                offset = min(offset + self.readahead, self.size)
+                match = regex.search(self.mmap, position, offset)
+                if match:
+                    break
+            self.position = match.end()
+            do_return((self.slice(position, self.position), match))
+
+    @do_async
+    def read_bytes(self):
+        """Read bytes object
+        """
+        with self.reading:
+            position = self.position
+            header_size = self.size_struct.size
+            if position + header_size > self.size:
+                raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+            yield self.prefetch(position, header_size)
+            size = self.size_struct.unpack_from(self.mmap, position)[0]
+            position += header_size
+            if position + size > self.size:
+                raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+            data = (yield self.read_at(position, size)) if size else b''
+            self.position = position + size
+            do_return(data)
+
+    @do_async
+    def parse(self, parser, limit=None):
+        """Parse stream with specified `parser`, parser fails it does not consume data.
+
+        If ``limit`` is specified, parsing fails once parser has consumed more
+        then ``limit`` bytes without result. Return result of the parsing.
+        """
+        with self.reading:
+            parser = parser.__parser__().start  # independent of running parser
+            offset = self.position
+            while True:
+                if offset < self.size:
+                    yield self.prefetch(offset, self.readahead)
+                    chunk = self.mmap[offset:offset + self.readahead]
+                    tupe, result = parser(chunk, False)
+                else:
+                    chunk = b''
+                    tupe, result = parser(chunk, True)
+                offset += len(chunk)
+                if tupe & ParserResult.DONE:
+                    value, chunk, _ = result
+                    self.position = offset - len(chunk)
+                    do_return(value)
+                elif tupe & ParserResult.PARTIAL and chunk:
+                    parser = result
+                    if limit is not None:
+                        limit -= len(chunk)
+                        if limit < 0:
+                            raise ParserError('parser input limit is exceeded')
+                else:
+                    raise ParserError(result if tupe & ParserResult.ERROR else
+                                      'partial result with last chunk')
+
+    def dispose(self):
+        if Stream.dispose(self):
+            fd, self.fd = self.fd, -1
+            mapping, self.mmap = self.mmap, None
+            view, self.view = self.view, None
+            if view is not None:
+                view.release()
+            pending = [window for window in self.windows.values() if not window.completed]
+            self.windows.clear()
+            if mapping is not None:
+                try:
+                    mapping.close()
+                except BufferError:
+                    pass  # slices are still in use, closed when collected
+            if self.closefd:
+                if pending:
+                    # close after pending window reads
+                    async_all(pending)(lambda _: os.close(fd))
+                else:
+                    os.close(fd)
+            return True
+        return False
+
+    def __str__(self):
+        return ('{}(fd:{}, size:{}, position:{}, state:{})'.format(type(self).__name__,
+                self.fd, self.size, self.position, self.state.state_name()))
+
+
+def _window_load(fd, offset, size, lock=None):
+    """Read window of the file to page cache
+
+    Executed on thread pool. File position is used (and must be guarded by
+    ``lock``) only if positional reads are not available.
+    """
+    if fadvise is not None:
+        fadvise(fd, offset, size, os.POSIX_FADV_WILLNEED)
+    end = offset + size
+    while offset < end:
+        chunk_size = min(end - offset, PRETZEL_BUFSIZE)
+        if lock is None:
+            data = pread(fd, chunk_size, offset)
+        else:
+            with lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                data = os.read(fd, chunk_size)
+        if not data:
+            break
+        offset += len(data)
+
+
+fadvise = getattr(os, 'posix_fadvise', None)
@@ -0,0 +1,223 @@
+"""Client socket pool
+
+Keeps connected client sockets for reuse.
+"""
+import select
+import socket
+from time import time
+from collections import deque
+from .sock import BufferedSocket
+from .sock_ssl import BufferedSocketSSL, ssl_context
+from .resolver import connect_host
+from ..core import Core
+from ..event import Event
+from ..monad import do_async, do_return
+from ..uniform import BrokenPipeError
+
+__all__ = ('SocketPool',)
+
+
+class SocketPool(object):
+    """Keyed client socket pool
+
+    Key is an address of the peer. Connections are created by ``factory(key)``
+    (connected BufferedSocket by default, or BufferedSocketSSL if ``ssl_options``
+    are specified, in which case TLS session of the last released connection to
+    the same key is resumed, and single SSLContext is shared by connections if
+    it is not specified by ``ssl_options``). No more than ``max_total``
+    connections are created per key, acquire waits for release if limit is
+    reached, and no more than ``max_idle`` released connections are kept per
+    key, each for at most ``idle_timeout`` seconds. Idle connections are health
+    checked on acquire. Acquires waiting for release fail with BrokenPipeError
+    when pool is disposed.
+    """
+    def __init__(self, factory=None, max_idle=None, max_total=None,
+                 idle_timeout=None, ssl_options=None, bufsize=None, core=None):
+        self.factory = factory or self.connect
+        self.max_idle = 8 if max_idle is None else max_idle
+        self.max_total = max_total
+        self.idle_timeout = 60 if idle_timeout is None else idle_timeout
+        if ssl_options is not None and not ssl_options.get('context'):
+            # sessions can only be resumed by the context which has created them
+            ssl_options = dict(ssl_options, context=ssl_context(ssl_options))
+        self.ssl_options = ssl_options
+        self.bufsize = bufsize
+        self.core = core or Core.local()
+
+        self.idle = {}  # key -> deque of idle entries [stream, idle timer]
+        self.total = {}  # key -> count of alive connections
+        self.keys = {}  # stream -> key
+        self.sessions = {}  # key -> TLS session
+        self.released = Event()
+        self.disposed = False
+
+    @do_async
+    def connect(self, key):
+        """Default connection factory
+
+        (host, port) keys are resolved asynchronously and connected with
+        ``connect_host``, other keys are treated as unix socket addresses.
+        """
+        if self.ssl_options is None:
+            def factory(sock):
+                return BufferedSocket(sock, self.bufsize, core=self.core)
+        else:
+            ssl_options = dict(self.ssl_options)
+            session = self.sessions.get(key)
+            if session is not None:
+                ssl_options['session'] = session
+
+            def factory(sock):
+                return BufferedSocketSSL(sock, self.bufsize, ssl_options, core=self.core)
+
+        if isinstance(key, tuple):
+            stream = yield connect_host(key[0], key[1], factory=factory, core=self.core)
+        else:
+            stream = factory(socket.socket(socket.AF_UNIX))
+            try:
+                yield stream.connect(key)
+            except Exception:
+                stream.dispose()
+                raise
+        do_return(stream)
+
+    @do_async
+    def acquire(self, key):
+        """Acquire connection for key
+
+        Returns healthy idle connection if any, otherwise creates new one.
+        """
+        while True:
+            if self.disposed:
+                raise ValueError('socket pool is disposed')
+            idle = self.idle.get(key)
+            while idle:
+                stream = self.idle_pop(idle.pop())
+                if self.check(stream):
+                    do_return(stream)
+                self.discard(stream)
+            if self.max_total is None or self.total.get(key, 0) < self.max_total:
+                break
+            yield self.released
+            if self.disposed:
+                raise BrokenPipeError('socket pool is disposed')
+
+        self.total[key] = self.total.get(key, 0) + 1
+        try:
+            stream = yield self.factory(key)
+        except Exception:
+            self.total[key] -= 1
+            self.released(key)
+            raise
+        self.keys[stream] = key
+        if self.disposed:
+            self.discard(stream)
+            raise BrokenPipeError('socket pool is disposed')
+        do_return(stream)
+
+    def release(self, stream, reuse=None):
+        """Release acquired connection
+
+        Connection is disposed if ``reuse`` is false, it is not healthy or there
+        are too many idle connections for its key.
+        """
+        key = self.keys.get(stream)
+        if key is None:
+            raise ValueError('stream does not belong to the pool: {}'.format(stream))
+        if self.ssl_options is not None and not stream.disposed:
+            # session is available once handshake (and for TLSv1.3 reception
+            # of session ticket) is completed
+            session = stream.session
+            if session is not None:
+                self.sessions[key] = session
+        idle = self.idle.setdefault(key, deque())
+        if (self.disposed or not (reuse is None or reuse) or
+                len(idle) >= self.max_idle or not self.check(stream)):
+            self.discard(stream)
+            return
+
+        entry = [stream, None]
+        idle.append(entry)
+        if self.idle_timeout is not None:
+            def idle_timeout(_):
+                idle.remove(entry)
+                self.discard(self.idle_pop(entry))
+            entry[1] = self.core.timer(time() + self.idle_timeout, idle_timeout)
+        self.released(key)
+
+    def idle_pop(self, entry):
+        """Take stream of idle entry and cancel its idle timeout
+        """
+        stream, timer = entry
+        if timer is not None:
+            timer.dispose()
+        return stream
+
+    def discard(self, stream):
+        """Dispose connection and remove it from the pool
+        """
+        stream.dispose()
+        key = self.keys.pop(stream, None)
+        if key is not None:
+            self.total[key] -= 1
+            self.released(key)
+
+    @do_async
+    def call(self, key, func):
+        """Call asynchronous function with acquired connection
+
+        Connection is released when function is completed, or discarded if it
+        raised an error.
+        """
+        stream = yield self.acquire(key)
+        try:
+            result = yield func(stream)
+        except Exception:
+            self.discard(stream)
+            raise
+        self.release(stream)
+        do_return(result)
+
+    def check(self, stream):
+        """Check health of idle connection
+
+        Idle connection must not be disposed and must not have neither received
+        data nor pending events (i.g. peer has closed connection).
+        """
+        if stream.disposed or stream.read_buffer or stream.write_buffer:
+            return False
+        fd = stream.fileno()
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(fd, select.POLLIN | select.POLLPRI)
+            return not poller.poll(0)
+        else:
+            return not any(select.select([fd], [], [fd], 0))
+
+    def __len__(self):
+        return sum(self.total.values())
+
+    def dispose(self):
+        if self.disposed:
+            return
+        self.disposed = True
+        idle, self.idle = self.idle, {}
+        for entries in idle.values():
+            for entry in entries:
+                self.discard(self.idle_pop(entry))
+        self.sessions.clear()
+        self.released(None)  # fail waiting acquires
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, et, eo, tb):
+        self.dispose()
+        return False
+
+    def __str__(self):
+        return ('{}(total:{}, idle:{})'.format(type(self).__name__, len(self),
+                sum(len(entries) for entries in self.idle.values())))
+
+    def __repr__(self):
+        return str(self)
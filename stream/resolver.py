@@ -0,0 +1,167 @@
+"""Asynchronous host name resolution
+
+Resolves host names on thread pool and connects to hosts racing resolved
+addresses (happy eyeballs, RFC 8305).
+"""
+import time
+import socket
+import threading
+from .sock import Socket
+from ..core import Core
+from ..task import ThreadPool
+from ..monad import Result, async_any, async_block, do_async, do_return
+
+__all__ = ('Resolver', 'resolve', 'connect_host',)
+
+
+class Resolver(object):
+    """Host name resolver
+
+    Executes blocking ``getaddrinfo`` on thread pool and caches resolved
+    addresses for ``ttl`` seconds (getaddrinfo does not report record TTL).
+    Simultaneous resolutions of the same name share single lookup. Failed
+    lookups are not cached, and expired entries are pruned when new lookup is
+    cached.
+    """
+    inst_lock = threading.RLock()
+    inst_main = None
+
+    def __init__(self, ttl=None, pool=None):
+        self.ttl = 60 if ttl is None else ttl
+        self.pool = pool
+        self.cache = {}  # key -> (expires, future)
+
+    @classmethod
+    def main(cls, inst=None):
+        """Access or create main resolver object
+        """
+        with cls.inst_lock:
+            if inst is None:
+                if cls.inst_main is None:
+                    cls.inst_main = cls()
+                inst = cls.inst_main
+            else:
+                cls.inst_main = inst
+        return inst
+
+    def __call__(self, host, port, family=None, type=None):
+        """Resolve host and port
+
+        Returns list of (family, type, proto, canonname, sockaddr) tuples as
+        ``socket.getaddrinfo`` does.
+        """
+        key = (host, port, family or 0, type or socket.SOCK_STREAM)
+        now = time.time()
+        entry = self.cache.get(key)
+        if entry is not None:
+            expires, addrs = entry
+            if expires > now and not (addrs.completed and addrs.res.error is not None):
+                return addrs
+        for expired in [cached for cached, cached_entry in self.cache.items()
+                        if cached_entry[0] <= now]:
+            del self.cache[expired]
+        pool = self.pool or ThreadPool.main()
+        addrs = pool(socket.getaddrinfo, *key).future()
+        self.cache[key] = (now + self.ttl, addrs)
+
+        def addrs_ret(result):
+            if result.error is not None and self.cache.get(key, (None, None))[1] is addrs:
+                del self.cache[key]
+        addrs(addrs_ret)
+        return addrs
+
+    def clear(self):
+        """Clear cache
+        """
+        self.cache.clear()
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __str__(self):
+        return '{}(ttl:{}, cached:{})'.format(type(self).__name__, self.ttl, len(self))
+
+    def __repr__(self):
+        return str(self)
+
+
+def resolve(host, port, family=None, type=None):
+    """Resolve host and port with main resolver
+    """
+    return Resolver.main()(host, port, family, type)
+
+
+@do_async
+def connect_host(host, port, family=None, delay=None, factory=None,
+                 resolver=None, core=None):
+    """Connect to host
+
+    Resolved addresses are interleaved by address family and connection attempts
+    are started ``delay`` seconds (0.25 by default) one after another, or as soon
+    as previous attempt failed. First established connection is returned and
+    all other attempts are canceled (their sockets are disposed). Stream is
+    created by ``factory(sock)``, Socket by default.
+    """
+    core = core or Core.local()
+    delay = 0.25 if delay is None else delay
+    factory = factory or (lambda sock: Socket(sock, core=core))
+
+    addrs = yield (resolver or Resolver.main())(host, port, family)
+    addrs = _interleave(addrs)
+    if not addrs:
+        raise socket.gaierror(socket.EAI_NONAME, 'no address: {}'.format(host))
+
+    def delay_cont(ret):
+        timers.append(core.timer(time.time() + delay, ret))
+
+    attempts = {}  # future -> stream
+    timers = []  # timer of the next attempt
+    error = None  # result of the last failed attempt
+    try:
+        while addrs or attempts:
+            if addrs:
+                addr_family, addr_type, addr_proto, _, addr = addrs.pop(0)
+                try:
+                    stream = factory(socket.socket(addr_family, addr_type, addr_proto))
+                except socket.error:
+                    error = Result.from_current_error()  # i.g. family is not supported
+                    continue
+                attempts[stream.connect(addr).future()] = stream
+            # timer is started first, as completed attempt resumes coroutine
+            waits = [async_block(delay_cont)] if addrs else []
+            waits.extend(attempts)
+            try:
+                yield async_any(waits)
+            except Exception:
+                pass  # failed attempt is handled below
+            while timers:
+                timers.pop().dispose()
+            for attempt in tuple(attempts):
+                if not attempt.completed:
+                    continue
+                stream = attempts.pop(attempt)
+                if attempt.res.error is None:
+                    do_return(stream)
+                error = attempt.res
+                stream.dispose()
+        error.value
+    finally:
+        for timer in timers:
+            timer.dispose()
+        for stream in attempts.values():
+            stream.dispose()
+
+
+def _interleave(addrs):
+    """Interleave addresses by family starting with the family of the first one
+    """
+    families = {}
+    for addr in addrs:
+        families.setdefault(addr[0], []).append(addr)
+    groups = sorted(families.values(), key=lambda group: addrs.index(group[0]))
+    result = []
+    for index in range(max(len(group) for group in groups) if groups else 0):
+        for group in groups:
+            if index < len(group):
+                result.append(group[index])
+    return result
@@ -0,0 +1,177 @@
+"""Stream server
+
+Accepts connections on listening socket and hands them to asynchronous handler.
+"""
+import os
+import sys
+import errno
+import signal
+import socket
+from .sock import BufferedSocket
+from ..core import Core
+from ..event import Event
+from ..monad import Result, do_async, async_all
+from ..uniform import BrokenPipeError, CanceledError
+
+__all__ = ('Server',)
+
+
+class Server(object):
+    """Stream server
+
+    Accepts connections in batches (until there is no more pending connections
+    on each readiness event) and calls asynchronous ``handler(stream, address)``
+    with each accepted buffered socket. Stream is disposed when handler is
+    finished. No more than ``limit`` connections are handled simultaneously,
+    accepting is suspended while limit is reached so pending connections are
+    kept in listen backlog.
+    """
+    def __init__(self, handler, limit=None, bufsize=None, core=None):
+        self.handler = handler
+        self.limit = limit or 1024
+        self.bufsize = bufsize
+        self.core = core or Core.local()
+        self.sock = None
+        self.clients = set()
+        self.client_done = Event()
+        self.workers = []
+
+    def listen(self, address, family=None, backlog=None, reuse_port=None):
+        """Create listening socket
+
+        If ``reuse_port`` is true, socket is created with SO_REUSEPORT option, so
+        multiple processes can listen on the same address.
+        """
+        if self.sock is not None:
+            raise ValueError('server is already listening')
+        family = family or (socket.AF_UNIX if isinstance(address, str) else socket.AF_INET)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            if family != socket.AF_UNIX:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(address)
+            sock.listen(backlog or socket.SOMAXCONN)
+        except Exception:
+            sock.close()
+            raise
+        self.sock = BufferedSocket(sock, self.bufsize, True, self.core)
+        return self
+
+    @property
+    def address(self):
+        return self.sock.sock.getsockname() if self.sock else None
+
+    @do_async
+    def serve(self):
+        """Accept and handle connections until server is disposed
+        """
+        if self.sock is None:
+            raise ValueError('server is not listening')
+        try:
+            while True:
+                while len(self.clients) >= self.limit:
+                    yield self.client_done
+                for client, addr in (yield self.sock.accept_batch(self.limit -
+                                                                  len(self.clients))):
+                    self.handle(client, addr)
+        except (CanceledError, BrokenPipeError):
+            if self.sock is not None:
+                raise
+
+    def handle(self, client, addr):
+        """Handle accepted client
+        """
+        def client_ret(result):
+            self.clients.discard(client)
+            client.dispose()
+            if isinstance(result, Result):
+                result.trace(banner=lambda: '[server] handler failed: {}'.format(addr))
+            self.client_done(client)
+        self.clients.add(client)
+        try:
+            self.handler(client, addr).__monad__()(client_ret)
+        except Exception:
+            client_ret(Result.from_current_error())
+
+    @do_async
+    def serve_workers(self, address, count, family=None, backlog=None):
+        """Serve with ``count`` forked worker processes
+
+        Each worker process has its own core and listening socket bound to the
+        same address with SO_REUSEPORT option (if it is not supported, listening
+        socket is created before fork and shared). Resolved when all workers
+        are terminated.
+        """
+        reuse_port = hasattr(socket, 'SO_REUSEPORT')
+        if not reuse_port:
+            self.listen(address, family, backlog)
+        for _ in range(count):
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover
+                os._exit(self.worker_main(address, family, backlog, reuse_port))
+            self.workers.append(pid)
+        if self.sock is not None:
+            self.sock.dispose()
+            self.sock = None
+        yield async_all(self.core.waitpid(pid) for pid in self.workers)
+
+    def worker_main(self, address, family, backlog, reuse_port):  # pragma: no cover
+        """Worker process main function
+
+        Returns exit status.
+        """
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.set_wakeup_fd(-1)
+            del self.workers[:]
+            with Core.local(Core()) as core:
+                self.core = core
+                if self.sock is not None:
+                    # shared listening socket, parent's stream must not be disposed
+                    self.sock = BufferedSocket(self.sock.sock, self.bufsize, True, core)
+                else:
+                    self.listen(address, family, backlog, reuse_port)
+                serve = self.serve().future()
+                serve(lambda _: core.dispose())
+                if not core.disposed:
+                    core()
+            serve.value
+            return 0
+        except Exception:
+            Result.from_current_error().trace()
+            return 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+    def dispose(self):
+        sock, self.sock = self.sock, None
+        if sock is not None:
+            sock.dispose()
+        clients, self.clients = self.clients, set()
+        for client in clients:
+            client.dispose()
+        workers, self.workers = self.workers, []
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError as error:
+                if error.errno != errno.ESRCH:
+                    raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, et, eo, tb):
+        self.dispose()
+        return False
+
+    def __str__(self):
+        return ('{}(addr:{}, clients:{}, limit:{}, workers:{})'.format(type(self).__name__,
+                self.address, len(self.clients), self.limit, len(self.workers)))
+
+    def __repr__(self):
+        return str(self)
@@ -2,6 +2,7 @@
 
 Wraps python socket object and provides stream interface.
 """
+import os
 import socket
 import errno
 
@@ -60,6 +61,9 @@ class Socket(File):
                 if error.errno not in BlockingErrorSet:
                     raise
             yield self.core.poll(self.fd, POLL_WRITE)
+            error = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if error:
+                raise socket.error(error, os.strerror(error))
             do_return(self)
 
     @do_async
@@ -74,6 +78,31 @@ class Socket(File):
                         raise
                 yield self.core.poll(self.fd, POLL_READ)
 
+    @do_async
+    def accept_batch(self, count=None, factory=None):
+        """Accept pending connections in batch
+
+        Waits for at least one connection, then accepts connections until there
+        are no more pending ones or ``count`` connections has been accepted.
+        Returns list of (socket, address) pairs, where socket is created with
+        ``factory`` from accepted python socket (Socket by default).
+        """
+        factory = factory or (lambda sock: Socket(sock, init=True, core=self.core))
+        with self.reading:
+            clients = []
+            while True:
+                try:
+                    while count is None or len(clients) < count:
+                        clients.append(self.sock.accept())
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        if not clients:
+                            raise
+                        # report error on next accept
+                if clients:
+                    do_return([(factory(client), addr) for client, addr in clients])
+                yield self.core.poll(self.fd, POLL_READ)
+
     def bind(self, address):
         with self.initing:
             return self.sock.bind(address)
@@ -118,11 +147,22 @@ class BufferedSocket (BufferedStream):
     def detach(self):
         return BufferedStream.detach(self).detach()
 
+    @do_async
     def connect(self, addr):
-        return self.base.connect(addr).map_val(lambda _: self)
+        yield self.base.connect(addr)
+        do_return(self)
 
     @do_async
     def accept(self):
         with self.reading:
             sock, addr = yield self.base.accept()
             do_return((BufferedSocket(sock.sock, self.bufsize, True, sock.core), addr))
+
+    def accept_batch(self, count=None):
+        """Accept pending connections in batch
+
+        Returns list of (buffered socket, address) pairs.
+        """
+        core = self.base.core
+        return self.base.accept_batch(count, lambda sock:
+                                      BufferedSocket(sock, self.bufsize, True, core))
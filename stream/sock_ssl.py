@@ -13,15 +13,19 @@ from ..monad import do_async, do_return
 from ..core import POLL_READ, POLL_WRITE
 from ..uniform import BrokenPipeError, BlockingErrorSet, PipeErrorSet
 
-__all__ = ('SocketSSL', 'BufferedSocketSSL')
+__all__ = ('SocketSSL', 'BufferedSocketSSL', 'ssl_context',)
 
 
 class SocketSSL(Socket):
     """SSL Socket Stream
 
     If socket has already been connected it must be wrapped with
-    ssl.wrap_socket, otherwise it will be wrapped when AsyncSSLSocket.Connect
-    is finished.
+    SSLContext.wrap_socket, otherwise it will be wrapped when connect is
+    finished. If ``ssl_options`` contains ``context`` (SSLContext object),
+    socket is wrapped by the context, otherwise context is created from
+    ``ssl.wrap_socket`` style options with ``ssl_context``. Rest of the options
+    (i.g. ``server_hostname`` and ``session`` for TLS session resumption) are
+    passed to wrap_socket method of the context.
     """
     def __init__(self, sock, ssl_options=None, init=None, core=None):
         self.ssl_options = ssl_options or {}
@@ -66,8 +70,12 @@ class SocketSSL(Socket):
     def connect(self, address):
         yield Socket.connect(self, address)
         with self.writing, self.reading:
-            self.sock = ssl.wrap_socket(self.sock, do_handshake_on_connect=False,
-                                        **self.ssl_options)
+            options = dict(self.ssl_options)
+            context = options.pop('context', None) or ssl_context(options)
+            for name in _CONTEXT_OPTIONS:
+                options.pop(name, None)
+            self.sock = context.wrap_socket(self.sock, do_handshake_on_connect=False,
+                                            **options)
             # do handshake
             while True:
                 event = None
@@ -83,20 +91,29 @@ class SocketSSL(Socket):
                         raise
                 yield self.core.poll(self.fd, event)
 
+    @property
+    def session(self):
+        """TLS session of connected socket
+
+        Can be passed as ``session`` SSL option to resume session.
+        """
+        return getattr(self.sock, 'session', None)
+
+    @property
+    def session_reused(self):
+        return getattr(self.sock, 'session_reused', False)
+
     @do_async
     def accept(self):
         with self.reading:
             while True:
                 try:
                     client, addr = self.sock.accept()
-                    context = getattr(self.sock, 'context', None)
-                    if context:  # python >= 3.2
-                        client = context.wrap_socket(client, server_side=True)
-                    else:
-                        client = ssl.wrap_socket(client, server_side=True,
-                                                 **self.ssl_options)
-                    do_return((SocketSSL(client, self.bufsize, self.ssl_options,
-                               self.core), addr))
+                    context = (getattr(self.sock, 'context', None) or
+                               self.ssl_options.get('context') or
+                               ssl_context(self.ssl_options, True))
+                    client = context.wrap_socket(client, server_side=True)
+                    do_return((SocketSSL(client, self.ssl_options, True, self.core), addr))
                 except socket.error as error:
                     if error.errno not in BlockingErrorSet:
                         raise
@@ -110,12 +127,42 @@ class BufferedSocketSSL(BufferedStream):
     def detach(self):
         return BufferedStream.detach(self).detach()
 
+    @do_async
     def connect(self, addr):
-        return self.base.connect(addr).map_val(lambda _: self)
+        yield self.base.connect(addr)
+        do_return(self)
 
     @do_async
     def accept(self):
         with self.reading:
             sock, addr = yield self.base.accept()
-            do_return((BufferedSocketSSL(sock.Socket, self.bufsize,
+            do_return((BufferedSocketSSL(sock.sock, self.bufsize,
                        sock.ssl_options, True, sock.core), addr))
+
+
+_CONTEXT_OPTIONS = ('keyfile', 'certfile', 'server_side', 'cert_reqs',
+                    'ssl_version', 'ca_certs', 'ciphers',)
+
+
+def ssl_context(options=None, server_side=None):
+    """Create SSLContext from ``ssl.wrap_socket`` style options
+
+    Options: keyfile, certfile, server_side, cert_reqs (CERT_NONE by default
+    as with ssl.wrap_socket), ssl_version, ca_certs, ciphers.
+    """
+    options = options or {}
+    server_side = server_side or options.get('server_side', False)
+    protocol = options.get('ssl_version')
+    if protocol is None:
+        protocol = getattr(ssl, 'PROTOCOL_TLS_SERVER' if server_side else 'PROTOCOL_TLS_CLIENT',
+                           ssl.PROTOCOL_SSLv23)  # negotiate highest version on python 2
+    context = ssl.SSLContext(protocol)
+    context.check_hostname = False
+    context.verify_mode = options.get('cert_reqs', ssl.CERT_NONE)
+    if options.get('certfile'):
+        context.load_cert_chain(options['certfile'], options.get('keyfile'))
+    if options.get('ca_certs'):
+        context.load_verify_locations(options['ca_certs'])
+    if options.get('ciphers'):
+        context.set_ciphers(options['ciphers'])
+    return context
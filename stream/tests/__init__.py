@@ -6,10 +6,12 @@ def load_tests(loader, tests, pattern):
     """Load test protocol
     """
     from unittest import TestSuite
-    from . import buffered, file, sock
+    from . import (buffered, file, sock, mapped, server, resolver, pool, tls, datagram,
+                   http, codec)
 
     suite = TestSuite()
-    for test in (buffered, file, sock):
+    for test in (buffered, file, sock, mapped, server, resolver, pool, tls,
+                 datagram, http, codec):
         suite.addTests(loader.loadTestsFromModule(test))
 
     return suite
@@ -5,13 +5,15 @@ import unittest
 import collections
 
 from ..stream import Stream
-from ..buffered import Buffer, BufferedStream
+from ..buffered import Buffer, BufferSize, BufferedStream
 from ...monad import Result, do_async, do_return
 from ...event import Event
 from ...uniform import BrokenPipeError
+from ...core import schedule, sleep
+from ...tests import async_test
 from ... import parser as P
 
-__all__ = ('BufferTest', 'BufferedStreamTest',)
+__all__ = ('BufferTest', 'BufferSizeTest', 'BufferedStreamTest',)
 
 
 class BufferTest(unittest.TestCase):
@@ -94,6 +96,38 @@ class BufferTest(unittest.TestCase):
         self.assertEqual(tuple(buff.chunks), tuple())
 
 
+class BufferSizeTest(unittest.TestCase):
+    def test(self):
+        size = BufferSize(8, 4, 32)
+        self.assertTrue(size.adaptive)
+
+        # grow
+        size.observe(8)
+        self.assertEqual(size.size, 16)
+        self.assertEqual(size(b'X' * 20), b'X' * 20)
+        self.assertEqual(size.size, 32)
+        size.observe(64)
+        self.assertEqual(size.size, 32)
+
+        # shrink
+        for _ in range(BufferSize.SHRINK_COUNT - 1):
+            size.observe(1)
+        self.assertEqual(size.size, 32)
+        size.observe(16)  # reset shrink counter
+        for _ in range(BufferSize.SHRINK_COUNT):
+            size.observe(1)
+        self.assertEqual(size.size, 16)
+        for _ in range(BufferSize.SHRINK_COUNT * 4):
+            size.observe(1)
+        self.assertEqual(size.size, 4)
+
+        # fixed
+        size = BufferSize(8)
+        self.assertFalse(size.adaptive)
+        size.observe(1024)
+        self.assertEqual(size.size, 8)
+
+
 class BufferedStreamTest (unittest.TestCase):
     def test_read(self):
         res = ResultQueue()
@@ -153,6 +187,15 @@ class BufferedStreamTest (unittest.TestCase):
         self.assertEqual(res.pop(), b'abd')
         self.assertFalse(res)
 
+        # input limit
+        stream.parse(P.string(b'abcdefg'), 4)(res)
+        stream.read_complete(b'abc')
+        self.assertFalse(res)
+        stream.read_complete(b'de')
+        with self.assertRaises(P.ParserError):
+            res.pop()
+        stream.read(5)(res)
+        self.assertEqual(res.pop(), b'abcde')
 
     def test_read_until_size(self):
         res = ResultQueue()
@@ -250,6 +293,76 @@ class BufferedStreamTest (unittest.TestCase):
         self.assertEqual(res.pop(), 17)
         self.assertFalse(res)
 
+    def test_adaptive(self):
+        res = ResultQueue()
+        stream = BufferedStream(DummyStream(), 8, 4, 16)
+        self.assertEqual(stream.metrics()['read_size'], 8)
+
+        # read size grows on filled reads
+        stream.read(1)(res)
+        stream.read_complete(b'01234567')
+        self.assertEqual(res.pop(), b'0')
+        self.assertEqual(stream.read_size.size, 16)
+        stream.read_until_size(7)(res)
+        self.assertEqual(res.pop(), b'1234567')
+
+        # write size grows on big bursts and shrinks on small ones
+        stream.write_schedule(b'X' * 16)
+        stream.flush()(res)
+        stream.write_complete(16)
+        self.assertEqual(res.pop(), None)
+        self.assertEqual(stream.write_size.size, 16)
+        for _ in range(BufferSize.SHRINK_COUNT):
+            stream.write_schedule(b'X')
+            stream.flush()(res)
+            stream.write_complete(1)
+            self.assertEqual(res.pop(), None)
+        self.assertEqual(stream.write_size.size, 8)
+        self.assertEqual(stream.metrics(), {'read_size': 16, 'write_size': 8,
+                                            'read_buffer': 0, 'write_buffer': 0})
+        self.assertFalse(res)
+
+    @async_test
+    def test_flush_schedule(self):
+        stream = BufferedStream(DummyStream(), 8)
+
+        # coalesced
+        for data in (b'01', b'23', b'45'):
+            stream.write_schedule(data)
+            stream.flush_schedule()
+        self.assertTrue(stream.flush_pending)
+        self.assertFalse(stream.base.writing)
+        yield schedule()
+        yield schedule()
+        self.assertFalse(stream.flush_pending)
+        self.assertTrue(stream.base.writing)
+        stream.write_complete(8)  # single write
+        self.assertEqual(stream.written, b'012345')
+        self.assertFalse(stream.base.writing)
+
+        # threshold
+        stream.write_schedule(b'X' * 9)
+        stream.flush_schedule()
+        self.assertFalse(stream.flush_pending)
+        stream.write_complete(8)
+        stream.write_complete(8)
+        self.assertEqual(stream.written, b'012345' + b'X' * 9)
+
+        # latency bound
+        stream.write_schedule(b'01')
+        stream.flush_schedule(0.05)
+        yield schedule()
+        yield schedule()
+        self.assertTrue(stream.flush_pending)
+        self.assertFalse(stream.base.writing)
+        stream.write_schedule(b'23')
+        stream.flush_schedule(0.05)
+        yield sleep(0.1)
+        self.assertFalse(stream.flush_pending)
+        self.assertTrue(stream.base.writing)
+        stream.write_complete(8)
+        self.assertEqual(stream.written, b'012345' + b'X' * 9 + b'0123')
+
     def test_bytes(self):
         res = ResultQueue()
         stream = BufferedStream(DummyStream(), 1024)
@@ -266,6 +379,70 @@ class BufferedStreamTest (unittest.TestCase):
         self.assertEqual(res.pop(), bytes)
         self.assertFalse(res)
 
+    def test_bytes_batch(self):
+        res = ResultQueue()
+        stream = BufferedStream(DummyStream(), 1024)
+        bytes_list = [b'one', b'', b'three', b'four', b'five']
+
+        for bytes in bytes_list:
+            stream.write_bytes(bytes)
+        stream.flush()()
+        stream.write_complete(1024)
+        data = stream.written
+
+        # incomplete frame
+        stream.read_bytes_batch()(res)
+        stream.read_complete(data[:2])
+        self.assertFalse(res)
+        stream.read_complete(data[2:9])
+        self.assertEqual(res.pop(), [b'one'])
+
+        # limits
+        stream.read_bytes_batch(max_count=2)(res)
+        stream.read_complete(data[9:])
+        self.assertEqual(res.pop(), [b'', b'three'])
+        stream.read_bytes_batch(max_bytes=4)(res)
+        self.assertEqual(res.pop(), [b'four'])
+        stream.read_bytes_batch(max_bytes=1)(res)
+        self.assertEqual(res.pop(), [b'five'])
+        self.assertFalse(res)
+
+        # all available frames
+        stream.read_bytes_batch()(res)
+        stream.read_complete(data + data[:4])
+        self.assertEqual(res.pop(), bytes_list)
+        stream.read_bytes_batch()(res)
+        stream.read_complete(data[4:9])
+        self.assertEqual(res.pop(), [b'one'])
+        self.assertFalse(res)
+
+    def test_varint(self):
+        res = ResultQueue()
+        stream = BufferedStream(DummyStream(), 1024)
+        values = [0, 1, -1, 300, -(1 << 40)]
+
+        for value in values:
+            stream.write_varint(value)
+        stream.flush()()
+        stream.write_complete(1024)
+        data = stream.written
+        self.assertEqual(data, P.encode_varints(values))
+
+        # varint split between reads
+        stream.read_varint()(res)
+        stream.read_complete(data[:3])
+        self.assertEqual(res.pop(), 0)
+        for value in values[1:3]:
+            stream.read_varint()(res)
+            self.assertEqual(res.pop(), value)
+        stream.read_varint()(res)
+        self.assertFalse(res)
+        stream.read_complete(data[3:])
+        self.assertEqual(res.pop(), 300)
+        stream.read_varint()(res)
+        self.assertEqual(res.pop(), -(1 << 40))
+        self.assertFalse(res)
+
     def test_struct_list(self):
         res = ResultQueue()
         stream = BufferedStream(DummyStream(), 1024)
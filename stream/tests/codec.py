@@ -0,0 +1,83 @@
+import unittest
+from ..codec import (LengthCodec, VarintCodec, LineCodec, NetstringCodec, FixedCodec,
+                     codec_get)
+from ..buffered import BufferedStream
+from .buffered import DummyStream, ResultQueue
+
+__all__ = ('CodecTest',)
+
+
+class CodecTest(unittest.TestCase):
+    def test(self):
+        frames = [b'one', b'', b'three' * 100, b'four']
+        for codec in (codec_get('u16'), codec_get('u32'), codec_get('varint'),
+                      codec_get('netstring'), LengthCodec('<H'), LineCodec(b'\r\n')):
+            data = b''.join(codec.encode(frames))
+            self.assertEqual(codec.decode(data), (frames, len(data)), str(codec))
+
+            # incomplete frames
+            for size in range(len(data)):
+                frames_head, offset = codec.decode(data[:size])
+                self.assertEqual(frames_head, frames[:len(frames_head)], str(codec))
+                self.assertEqual(b''.join(codec.encode(frames_head)), data[:offset])
+                rest = data[offset:size]
+                self.assertTrue(len(rest) < codec.pending(rest) <=
+                                len(data) - offset, str(codec))
+
+            # limits
+            self.assertEqual(codec.decode(data, count=2), (frames[:2], offset_of(codec, frames[:2])))
+            self.assertEqual(codec.decode(data, size=1)[0], frames[:1])
+            self.assertEqual(codec.decode(data, size=3)[0], frames[:2])
+            self.assertEqual(codec.decode(data, size=503)[0], frames[:3])
+
+    def test_fixed(self):
+        codec = FixedCodec(2)
+        self.assertEqual(codec.decode(b'abcde'), ([b'ab', b'cd'], 4))
+        self.assertEqual(codec.decode(b'abcde', count=1), ([b'ab'], 2))
+        self.assertEqual(codec.decode(b'abcde', size=3), ([b'ab'], 2))
+        self.assertEqual(codec.pending(b'a'), 2)
+        with self.assertRaises(ValueError):
+            codec.encode([b'abc'])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            codec_get('unknown')
+        codec = NetstringCodec()
+        with self.assertRaises(ValueError):
+            codec.decode(b'x3:abc,')
+        with self.assertRaises(ValueError):
+            codec.decode(b'3:abc;')
+        with self.assertRaises(ValueError):
+            codec.decode(b'1' * codec.header_max)
+        with self.assertRaises(ValueError):
+            VarintCodec().decode(b'\x03')  # negative length
+        with self.assertRaises(ValueError):
+            codec_get('u16').encode([b'x' * (1 << 16)])
+
+    def test_stream(self):
+        res = ResultQueue()
+        stream = BufferedStream(DummyStream(), 1024)
+        frames = [b'one', b'two', b'three']
+
+        self.assertEqual(stream.write_frames('varint', frames), 14)
+        stream.flush()()
+        stream.write_complete(1024)
+        data = stream.written
+        self.assertEqual(data, b''.join(VarintCodec().encode(frames)))
+
+        # frame split between reads
+        stream.read_frames('varint')(res)
+        stream.read_complete(data[:1])
+        self.assertFalse(res)
+        stream.read_complete(data[1:6])
+        self.assertEqual(res.pop(), frames[:1])
+        stream.read_frames('varint', max_count=1)(res)
+        stream.read_complete(data[6:])
+        self.assertEqual(res.pop(), frames[1:2])
+        stream.read_frames('varint')(res)
+        self.assertEqual(res.pop(), frames[2:])
+        self.assertFalse(res)
+
+
+def offset_of(codec, frames):
+    return len(b''.join(codec.encode(frames)))
@@ -0,0 +1,47 @@
+import unittest
+from ..datagram import DatagramSocket, _mmsg, _sockaddr_pack, _sockaddr_unpack
+from ...tests import async_test
+
+__all__ = ('DatagramSocketTest',)
+
+
+class DatagramSocketTest(unittest.TestCase):
+    def test_sockaddr(self):
+        for address in (('127.0.0.1', 1234), ('::1', 4321, 0, 0)):
+            self.assertEqual(_sockaddr_unpack(_sockaddr_pack(address)), address)
+        self.assertEqual(_sockaddr_pack(('localhost', 1234)), None)
+
+    @async_test
+    def test(self):
+        for mmsg in (False, True):
+            if mmsg and _mmsg is None:
+                continue
+            with DatagramSocket(mmsg=mmsg) as server, DatagramSocket(mmsg=mmsg) as client:
+                self.assertEqual(server.mmsg, mmsg)
+                server.bind(('127.0.0.1', 0))
+                client.bind(('127.0.0.1', 0))
+                address = server.sock.getsockname()
+
+                msgs = [str(index).encode() for index in range(100)]
+                self.assertEqual((yield client.send_batch((msg, address) for msg in msgs)),
+                                 len(msgs))
+                received = []
+                while len(received) < len(msgs):
+                    batch = yield server.recv_batch(16)
+                    self.assertTrue(len(batch) <= 16)
+                    received.extend(batch)
+                self.assertEqual([data for data, _ in received], msgs)
+                self.assertTrue(all(addr == client.sock.getsockname() for _, addr in received))
+
+                # reply to the sender, full and truncated receive
+                data, addr = received[0]
+                yield server.send(b'hello world', addr)
+                self.assertEqual((yield client.recv()), (b'hello world', address))
+                yield server.send(b'reply', addr)
+                self.assertEqual((yield client.recv(3)), (b'rep', address))
+
+                # connected socket
+                client.sock.connect(address)
+                self.assertEqual((yield client.send_batch([b'a', b'b'])), 2)
+                self.assertEqual([data for data, _ in (yield server.recv_batch())],
+                                 [b'a', b'b'])
@@ -1,11 +1,13 @@
 import io
 import os
+import time
 import itertools
+import tempfile
 import unittest
-from ..file import File
+from ..file import File, BufferedFile
 from ...monad import monad, do_async
 from ...uniform import BrokenPipeError
-from ...core import schedule
+from ...core import schedule, sleep
 from ...tests import async_test
 
 __all__ = ('FileTest',)
@@ -62,3 +64,66 @@ class FileTest(unittest.TestCase):
 
         yield reader_future
         self.assertEqual(received.getvalue(), b'one, two, three')
+
+    @async_test
+    def test_regular(self):
+        fd, path = tempfile.mkstemp()
+        try:
+            with File(fd) as writer:
+                self.assertTrue(writer.regular)
+                self.assertEqual((yield writer.write(b'one')), 3)
+                self.assertEqual((yield writer.write(b', two')), 5)
+                self.assertEqual(writer.offset, 8)
+
+            with BufferedFile(os.open(path, os.O_RDWR), bufsize=4) as file:
+                self.assertEqual((yield file.read_until_sub(b',')), b'one,')
+                self.assertEqual((yield file.read_until_eof()), b' two')
+                with self.assertRaises(BrokenPipeError):
+                    yield file.read(1)
+                file.write_schedule(b', three')
+                yield file.flush()
+
+            with open(path, 'ab') as append:
+                with File(os.dup(append.fileno())) as appender:
+                    yield appender.write(b'!')
+                    self.assertEqual(appender.offset, 16)
+
+            with io.open(path, 'rb') as file:
+                self.assertEqual(file.read(), b'one, two, three!')
+
+            # detach with pending operation
+            file = File(os.open(path, os.O_RDONLY))
+            read = file.read(3).future()
+            fd = file.detach()
+            try:
+                try:
+                    self.assertEqual((yield read), b'one')
+                    self.assertEqual(os.lseek(fd, 0, os.SEEK_CUR), 3)
+                except BrokenPipeError:
+                    self.assertEqual(os.lseek(fd, 0, os.SEEK_CUR), 0)
+            finally:
+                os.close(fd)
+
+            # dispose with slow operation being executed
+            file = File(os.open(path, os.O_RDONLY))
+            fd, regular_read = file.fd, file.regular_read
+
+            def slow_read(fd, size):
+                time.sleep(0.1)
+                return regular_read(fd, size)
+            file.regular_read = slow_read
+            read = file.read(3).future()
+            yield sleep(0.01)
+            begin = time.time()
+            file.dispose()
+            self.assertLess(time.time() - begin, 0.05)
+            self.assertTrue(read.completed)
+            with self.assertRaises(BrokenPipeError):
+                yield read
+            os.fstat(fd)  # still open
+            while file.pending:
+                yield sleep(0.01)
+            with self.assertRaises(OSError):
+                os.fstat(fd)
+        finally:
+            os.unlink(path)
@@ -0,0 +1,119 @@
+import socket
+import unittest
+from ..http import (HTTPServer, HTTPConnection, HTTPRequest, HTTPResponse, HTTPError,
+                    _request_head, _head_headers, _head_framing, _HEAD_MAX)
+from ..sock import BufferedSocket
+from ...monad import do_async, do_return, async_all
+from ...tests import async_test
+
+__all__ = ('HTTPTest',)
+
+
+class HTTPTest(unittest.TestCase):
+    def test_head(self):
+        head = (b'POST /path?q=1 HTTP/1.1\r\nHost: localhost\r\n'
+                b'Content-Length:  5 \r\nX-Empty:\r\n\r\nbody')
+        for chunks in ([head], [head[index:index + 1] for index in range(len(head))]):
+            (line, headers), rest = _request_head.parse_only_iter(chunks)
+            headers = _head_headers(headers)
+            self.assertEqual((line[0], line[2], line[4]), (b'POST', b'/path?q=1', b'1.1'))
+            self.assertEqual(headers, [(b'Host', b'localhost'), (b'Content-Length', b'5'),
+                                       (b'X-Empty', b'')])
+            self.assertEqual(_head_framing(headers, 0), (5, False))
+            self.assertEqual(rest, b'body' if len(chunks) == 1 else b'')
+        self.assertEqual(_head_framing([(b'Transfer-Encoding', b'gzip, chunked')], 0),
+                         (None, True))
+        with self.assertRaises(HTTPError):
+            _head_framing([(b'Content-Length', b'-1')], 0)
+
+    def test_message(self):
+        self.assertTrue(HTTPRequest('GET', '/').keep_alive)
+        self.assertFalse(HTTPRequest('GET', '/', [('Connection', 'close')]).keep_alive)
+        self.assertFalse(HTTPRequest('GET', '/', version=b'1.0').keep_alive)
+        self.assertTrue(HTTPRequest('GET', '/', [('connection', 'Keep-Alive')],
+                                    version=b'1.0').keep_alive)
+        self.assertEqual(HTTPResponse(404).reason, b'Not Found')
+
+    @async_test
+    def test(self):
+        @do_async
+        def handler(request):
+            if request.target == b'/echo':
+                # stream request body back
+                do_return(HTTPResponse(200, [(b'X-Method', request.method)], request.body))
+            elif request.target == b'/chunks':
+                do_return(HTTPResponse(200, body=(b'chunk' + str(i).encode()
+                                                  for i in range(3))))
+            elif request.target == b'/empty':
+                do_return(HTTPResponse(200))
+            elif request.target == b'/close':
+                do_return(HTTPResponse(204, [(b'Connection', b'close')]))
+            body = yield request.body.read_all()
+            do_return(HTTPResponse(200, body=request.target + body))
+
+        with HTTPServer(handler).listen(('127.0.0.1', 0)) as server:
+            server.serve()()
+            with (yield HTTPConnection.connect(server.address)) as conn:
+                # keep-alive
+                for index in range(3):
+                    response = yield conn.request('GET', '/' + str(index))
+                    self.assertEqual(response.status, 200)
+                    self.assertEqual((yield response.body.read_all()), ('/' + str(index)).encode())
+
+                # pipelining
+                @do_async
+                def request(index):
+                    response = yield conn.request('POST', '/', body=str(index).encode())
+                    do_return((yield response.body.read_all()))
+                self.assertEqual(list((yield async_all(request(index) for index in range(32)))),
+                                 [b'/' + str(index).encode() for index in range(32)])
+
+                # chunked request and response bodies
+                response = yield conn.request('PUT', '/echo', body=iter((b'a', b'', b'bc')))
+                self.assertEqual(response.header('transfer-encoding'), b'chunked')
+                self.assertEqual(response.header('x-method'), b'PUT')
+                self.assertEqual((yield response.body.read_all()), b'abc')
+                response = yield conn.request('GET', '/chunks')
+                self.assertEqual((yield response.body.read_all()), b'chunk0chunk1chunk2')
+
+                # head
+                response = yield conn.request('HEAD', '/head')
+                self.assertEqual(response.header('content-length'), b'5')
+                self.assertEqual((yield response.body.read_all()), b'')
+                response = yield conn.request('HEAD', '/empty')
+                self.assertEqual(response.header('content-length'), None)
+                response = yield conn.request('GET', '/empty')
+                self.assertEqual(response.header('content-length'), b'0')
+                self.assertEqual((yield response.body.read_all()), b'')
+
+                # connection close
+                response = yield conn.request('GET', '/close')
+                self.assertEqual(response.status, 204)
+                self.assertFalse(response.keep_alive)
+                self.assertEqual((yield conn.stream.read_until_eof()), b'')
+
+            # invalid request
+            with BufferedSocket(socket.socket()) as client:
+                yield client.connect(server.address)
+                client.write_schedule(b'GET\r\n\r\n')
+                yield client.flush()
+                self.assertTrue((yield client.read_until_eof()).startswith(
+                                b'HTTP/1.1 400 Bad Request\r\n'))
+
+            # request head is too large
+            with BufferedSocket(socket.socket()) as client:
+                yield client.connect(server.address)
+                head = b'GET / HTTP/1.1\r\nX-Large: '
+                client.write_schedule(head + b'x' * (_HEAD_MAX + 1 - len(head)))
+                yield client.flush()
+                self.assertTrue((yield client.read_until_eof()).startswith(
+                                b'HTTP/1.1 400 Bad Request\r\n'))
+
+            # HTTP/1.0 streaming response is delimited by connection close
+            with BufferedSocket(socket.socket()) as client:
+                yield client.connect(server.address)
+                client.write_schedule(b'GET /chunks HTTP/1.0\r\n\r\n')
+                yield client.flush()
+                data = yield client.read_until_eof()
+                self.assertTrue(data.endswith(b'\r\n\r\nchunk0chunk1chunk2'))
+                self.assertTrue(b'Connection: close\r\n' in data)
@@ -0,0 +1,73 @@
+import re
+import os
+import mmap
+import struct
+import tempfile
+import unittest
+from ..mapped import MmapFile
+from ...uniform import BrokenPipeError
+from ...tests import async_test
+from ... import parser as P
+
+__all__ = ('MmapFileTest',)
+
+
+class MmapFileTest(unittest.TestCase):
+    def setUp(self):
+        self.data = (b'header\n' + b'X' * (mmap.PAGESIZE * 3) + b'\nkey=value&' +
+                     struct.pack('>I', 5) + b'bytes' + b'tail')
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as file:
+            file.write(self.data)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    @async_test
+    def test(self):
+        with MmapFile(self.path, readahead=mmap.PAGESIZE) as file:
+            self.assertEqual(file.size, len(self.data))
+
+            # read
+            data = yield file.read(3)
+            self.assertTrue(isinstance(data, memoryview))
+            self.assertEqual(data.tobytes(), b'hea')
+            self.assertEqual((yield file.read_until_sub()).tobytes(), b'der\n')
+
+            # cross window sub
+            self.assertEqual(len((yield file.read_until_sub(b'X\nkey'))),
+                             mmap.PAGESIZE * 3 + 4)
+            self.assertEqual(tuple(file.windows), (3,))  # passed windows dropped
+
+            # regex
+            data, match = yield file.read_until_regex(re.compile(br'=([^&]+)&'))
+            self.assertEqual(data.tobytes(), b'=value&')
+            self.assertEqual(match.group(1), b'value')
+
+            # bytes
+            self.assertEqual((yield file.read_bytes()).tobytes(), b'bytes')
+
+            # parse
+            with self.assertRaises(P.ParserError):
+                yield file.parse(P.string(b'tall'))
+            self.assertEqual((yield file.parse(P.string(b'ta'))), b'ta')
+            self.assertEqual((yield file.read_until_eof()).tobytes(), b'il')
+            with self.assertRaises(BrokenPipeError):
+                yield file.read(1)
+
+            # random access
+            self.assertEqual(file.seek(-4, os.SEEK_END), len(self.data) - 4)
+            self.assertEqual((yield file.read_until_size(4)).tobytes(), b'tail')
+            self.assertEqual((yield file.read_at(0, 6)).tobytes(), b'header')
+            self.assertEqual(file.tell(), len(self.data))
+            with self.assertRaises(ValueError):
+                yield file.write(b'data')
+
+            # parse limit
+            file.seek(0)
+            with self.assertRaises(P.ParserError):
+                yield file.parse(P.take(mmap.PAGESIZE * 2), mmap.PAGESIZE - 1)
+            self.assertEqual(file.tell(), 0)
+            self.assertEqual(len((yield file.parse(P.take(mmap.PAGESIZE * 2), mmap.PAGESIZE))),
+                             mmap.PAGESIZE * 2)
+        self.assertTrue(file.disposed)
@@ -0,0 +1,163 @@
+import os
+import ssl
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+from ..pool import SocketPool
+from ..server import Server
+from ..tls import BufferedTLSStream
+from ..sock_ssl import ssl_context
+from ...event import Event
+from ...monad import do_async, do_return, async_all
+from ...core import Core, schedule, sleep
+from ...uniform import BrokenPipeError
+from ...tests import async_test
+
+__all__ = ('SocketPoolTest',)
+
+
+class SocketPoolTest(unittest.TestCase):
+    @async_test
+    def test(self):
+        connects = [0]
+        release = Event()
+
+        @do_async
+        def handler(client, addr):
+            connects[0] += 1
+            try:
+                while True:
+                    line = yield client.read_until_sub()
+                    if line == b'wait\n':
+                        yield release
+                    elif line == b'close\n':
+                        break
+                    client.write_schedule(line)
+                    yield client.flush()
+            except BrokenPipeError:
+                pass  # connection is closed by pool
+
+        @do_async
+        def request(stream, line):
+            stream.write_schedule(line)
+            yield stream.flush()
+            do_return((yield stream.read_until_sub()))
+
+        with Server(handler).listen(('localhost', 0)) as server:
+            server.serve()()
+            with SocketPool(max_idle=1, max_total=2, idle_timeout=0.2) as pool:
+                key = server.address
+
+                # reuse
+                for index in range(4):
+                    line = str(index).encode() + b'\n'
+                    self.assertEqual((yield pool.call(key, lambda s: request(s, line))), line)
+                    if not index:
+                        timers = len(Core.local().time_queue)
+                self.assertEqual(connects[0], 1)
+                self.assertEqual(len(pool), 1)
+                # idle timeouts of reused connection are canceled
+                self.assertEqual(len(Core.local().time_queue), timers)
+
+                # max total
+                waits = [pool.call(key, lambda s: request(s, b'wait\n')).future()
+                         for _ in range(2)]
+                extra = pool.acquire(key).future()
+                for _ in range(10):
+                    yield schedule()
+                self.assertFalse(extra.completed)
+                self.assertEqual(len(pool), 2)
+                release(None)
+                for wait in waits:
+                    self.assertEqual((yield wait), b'wait\n')
+                stream = yield extra
+                self.assertEqual(len(pool), 2)  # second released stream is not idle
+                pool.release(stream)
+                self.assertEqual(len(pool), 1)
+
+                # dead connection
+                stream = yield pool.acquire(key)
+                stream.write_schedule(b'close\n')
+                yield stream.flush()
+                pool.release(stream)
+                yield sleep(0.05)
+                stream_next = yield pool.acquire(key)
+                self.assertTrue(stream.disposed)
+                self.assertFalse(stream_next is stream)
+                self.assertEqual(len(pool), 1)
+                pool.release(stream_next)
+
+                # idle timeout
+                yield sleep(0.3)
+                self.assertTrue(stream_next.disposed)
+                self.assertEqual(len(pool), 0)
+
+                # dispose fails waiting acquires
+                streams = yield async_all((pool.acquire(key), pool.acquire(key)))
+                extra = pool.acquire(key).future()
+                yield schedule()
+            with self.assertRaises(BrokenPipeError):
+                yield extra
+            self.assertTrue(all(not stream.disposed for stream in streams))
+            for stream in streams:
+                pool.release(stream)
+                self.assertTrue(stream.disposed)
+
+            with self.assertRaises(ValueError):
+                yield pool.acquire(key)
+
+    @async_test
+    def test_connect_error(self):
+        probe = socket.socket()
+        probe.bind(('localhost', 0))
+        address = probe.getsockname()
+        probe.close()
+
+        with SocketPool(max_total=1) as pool:
+            for _ in range(2):
+                with self.assertRaises(socket.error):
+                    yield pool.acquire(address)
+            self.assertEqual(len(pool), 0)
+
+    @async_test
+    def test_ssl_session(self):
+        if not hasattr(ssl, 'MemoryBIO'):
+            self.skipTest('memory BIO is not supported')
+        certdir = tempfile.mkdtemp()
+        try:
+            certfile = os.path.join(certdir, 'cert.pem')
+            try:
+                with open(os.devnull, 'wb') as null:
+                    subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048',
+                                           '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                                           '-keyout', certfile, '-out', certfile],
+                                          stdout=null, stderr=null)
+            except (OSError, subprocess.CalledProcessError):
+                self.skipTest('failed to generate certificate')
+            server_context = ssl_context({'certfile': certfile}, True)
+        finally:
+            shutil.rmtree(certdir)
+
+        @do_async
+        def handler(client, addr):
+            with (yield BufferedTLSStream(client, server_context, True).handshake()) as client:
+                client.write_schedule((yield client.read_until_sub()))
+                yield client.flush()
+
+        @do_async
+        def request(stream):
+            stream.write_schedule(b'ping\n')
+            yield stream.flush()
+            yield stream.read_until_sub()  # session ticket is received with reply
+            do_return(stream.session_reused)
+
+        with Server(handler).listen(('localhost', 0)) as server:
+            server.serve()()
+            for ssl_options in ({'context': ssl_context()}, {}):
+                with SocketPool(ssl_options=ssl_options) as pool:
+                    for reused in (False, True):
+                        stream = yield pool.acquire(server.address)
+                        self.assertEqual((yield request(stream)), reused)
+                        pool.release(stream, False)  # next connection is new
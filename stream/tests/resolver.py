@@ -0,0 +1,79 @@
+import socket
+import unittest
+from ..resolver import Resolver, connect_host, _interleave
+from ..sock import Socket
+from ...monad import Cont
+from ...core import Core, schedule
+from ...tests import async_test
+
+__all__ = ('ResolverTest',)
+
+
+class ResolverTest(unittest.TestCase):
+    @async_test
+    def test_resolve(self):
+        resolver = Resolver()
+        addrs = resolver('127.0.0.1', 80)
+        self.assertTrue(resolver('127.0.0.1', 80) is addrs)
+        self.assertEqual((yield addrs)[0][4], ('127.0.0.1', 80))
+        self.assertTrue(resolver('127.0.0.1', 80) is addrs)
+        self.assertEqual(len(resolver), 1)
+
+        resolver = Resolver(ttl=0)
+        addrs = resolver('127.0.0.1', 80)
+        self.assertFalse(resolver('127.0.0.1', 80) is addrs)
+        resolver('127.0.0.1', 81)
+        self.assertEqual(len(resolver), 1)  # expired entries are pruned
+
+    def test_interleave(self):
+        addrs = [(socket.AF_INET6, 1), (socket.AF_INET6, 2), (socket.AF_INET6, 3),
+                 (socket.AF_INET, 4)]
+        self.assertEqual([addr[1] for addr in _interleave(addrs)], [1, 4, 2, 3])
+
+    @async_test
+    def test_connect_host(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(8)
+        refused = socket.socket()
+        refused.bind(('127.0.0.1', 0))
+
+        def addr(address):
+            return (socket.AF_INET, socket.SOCK_STREAM, 0, '', address)
+
+        streams = []
+
+        def factory(sock):
+            stream = Socket(sock)
+            streams.append(stream)
+            return stream
+
+        def resolver(addrs):
+            return lambda host, port, family: Cont.unit(addrs)
+
+        try:
+            # failed attempt is followed by the next one without delay
+            yield schedule()  # test timeout timer is started
+            timers = len(Core.local().time_queue)
+            stream = yield connect_host('host', 0, delay=10, factory=factory,
+                                        resolver=resolver([addr(refused.getsockname()),
+                                                           addr(server.getsockname())]))
+            self.assertEqual(len(Core.local().time_queue), timers)  # delay timer is canceled
+            self.assertTrue(stream is streams[-1])
+            self.assertTrue(streams[0].disposed)
+            self.assertFalse(stream.disposed)
+            stream.dispose()
+
+            # all attempts failed
+            del streams[:]
+            with self.assertRaises(socket.error):
+                yield connect_host('host', 0, factory=factory,
+                                   resolver=resolver([addr(refused.getsockname())] * 2))
+            self.assertTrue(all(stream.disposed for stream in streams))
+
+            # default resolver
+            with (yield connect_host(*server.getsockname())) as stream:
+                self.assertEqual(stream.sock.getpeername(), server.getsockname())
+        finally:
+            server.close()
+            refused.close()
@@ -0,0 +1,88 @@
+import os
+import socket
+import unittest
+from ..server import Server
+from ..sock import BufferedSocket
+from ...event import Event
+from ...monad import do_async, do_return, async_all
+from ...core import schedule, sleep
+from ...tests import async_test
+
+__all__ = ('ServerTest',)
+
+
+class ServerTest(unittest.TestCase):
+    @async_test
+    def test(self):
+        release = Event()
+
+        @do_async
+        def handler(client, addr):
+            line = yield client.read_until_sub()
+            if line == b'wait\n':
+                yield release
+            client.write_schedule(line)
+            yield client.flush()
+
+        @do_async
+        def request(line):
+            with BufferedSocket(socket.socket()) as client:
+                yield client.connect(server.address)
+                client.write_schedule(line)
+                yield client.flush()
+                do_return((yield client.read_until_sub()))
+
+        with Server(handler, limit=2).listen(('localhost', 0)) as server:
+            server.serve()()
+
+            # batch of clients
+            lines = [str(index).encode() + b'\n' for index in range(16)]
+            self.assertEqual(list((yield async_all(request(line) for line in lines))), lines)
+
+            # limit
+            waits = [request(b'wait\n').future() for _ in range(2)]
+            while len(server.clients) < 2:
+                yield schedule()
+            extra = request(b'extra\n').future()
+            for _ in range(10):
+                yield schedule()
+            self.assertFalse(extra.completed)
+            self.assertEqual(len(server.clients), 2)
+            release(None)
+            self.assertEqual((yield extra), b'extra\n')
+            for wait in waits:
+                self.assertEqual((yield wait), b'wait\n')
+
+    @async_test
+    def test_workers(self):
+        @do_async
+        def handler(client, addr):
+            yield client.read_until_sub()
+            client.write_schedule(str(os.getpid()).encode() + b'\n')
+            yield client.flush()
+
+        @do_async
+        def request(address):
+            with BufferedSocket(socket.socket()) as client:
+                yield client.connect(address)
+                client.write_schedule(b'pid\n')
+                yield client.flush()
+                do_return(int((yield client.read_until_sub())))
+
+        probe = socket.socket()
+        probe.bind(('localhost', 0))
+        address = probe.getsockname()
+        probe.close()
+
+        with Server(handler) as server:
+            workers = server.serve_workers(address, 2).future()
+            self.assertEqual(len(server.workers), 2)
+            pid = None
+            for _ in range(100):
+                try:
+                    pid = yield request(address)
+                    break
+                except socket.error:
+                    yield sleep(0.05)  # worker is not listening yet
+            self.assertTrue(pid in server.workers)
+        yield workers
@@ -0,0 +1,109 @@
+import os
+import ssl
+import shutil
+import socket
+import tempfile
+import unittest
+import subprocess
+from ..tls import TLSStream, BufferedTLSStream
+from ..sock import Socket, BufferedSocket
+from ..sock_ssl import BufferedSocketSSL, ssl_context
+from ...monad import do_async, do_return, async_all
+from ...uniform import BrokenPipeError
+from ...tests import async_test
+
+__all__ = ('TLSStreamTest',)
+
+
+class TLSStreamTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.certdir = tempfile.mkdtemp()
+        cls.certfile = os.path.join(cls.certdir, 'cert.pem')
+        try:
+            with open(os.devnull, 'wb') as null:
+                subprocess.check_call(['openssl', 'req', '-x509', '-newkey', 'rsa:2048',
+                                       '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                                       '-keyout', cls.certfile, '-out', cls.certfile],
+                                      stdout=null, stderr=null)
+        except (OSError, subprocess.CalledProcessError):
+            cls.certfile = None
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.certdir)
+
+    def setUp(self):
+        if not hasattr(ssl, 'MemoryBIO'):
+            self.skipTest('memory BIO is not supported')
+        if self.certfile is None:
+            self.skipTest('failed to generate certificate')
+        self.server_context = ssl_context({'certfile': self.certfile}, True)
+        self.client_context = ssl_context()
+
+    @do_async
+    def pair(self, session=None):
+        client_sock, server_sock = socket.socketpair()
+        client = BufferedTLSStream(Socket(client_sock, True), self.client_context,
+                                   session=session)
+        server = BufferedTLSStream(Socket(server_sock, True), self.server_context, True)
+        yield async_all((client.handshake(), server.handshake()))
+        do_return((client, server))
+
+    @async_test
+    def test(self):
+        data = os.urandom(1 << 20)
+        client, server = yield self.pair()
+        with client, server:
+            client.write_schedule(data)
+            send = client.flush().future()
+            self.assertEqual((yield server.read_until_size(len(data))), data)
+            yield send
+
+            # echo, so session ticket is received by client
+            server.write_schedule(b'echo\n')
+            yield server.flush()
+            self.assertEqual((yield client.read_until_sub()), b'echo\n')
+            session = client.session
+            self.assertFalse(client.session_reused)
+
+            # close notification
+            yield client.base.shutdown()
+            with self.assertRaises(BrokenPipeError):
+                yield server.read(1)
+
+        # session resumption
+        client, server = yield self.pair(session)
+        with client, server:
+            self.assertTrue(client.session_reused)
+
+    @async_test
+    def test_raw(self):
+        client_sock, server_sock = socket.socketpair()
+        with TLSStream(Socket(client_sock, True), self.client_context) as client, \
+                TLSStream(Socket(server_sock, True), self.server_context, True) as server:
+            yield async_all((client.handshake(), server.handshake()))
+            data = b'x' * (1 << 15)
+            yield client.write(data)
+            # all received records are drained by single read
+            yield server.fill()
+            self.assertEqual(len((yield server.read(len(data)))), len(data))
+
+    @async_test
+    def test_socket_ssl(self):
+        listener = BufferedSocket(socket.socket())
+        listener.bind(('localhost', 0))
+        listener.listen(1)
+        with listener:
+            client = BufferedSocketSSL(socket.socket(), ssl_options={
+                                       'context': self.client_context})
+            with client:
+                connect = client.connect(listener.base.sock.getsockname()).future()
+                server_sock, _ = yield listener.base.accept()
+                server = BufferedTLSStream(server_sock, self.server_context, True)
+                with server:
+                    yield server.handshake()
+                    yield connect
+                    client.write_schedule(b'data\n')
+                    yield client.flush()
+                    self.assertEqual((yield server.read_until_sub()), b'data\n')
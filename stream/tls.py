@@ -0,0 +1,152 @@
+"""TLS stream
+
+TLS over arbitrary stream with SSLContext and memory BIOs.
+"""
+import errno
+try:
+    import ssl
+except ImportError:
+    ssl = None  # no SSL support
+
+from .wrapped import WrappedStream
+from .buffered import BufferedStream
+from .. import PRETZEL_BUFSIZE
+from ..monad import do_async, do_return, async_limit
+from ..uniform import BrokenPipeError
+
+__all__ = ('TLSStream', 'BufferedTLSStream',)
+
+
+class TLSStream(WrappedStream):
+    """TLS stream
+
+    Encrypts data written to and decrypts data read from base stream (socket,
+    pipe, or any other stream) with SSLObject over memory BIOs. Encrypted data
+    is read from base stream in ``bufsize`` chunks, and all records decrypted
+    from it (up to requested size) are returned by single read. Pass ``session``
+    of previous connection to resume TLS session. ``handshake`` must be
+    completed before stream is used.
+    """
+    def __init__(self, base, context, server_side=None, server_hostname=None,
+                 session=None, bufsize=None):
+        WrappedStream.__init__(self, base)
+        self.bufsize = bufsize or PRETZEL_BUFSIZE
+        self.incoming = ssl.MemoryBIO()
+        self.outgoing = ssl.MemoryBIO()
+        self.sslobj = context.wrap_bio(self.incoming, self.outgoing, bool(server_side),
+                                       server_hostname, session=session)
+        self.send = async_limit(1)(self.send_outgoing)
+
+    @do_async
+    def handshake(self):
+        """Perform TLS handshake
+
+        Returns this stream.
+        """
+        with self.reading, self.writing:
+            while True:
+                try:
+                    self.sslobj.do_handshake()
+                    break
+                except ssl.SSLWantReadError:
+                    yield self.fill()
+            yield self.send(True)
+        do_return(self)
+
+    @do_async
+    def read(self, size):
+        with self.reading:
+            while True:
+                try:
+                    data = self.sslobj.read(size)
+                    if size and not data:  # close notification received
+                        raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+                    break
+                except ssl.SSLWantReadError:
+                    yield self.fill()
+                except (ssl.SSLZeroReturnError, ssl.SSLEOFError):
+                    raise BrokenPipeError(errno.EPIPE, 'broken pipe')
+            if len(data) < size:
+                # drain records which have already been received
+                chunks, count = [data], len(data)
+                try:
+                    while count < size and (self.sslobj.pending() or self.incoming.pending):
+                        chunk = self.sslobj.read(size - count)
+                        if not chunk:
+                            break
+                        chunks.append(chunk)
+                        count += len(chunk)
+                except (ssl.SSLWantReadError, ssl.SSLZeroReturnError, ssl.SSLEOFError):
+                    pass  # reported by the next read
+                data = b''.join(chunks) if len(chunks) > 1 else data
+            do_return(data)
+
+    @do_async
+    def write(self, data):
+        with self.writing:
+            self.sslobj.write(data)
+            yield self.send()
+            do_return(len(data))
+
+    @do_async
+    def fill(self):
+        """Feed incoming BIO with data read from base stream
+        """
+        if self.outgoing.pending:
+            yield self.send(True)
+        try:
+            self.incoming.write((yield self.base.read(self.bufsize)))
+        except BrokenPipeError:
+            self.incoming.write_eof()
+
+    @do_async
+    def send_outgoing(self, flush=None):
+        """Write outgoing BIO content to base stream
+
+        Must only be called with ``send`` which preserves order of writes.
+        """
+        data = self.outgoing.read()
+        while data:
+            data = data[(yield self.base.write(data)):]
+        if flush:
+            yield self.base.flush()
+
+    @do_async
+    def shutdown(self):
+        """Send TLS close notification
+
+        Peer close notification is not awaited.
+        """
+        try:
+            self.sslobj.unwrap()
+        except ssl.SSLWantReadError:
+            pass
+        yield self.send(True)
+
+    @property
+    def session(self):
+        """TLS session, can be passed to new stream to resume session
+        """
+        return self.sslobj.session
+
+    @property
+    def session_reused(self):
+        return self.sslobj.session_reused
+
+    def __str__(self):
+        return '{}(version:{}, base:{})'.format(type(self).__name__,
+                                                self.sslobj.version(), self.base)
+
+
+class BufferedTLSStream(BufferedStream):
+    """Buffered TLS stream
+    """
+    def __init__(self, base, context, server_side=None, server_hostname=None,
+                 session=None, bufsize=None):
+        BufferedStream.__init__(self, TLSStream(base, context, server_side, server_hostname,
+                                                session, bufsize), bufsize)
+
+    @do_async
+    def handshake(self):
+        yield self.base.handshake()
+        do_return(self)
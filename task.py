@@ -29,10 +29,12 @@ class ThreadPool(object):
     @classmethod
     def main(cls, inst=None):
         """Access or create main thread pool object
+
+        New main thread pool is created if current one has been disposed.
         """
         with cls.inst_lock:
             if inst is None:
-                if cls.inst_main is None:
+                if cls.inst_main is None or cls.inst_main.disposed:
                     cls.inst_main = cls()
                 inst = cls.inst_main
             else:
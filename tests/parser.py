@@ -37,6 +37,10 @@ class ParserTest(unittest.TestCase):
         self.success(p, r, "|"    , "beg", "in,", "end|")
         # unit
         self.success(Parser.unit(10), 10, "abc", "abc")
+        # independent parse inside of callback
+        p = take(4).bind(lambda v: Parser.unit(take(3).parse_only(v[:2], v[2:])))
+        self.success(p, ("abc", "d"), "", "ab", "cd")
+        self.success(p, ("abc", "d"), "e", "abcde")
 
     def test_alternative(self):
         # or
@@ -65,6 +69,23 @@ class ParserTest(unittest.TestCase):
         self.success(p, ("ab", "ab"), "c" , "ababc")
         self.success(p, ("ab",)     , ""  , "ab")
         self.success(p, tuple()     , "ac", "ac")
+        # backtracking over many chunks
+        p = string("abc").many
+        self.success(p, ("abc",) * 100, "abd", *(("abc" * 100 + "abd")[i:i + 2]
+                                                 for i in range(0, 303, 2)))
+        # value which does not consume input
+        self.success(Parser.unit(1).many, tuple(), "ab", "ab")
+
+    def test_many_till(self):
+        p = string("ab").many_till(string("."))
+        self.success(p, ("ab", "ab"), "c", "abab.c")
+        self.success(p, ("ab", "ab"), "c", "a", "ba", "b", ".c")
+        self.success(p, tuple()     , "" , ".")
+        for d in ("abac.", "ab"):
+            self.failure(p, d)
+        # end is rewound if it fails after consuming input
+        p = string("ab").many_till(string("aa"))
+        self.success(p, ("ab",), "", "a", "b", "a", "a")
 
     def test_shifts(self):
         p = string("ab") >> string("cd")
@@ -98,6 +119,42 @@ class ParserTest(unittest.TestCase):
         self.success(p, "--" , "a++", "--a++")
         self.success(p, "---", "a++", "-", "--", "a++")
 
+    def test_take_while_bytes(self):
+        p = take_while_bytes(b'-+')
+        self.success(p, b'-+-', b'a', b'-+-a')
+        self.success(p, b'---', b'a++', b'-', b'--', b'a++')
+        self.success(p, b'', b'a', b'a')
+        self.failure(p, b'--')
+        self.success(take_while_bytes('-'), '--', 'a', '--a')
+        self.success(take_while_bytes(b'^]\\'), b'^]\\', b'a', b'^]\\a')
+        self.success(take_while_bytes(b''), b'', b'a', b'a')
+
+    def test_fuse(self):
+        p = fuse(string(b'GET '), take_while_bytes(b'/abc'), string(b' '), struct('>H'),
+                 take(2), take_while_bytes(b'0123456789'), string(b'\n'))
+        value = (b'GET ', b'/ab/c', b' ', 0x3132, b'ab', b'42', b'\n')
+        data = b'GET /ab/c 12ab42\n'
+        for index in range(len(data)):
+            self.success(p, value, b'|', data[:index], data[index:] + b'|')
+        self.success(p, value, b'', data)
+        for data in (b'GET /ab/c 12ab42', b'PUT /ab/c 12ab42\n', b'GET /ab/c 12abX\n'):
+            self.failure(p, data)
+
+        # take_while_bytes does not give back matched input
+        self.failure(fuse(take_while_bytes(b'ab'), string(b'b')), b'abbc')
+
+        # not fusable parsers
+        p = fuse(string(b'<'), take_while(lambda c: c != b'>'[0]), string(b'>'), take(1))
+        self.success(p, (b'<', b'ab', b'>', b'c'), b'', b'<a', b'b>c')
+
+        # varint
+        p = fuse(Varint, string(b'|'), Varint)
+        data = bytes(Varint(300)) + b'|' + bytes(Varint(-1 << 20))
+        self.assertIsNotNone(Varint.__parser__().fusion)
+        for index in range(len(data)):
+            self.success(p, (Varint(300), b'|', Varint(-1 << 20)), b'',
+                         data[:index], data[index:])
+
     def test_take_rest(self):
         self.success(take_rest, "abcd", "",  "a", "bcd")
         self.success(take_rest, "", "", "")
@@ -143,6 +200,17 @@ class ParserTest(unittest.TestCase):
         self.success(sum(Varint), 42, b'',
                      b''.join(map(lambda v: bytes(Varint(v)), (39, 3))))
 
+    def test_varints(self):
+        values = [0, 1, -1, 63, -64, 8191, -8191, 8192, 1 << 40, -(1 << 62)]
+        data = encode_varints(values)
+        self.assertEqual(data, b''.join(bytes(Varint(value)) for value in values))
+        self.assertEqual(list(decode_varints(data)), values)
+        self.assertEqual(list(decode_varints(encode_varints(range(-300, 300)))),
+                         list(range(-300, 300)))
+        self.assertEqual(len(decode_varints(b'')), 0)
+        with self.assertRaises(ValueError):
+            decode_varints(data + b'\x80')
+
     def test_bytes(self):
         self.success(Bytes, Bytes(b'one'), b'' , bytes(Bytes(b'one')))
         self.success(Bytes, Bytes(b'one'), b'|', bytes(Bytes(b'one')) + b'|')
@@ -5,7 +5,7 @@ import sys
 import errno
 
 __all__ = ('PY2', 'execute', 'reraise', 'StringIO', 'zip', 'map', 'filter',
-           'ConnectionError', 'BrokenPipeError', 'CanceledError',
+           'ConnectionError', 'BrokenPipeError', 'TimeoutError', 'CanceledError',
            'BlockingErrorSet', 'PipeErrorSet',)
 
 PY2 = sys.version_info[0] == 2
@@ -79,7 +79,7 @@ class CanceledError(Exception):
     """
 
 if sys.version_info[:2] > (3, 2):
-    from builtins import ConnectionError, BrokenPipeError
+    from builtins import ConnectionError, BrokenPipeError, TimeoutError
 else:
     class ConnectionError(OSError, IOError):
         """Connection associated error
@@ -89,6 +89,10 @@ else:
         """Broken pipe error
         """
 
+    class TimeoutError(OSError):
+        """Timeout expired
+        """
+
 
 #------------------------------------------------------------------------------#
 # Error numbers sets                                                           #